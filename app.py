@@ -1,602 +1,1349 @@
-import numpy as np
-import js
-from pyodide.ffi import create_proxy
-from double_pendulum import DoublePendulum
+import base64
+from array import array
+from backends import get_backend
+from double_pendulum import DoublePendulum, read_snapshot
+from ffi_counter import CountingProxy, FfiCounter, unwrap
+from host import BrowserHost
+from keyframes import KeyframeIndex
+from profiler import FrameProfiler, format_summary
+from startup import StartupTimer, draw_pendulum
 import math
 import sys
 
-# Global variables
-pendulum = None
-animation_id = None
-running = False
-max_time = 60  # Default simulation length in seconds
-canvas = None
-ctx = None
-width = 0
-height = 0
-scale = 90  # Scale factor reduced for better visibility (was 100)
-center_x = 0
-center_y = 0
-show_trail = True
-keep_full_trail = False  # New option for keeping the entire trail
-initialized = False  # Track if we're already initialized
-last_theta1 = None   # Track last used theta1 value
-last_theta2 = None   # Track last used theta2 value
-last_sim_length = None  # Track last used simulation length
-last_timestamp = None  # Track the last animation frame timestamp
+# The worker, replay, trajectory cache and trail LOD modules use NumPy; they
+# are imported once a feature needs them (see require_numpy)
 
-def log_message(message):
-    """Print debug message to console"""
-    js.console.log(message)
+# Settings
+MAX_FRAME_TIME = 0.25  # Longest frame interval fed to the physics (avoids a spiral of death)
+MAX_STEPS_PER_FRAME = 50  # Upper bound on physics steps per frame
+AHEAD_BUDGET = 0.008  # Wall time per compute-ahead chunk, leaving the rest of the frame to rendering
+MIN_PLAYBACK_SPEED = 0.1
+MAX_PLAYBACK_SPEED = 100.0
+OVERLAY_EVERY = 30  # Frames between overlay refreshes (the overlay itself costs FFI calls)
+REPLAY_PATH = "/tmp/replay.traj"  # Where loaded trajectory files are stored in the Pyodide FS
+SESSION_KEY = "double-pendulum-session"  # localStorage entry holding the snapshot of the last run
 
-def setup_canvas():
-    """Set up the canvas element and context for drawing."""
-    global canvas, ctx, width, height, center_x, center_y
+
+class SimulationController:
+    """
+    The interactive simulator: simulation state, the frame loop, rendering
+    and the UI event handlers.
     
-    try:
-        # Get the canvas element
-        log_message("Looking for canvas element...")
-        canvas = js.document.getElementById("pendulum-canvas")
-        if canvas is None:
-            log_message("ERROR: Canvas element not found!")
-            return False
-            
-        log_message("Getting canvas context...")
+    Everything it needs from the page (elements, canvas, timers, storage,
+    JS exports) goes through an injected host: host.BrowserHost in the
+    browser, or host.FakeHost to run, test and benchmark the app on plain
+    CPython.
+    """
+    
+    def __init__(self, host, startup=None):
+        """
+        Args:
+            host: BrowserHost, FakeHost or another object with their interface
+            startup: StartupTimer already holding the page's earlier milestones
+                     (see startup.start)
+        """
+        self.host = host
+        self.startup = startup or StartupTimer(host.clock)  # Page start milestones (see window.getStartupTimings())
+        self.backend = get_backend("math")  # Trail storage; "numpy" once require_numpy() has loaded it
+        self.pendulum = None
+        self.animation_id = None
+        self.running = False
+        self.max_time = 60  # Default simulation length in seconds
+        self.canvas = None
+        self.ctx = None
+        self.width = 0
+        self.height = 0
+        self.scale = 90  # Scale factor reduced for better visibility (was 100)
+        self.center_x = 0
+        self.center_y = 0
+        self.show_trail = True
+        self.keep_full_trail = False  # New option for keeping the entire trail
+        self.initialized = False  # Track if we're already initialized
+        self.last_theta1 = None   # Track last used theta1 value
+        self.last_theta2 = None   # Track last used theta2 value
+        self.last_sim_length = None  # Track last used simulation length
+        self.last_timestamp = None  # Track the last animation frame timestamp
+        self.accumulator = 0.0  # Real time not yet consumed by fixed physics steps
+        self.previous_angles = None  # (theta1, theta2) before the last physics step, for interpolation
+        self.render_alpha = 1.0  # Fraction of a physics step to interpolate when drawing
+        self.use_worker = False  # Run the physics in a Web Worker (enable with ?worker in the URL)
+        self.physics_worker = None  # The Worker object when use_worker is set
+        self.worker_session = 0  # Incremented per run so frames from an old run are ignored
+        self.sim_target_time = 0.0  # Simulation time requested from the worker so far
+        self.trail_layer = None  # Offscreen canvas holding the already drawn part of the trail
+        self.trail_ctx = None  # 2D context of trail_layer
+        self.trail_decimator = None  # Screen-space LOD cache for the full trail (NumPy backend only)
+        self.trail_layer_dirty = True  # Repaint the whole trail layer on the next draw
+        self.trail_layer_points = 0  # Trail points already on trail_layer (without the LOD decimator)
+        self.bulk_trail = True  # Send each trail as one Float32Array instead of one lineTo per point
+        self.stroke_polyline = None  # JS helper that strokes a Float32Array of coordinates natively
+        self.ffi_counter = FfiCounter()  # Counts Python -> JS calls made by draw()
+        self.profiler = FrameProfiler()  # Rolling per-frame timings of animation_loop (see window.getFrameStats())
+        self.profiler_overlay = None  # <pre> element showing the profiler statistics, when enabled
+        self.replay_file = None  # TrajectoryFile replayed instead of integrating live
+        self.trajectory_cache = None  # Finished runs, replayed on a restart with the same inputs (NumPy backend only)
+        self.recorder = None  # Records the live run into trajectory_cache
+        self.cached_run = None  # CachedTrajectory being replayed; integration resumes from its end if needed
+        self.compute_ahead = False  # Integrate the whole run up front and play it back (enable with ?ahead in the URL)
+        self.precompute = None  # ComputeAhead run being integrated for playback
+        self.ahead_scheduled = False  # A compute_ahead_tick is pending
+        self.playback_speed = 1.0  # Simulated seconds per real second
+        self.keyframes = None  # KeyframeIndex of the current run, for seeking with the timeline
+        self.timeline = None  # Range input for scrubbing through the run
+    
+    def log_message(self, message):
+        """Print debug message to console"""
+        self.host.log(message)
+    
+    def setup_canvas(self):
+        """Set up the canvas element and context for drawing."""
         try:
-            ctx = canvas.getContext("2d")
-            if ctx is None:
-                log_message("ERROR: Could not get 2D context!")
+            # Get the canvas element
+            self.log_message("Looking for canvas element...")
+            self.canvas = self.host.get_element("pendulum-canvas")
+            if self.canvas is None:
+                self.log_message("ERROR: Canvas element not found!")
+                return False
+            
+            self.log_message("Getting canvas context...")
+            try:
+                self.ctx = self.canvas.getContext("2d")
+                if self.ctx is not None:
+                    self.ctx = CountingProxy(self.ctx, self.ffi_counter)
+                if self.ctx is None:
+                    self.log_message("ERROR: Could not get 2D context!")
+                    return False
+            except Exception as e:
+                self.log_message(f"ERROR getting canvas context: {str(e)}")
                 return False
+            
+            # Set canvas dimensions
+            self.width = self.canvas.width
+            self.height = self.canvas.height
+            self.log_message(f"Canvas dimensions: {self.width}x{self.height}")
+            
+            # Calculate center coordinates
+            self.center_x = self.width / 2
+            self.center_y = self.height / 2.5  # Position pendulum centered in the upper part of canvas
+            
+            # Create the offscreen layer for incremental trail rendering
+            self.setup_trail_layer()
+            
+            # Install the native polyline helper for bulk trail submission
+            self.setup_stroke_polyline()
+            
+            # Draw a test rectangle to verify the canvas is working
+            try:
+                self.ctx.fillStyle = "#FF0000"
+                self.ctx.fillRect(self.center_x - 50, self.center_y - 50, 100, 100)
+                self.log_message("Canvas setup successful - Test rectangle drawn")
+            except Exception as e:
+                self.log_message(f"ERROR drawing test rectangle: {str(e)}")
+                return False
+            
+            return True
         except Exception as e:
-            log_message(f"ERROR getting canvas context: {str(e)}")
+            self.log_message(f"ERROR setting up canvas: {str(e)}")
             return False
+    
+    def send_to_worker(self, message):
+        """Post a command message to the physics worker."""
+        self.host.post_message(self.physics_worker, message)
+    
+    def on_worker_message(self, message):
+        """Forward a message from the physics worker to the current client."""
+        try:
+            if message["type"] == "ready":
+                self.log_message("Physics worker ready")
+                return
+            if message["type"] == "error":
+                self.log_message(f"ERROR from physics worker: {message['message']}")
+                return
+            
+            from physics_worker import WorkerClient
+            if isinstance(self.pendulum, WorkerClient):
+                self.pendulum.receive(message)
+        except Exception as e:
+            self.log_message(f"ERROR handling worker message: {str(e)}")
+    
+    async def require_numpy(self):
+        """
+        Load NumPy (the first time) and turn on the features built on it.
         
-        # Set canvas dimensions
-        width = canvas.width
-        height = canvas.height
-        log_message(f"Canvas dimensions: {width}x{height}")
-        
-        # Calculate center coordinates
-        center_x = width / 2
-        center_y = height / 2.5  # Position pendulum centered in the upper part of canvas
+        The page starts on the math backend without NumPy. The worker,
+        compute-ahead mode, replays and the full trail call this before
+        they need it; from then on runs use NumPy trail storage, the
+        trajectory cache and the trail LOD filter.
         
-        # Draw a test rectangle to verify the canvas is working
+        Returns:
+            True if NumPy is available
+        """
+        if self.backend.name == "numpy":
+            return True
         try:
-            ctx.fillStyle = "#FF0000"
-            ctx.fillRect(center_x - 50, center_y - 50, 100, 100)
-            log_message("Canvas setup successful - Test rectangle drawn")
+            self.log_message("Loading NumPy...")
+            await self.host.load_packages(["numpy"])
+            if self.backend.name != "numpy":  # Unless a concurrent call got there first
+                from trail_lod import TrailDecimator
+                from trajectory_cache import TrajectoryCache
+                self.backend = get_backend("numpy")
+                self.trail_decimator = TrailDecimator(tolerance=1.0)
+                self.trajectory_cache = TrajectoryCache(max_bytes=32 * 1024 * 1024)
+                self.invalidate_trail_layer()
+            return True
         except Exception as e:
-            log_message(f"ERROR drawing test rectangle: {str(e)}")
+            self.log_message(f"ERROR loading NumPy: {str(e)}")
             return False
-            
-        return True
-    except Exception as e:
-        log_message(f"ERROR setting up canvas: {str(e)}")
-        return False
-
-def hex_to_rgba(hex_color, alpha=1.0):
-    """Convert hex color to rgba string."""
-    hex_color = hex_color.lstrip('#')
-    r = int(hex_color[0:2], 16)
-    g = int(hex_color[2:4], 16)
-    b = int(hex_color[4:6], 16)
-    return f"rgba({r}, {g}, {b}, {alpha})"
-
-def init_simulation():
-    """Initialize the simulation with user input values."""
-    global pendulum, running, max_time, last_theta1, last_theta2, last_sim_length, keep_full_trail, show_trail
     
-    try:
-        log_message("Initializing simulation...")
-        # Get user input values
-        theta1_input = js.document.getElementById("theta1")
-        theta2_input = js.document.getElementById("theta2")
-        sim_length_input = js.document.getElementById("simulation-length")
-        
-        if theta1_input is None or theta2_input is None or sim_length_input is None:
-            log_message("ERROR: Input elements not found!")
-            return False
-            
-        theta1_deg = float(theta1_input.value)
-        theta2_deg = float(theta2_input.value)
-        max_time = float(sim_length_input.value)
-        
-        log_message(f"Input values: theta1={theta1_deg}, theta2={theta2_deg}, max_time={max_time}")
+    async def start_numpy_modes(self, worker: bool, ahead: bool):
+        """
+        Switch to worker or compute-ahead mode once NumPy is loaded.
         
-        # Store the current values for later comparison
-        last_theta1 = theta1_deg
-        last_theta2 = theta2_deg
-        last_sim_length = max_time
-        
-        # Convert degrees to radians
-        theta1_rad = math.radians(theta1_deg)
-        theta2_rad = math.radians(theta2_deg)
-        
-        # Create pendulum object
-        log_message("Creating pendulum object...")
-        pendulum = DoublePendulum(theta1=theta1_rad, theta2=theta2_rad)
-        
-        # Update UI
-        update_time_display()
-        
-        # Set running state
-        running = False
-        
-        # Draw the initial state
-        draw()
-        
-        # Set up initial trail visibility
-        full_trail_container = js.document.getElementById("full-trail-container")
-        if full_trail_container:
-            full_trail_container.style.display = "flex"
-            
-        # Set "Show Trail" checkbox to checked by default
-        trail_checkbox = js.document.getElementById("show-trail")
-        if trail_checkbox:
-            trail_checkbox.checked = True
-            show_trail = True
-        
-        # Set "Keep Full Trail History" checkbox to unchecked by default
-        full_trail_checkbox = js.document.getElementById("keep-full-trail")
-        if full_trail_checkbox:
-            full_trail_checkbox.checked = False
-            keep_full_trail = False
-            # Update the pendulum's trail history to use the default limited history
-            if pendulum is not None:
-                log_message("Using limited trail history by default (1000 points)")
-                pendulum.set_max_history_length(1000)  # Default limit
-        
-        log_message("Simulation initialized successfully")
-        return True
-    except Exception as e:
-        log_message(f"ERROR initializing simulation: {str(e)}")
-        return False
-
-def toggle_simulation(event=None):
-    """Toggle the simulation between running and paused states."""
-    global running, animation_id, last_timestamp
+        Args:
+            worker: Run the physics in a Web Worker
+            ahead: Integrate each run up front (ignored with worker)
+        """
+        try:
+            if not await self.require_numpy():
+                return
+            self.use_worker = worker
+            self.compute_ahead = ahead and not worker
+            if worker:
+                self.start_worker()
+            if self.timeline is not None:
+                self.timeline.disabled = self.use_worker
+            # A run already started on the math backend is restarted in the new mode
+            if self.initialized:
+                self.restart_simulation()
+                self.toggle_simulation()
+        except Exception as e:
+            self.log_message(f"ERROR switching modes: {str(e)}")
     
-    try:
-        log_message("Toggle simulation called")
-        
-        # Check if input values have changed
-        theta1_input = js.document.getElementById("theta1")
-        theta2_input = js.document.getElementById("theta2")
-        sim_length_input = js.document.getElementById("simulation-length")
-        
-        values_changed = False
-        
-        if theta1_input and theta2_input and sim_length_input:
-            current_theta1 = float(theta1_input.value)
-            current_theta2 = float(theta2_input.value)
-            current_sim_length = float(sim_length_input.value)
-            
-            # Check if values have changed from last used values
-            if (last_theta1 is None or 
-                last_theta2 is None or 
-                last_sim_length is None or
-                current_theta1 != last_theta1 or 
-                current_theta2 != last_theta2 or
-                current_sim_length != last_sim_length):
-                values_changed = True
-                log_message("Input values have changed, restarting simulation")
-                
-                # Hide the restart notice if it's showing
-                restart_notice = js.document.getElementById("restart-notice")
-                if restart_notice:
-                    restart_notice.style.display = "none"
-                    restart_notice.classList.remove("flash")
-                
-                # Restart the simulation with new values
-                restart_simulation()
-                
-                # Use console log instead of updating debug output
-                log_message("Values changed - Simulation restarted automatically")
+    def start_worker(self):
+        """Start the Web Worker that integrates the pendulum off the main thread."""
+        self.log_message("Starting physics worker...")
+        self.physics_worker = self.host.start_worker("physics-worker.js", self.on_worker_message)
+    
+    def open_replay(self, data: bytes):
+        """
+        Switch the viewer to replaying a trajectory file.
         
-        # If simulation is not initialized, initialize it
-        if pendulum is None:
-            if not init_simulation():
-                log_message("Failed to initialize simulation")
+        Args:
+            data: Contents of a file written by trajectory.TrajectoryWriter
+                  (e.g. python -m cli run -o run.traj)
+        """
+        try:
+            from trajectory import TrajectoryFile
+            with open(REPLAY_PATH, "wb") as f:
+                f.write(data)
+            self.replay_file = TrajectoryFile(REPLAY_PATH)
+            self.log_message(f"Loaded trajectory: {len(self.replay_file)} rows, {self.replay_file.duration:.2f} s")
+            self.running = False
+            self.init_simulation()
+        except Exception as e:
+            self.log_message(f"ERROR loading trajectory: {str(e)}")
+    
+    async def fetch_replay(self, url):
+        """Download a trajectory file and replay it."""
+        try:
+            self.log_message(f"Fetching trajectory {url}...")
+            data = await self.host.fetch_bytes(url)
+            if await self.require_numpy():
+                self.open_replay(data)
+        except Exception as e:
+            self.log_message(f"ERROR fetching trajectory: {str(e)}")
+    
+    async def on_replay_file_selected(self, event):
+        """Replay the trajectory file picked in the replay-file input."""
+        try:
+            data = await self.host.read_selected_file(event)
+            if data is not None and await self.require_numpy():
+                self.open_replay(data)
+        except Exception as e:
+            self.log_message(f"ERROR reading trajectory file: {str(e)}")
+    
+    def setup_trail_layer(self):
+        """Create (or resize) the offscreen canvas that accumulates the trail."""
+        try:
+            if self.trail_layer is None:
+                self.trail_layer = self.host.create_element("canvas")
+                self.trail_ctx = CountingProxy(self.trail_layer.getContext("2d"), self.ffi_counter)
+            self.trail_layer.width = self.width
+            self.trail_layer.height = self.height
+            self.invalidate_trail_layer()
+        except Exception as e:
+            self.log_message(f"ERROR creating trail layer, falling back to full redraws: {str(e)}")
+            self.trail_layer = None
+            self.trail_ctx = None
+    
+    def setup_stroke_polyline(self):
+        """Create the JS helper used to stroke a whole trail in one call."""
+        try:
+            self.stroke_polyline = self.host.polyline_stroker()
+            self.host.expose("getFfiStats", self.get_ffi_stats)
+        except Exception as e:
+            self.log_message(f"ERROR creating polyline helper, using per-point drawing: {str(e)}")
+            self.stroke_polyline = None
+    
+    def get_ffi_stats(self):
+        """Report FFI call counts (exposed to JS as window.getFfiStats())."""
+        return self.host.to_object({"lastFrame": self.ffi_counter.last_frame,
+                                    "total": self.ffi_counter.total,
+                                    "frames": self.ffi_counter.frames,
+                                    "bulkTrail": self.bulk_trail and self.stroke_polyline is not None})
+    
+    def get_frame_stats(self):
+        """Report per-frame percentiles (exposed to JS as window.getFrameStats())."""
+        return self.host.to_object({"frames": self.profiler.frames,
+                                    "window": len(self.profiler),
+                                    "stats": self.profiler.summary()})
+    
+    def get_startup_timings(self):
+        """Report the page start milestones in ms (exposed to JS as window.getStartupTimings())."""
+        return self.host.to_object(dict(self.startup.marks))
+    
+    def toggle_profiler_overlay(self, event=None):
+        """Show or hide the profiler overlay (exposed to JS as window.toggleProfiler())."""
+        try:
+            if self.profiler_overlay is not None:
+                self.profiler_overlay.remove()
+                self.profiler_overlay = None
                 return
-        
-        # Only toggle running state if we didn't just restart
-        if not values_changed:
-            # Toggle running state
-            running = not running
-        else:
-            # Always start running after a restart
-            running = True
-        
-        # Update button text
-        play_button = js.document.getElementById("play-button")
-        if running:
-            log_message("Starting animation")
-            play_button.textContent = "Pause"
-            last_timestamp = None  # Reset the timestamp when starting
-            animation_id = js.window.requestAnimationFrame(create_proxy(animation_loop))
-        else:
-            log_message("Pausing animation")
-            play_button.textContent = "Play/Pause"
-            if animation_id is not None:
-                js.window.cancelAnimationFrame(animation_id)
-                animation_id = None
-                last_timestamp = None  # Reset timestamp on pause
-    except Exception as e:
-        log_message(f"ERROR toggling simulation: {str(e)}")
-
-def restart_simulation(event=None):
-    """Restart the simulation with new parameters."""
-    global running, animation_id, pendulum, keep_full_trail, last_timestamp
+            
+            self.profiler_overlay = self.host.create_element("pre")
+            self.profiler_overlay.id = "profiler-overlay"
+            style = self.profiler_overlay.style
+            style.position = "fixed"
+            style.top = "8px"
+            style.right = "8px"
+            style.margin = "0"
+            style.padding = "6px 8px"
+            style.background = "rgba(0, 0, 0, 0.7)"
+            style.color = "#ECF0F1"
+            style.font = "11px monospace"
+            style.zIndex = "1000"
+            style.pointerEvents = "none"
+            self.host.append_to_body(self.profiler_overlay)
+            self.update_profiler_overlay()
+        except Exception as e:
+            self.log_message(f"ERROR toggling profiler overlay: {str(e)}")
     
-    try:
-        log_message("Restarting simulation")
-        # Stop any running animation
-        if animation_id is not None:
-            js.window.cancelAnimationFrame(animation_id)
-            animation_id = None
-            last_timestamp = None  # Reset timestamp on restart
-        
-        # Initialize simulation with new parameters
-        init_simulation()
-        
-        # Set running state to false
-        running = False
-        
-        # Update button text
-        play_button = js.document.getElementById("play-button")
-        play_button.textContent = "Play/Pause"
-        
-        # Hide the restart notice
-        restart_notice = js.document.getElementById("restart-notice")
-        if restart_notice:
-            restart_notice.style.display = "none"
-            restart_notice.classList.remove("flash")
-        
-        # Draw initial state
-        draw()
-    except Exception as e:
-        log_message(f"ERROR restarting simulation: {str(e)}")
-
-def toggle_trail(event=None):
-    """Toggle the visibility of the tip trail."""
-    global show_trail, keep_full_trail
+    def update_profiler_overlay(self):
+        """Refresh the overlay text from the profiler."""
+        try:
+            if self.profiler_overlay is not None:
+                self.profiler_overlay.textContent = format_summary(self.profiler.summary(), len(self.profiler))
+        except Exception as e:
+            self.log_message(f"ERROR updating profiler overlay: {str(e)}")
     
-    try:
-        log_message("Toggling trail visibility")
-        show_trail = not show_trail
-        
-        # Update checkbox state
-        trail_checkbox = js.document.getElementById("show-trail")
-        trail_checkbox.checked = show_trail
-        
-        # Show or hide the full trail option based on trail visibility
-        full_trail_container = js.document.getElementById("full-trail-container")
-        if full_trail_container:
-            if show_trail:
+    def invalidate_trail_layer(self):
+        """Force the trail layer to be repainted from the full history."""
+        self.trail_layer_dirty = True
+        self.trail_layer_points = 0
+        if self.trail_decimator is not None:
+            self.trail_decimator.reset()
+    
+    def handle_resize(self, event=None):
+        """Pick up a changed canvas size and repaint the trail at the new size."""
+        try:
+            canvas = self.canvas
+            if canvas is None or (canvas.width == self.width and canvas.height == self.height):
+                return
+            self.width = canvas.width
+            self.height = canvas.height
+            self.center_x = self.width / 2
+            self.center_y = self.height / 2.5
+            self.setup_trail_layer()
+            self.draw()
+        except Exception as e:
+            self.log_message(f"ERROR handling resize: {str(e)}")
+    
+    def init_simulation(self):
+        """Initialize the simulation with user input values."""
+        try:
+            self.log_message("Initializing simulation...")
+            # Get user input values
+            theta1_input = self.host.get_element("theta1")
+            theta2_input = self.host.get_element("theta2")
+            sim_length_input = self.host.get_element("simulation-length")
+            
+            if theta1_input is None or theta2_input is None or sim_length_input is None:
+                self.log_message("ERROR: Input elements not found!")
+                return False
+            
+            theta1_deg = float(theta1_input.value)
+            theta2_deg = float(theta2_input.value)
+            self.max_time = float(sim_length_input.value)
+            
+            self.log_message(f"Input values: theta1={theta1_deg}, theta2={theta2_deg}, max_time={self.max_time}")
+            
+            # Store the current values for later comparison
+            self.last_theta1 = theta1_deg
+            self.last_theta2 = theta2_deg
+            self.last_sim_length = self.max_time
+            
+            # Convert degrees to radians
+            theta1_rad = math.radians(theta1_deg)
+            theta2_rad = math.radians(theta2_deg)
+            
+            # A new run needs a fresh trail layer
+            self.invalidate_trail_layer()
+            
+            # Keep what the previous run computed
+            if self.recorder is not None:
+                self.recorder.commit()
+            if self.precompute is not None and not self.precompute.done:
+                self.precompute.commit()
+            self.recorder = None
+            self.cached_run = None
+            self.keyframes = None
+            self.precompute = None
+            
+            # Create pendulum object (or a proxy for the one living in the worker)
+            if self.replay_file is not None:
+                from trajectory import TrajectoryPlayer
+                self.log_message("Replaying trajectory file...")
+                self.sim_target_time = 0.0
+                self.pendulum = TrajectoryPlayer(self.replay_file)
+                self.max_time = self.pendulum.duration
+            elif self.use_worker:
+                from physics_worker import WorkerClient
+                self.log_message("Creating worker-backed pendulum...")
+                self.worker_session += 1
+                self.sim_target_time = 0.0
+                self.pendulum = WorkerClient(self.send_to_worker, theta1_rad, theta2_rad,
+                                             session=self.worker_session, backend=self.backend.name)
+            elif self.trajectory_cache is None:
+                # No trajectory cache before NumPy is loaded: integrate live
+                self.log_message("Creating pendulum object...")
+                self.pendulum = DoublePendulum(theta1=theta1_rad, theta2=theta2_rad,
+                                               backend=self.backend.name)
+                self.keyframes = KeyframeIndex(self.pendulum)
+            else:
+                from trajectory import TrajectoryPlayer
+                from trajectory_cache import ComputeAhead, TrajectoryKey, TrajectoryRecorder
+                key = TrajectoryKey(theta1=theta1_rad, theta2=theta2_rad)
+                self.cached_run = self.trajectory_cache.get(key)
+                if self.compute_ahead and (self.cached_run is None
+                                           or len(self.cached_run) <= round(self.max_time / key.dt)):
+                    self.log_message("Computing the run ahead of playback...")
+                    self.precompute = ComputeAhead(self.trajectory_cache, key, self.max_time,
+                                                   prefix=self.cached_run)
+                    self.cached_run = None
+                    self.sim_target_time = 0.0
+                    self.pendulum = TrajectoryPlayer(self.precompute)
+                    self.start_compute_ahead()
+                elif self.cached_run is not None:
+                    self.log_message(f"Replaying cached run ({self.cached_run.duration:.2f} s)...")
+                    self.sim_target_time = 0.0
+                    self.pendulum = TrajectoryPlayer(self.cached_run)
+                    # Seeks past the cached part integrate from these keyframes
+                    self.keyframes = KeyframeIndex(key.create_pendulum())
+                    for row in self.cached_run.rows[::self.keyframes.interval].tolist():
+                        self.keyframes.record_state(*row[:5])
+                else:
+                    self.log_message("Creating pendulum object...")
+                    self.pendulum = DoublePendulum(theta1=theta1_rad, theta2=theta2_rad,
+                                                   backend=self.backend.name)
+                    self.recorder = TrajectoryRecorder(self.trajectory_cache, key)
+                    self.recorder.record(self.pendulum)
+                    self.keyframes = KeyframeIndex(self.pendulum)
+            
+            # Update UI
+            self.update_time_display()
+            
+            # Set running state
+            self.running = False
+            
+            # Draw the initial state
+            self.draw()
+            
+            # Set up initial trail visibility
+            full_trail_container = self.host.get_element("full-trail-container")
+            if full_trail_container:
                 full_trail_container.style.display = "flex"
-                # Make sure full trail option is checked when trail is shown
-                full_trail_checkbox = js.document.getElementById("keep-full-trail")
-                if full_trail_checkbox:
-                    full_trail_checkbox.checked = True
-                    keep_full_trail = True
-                    # Update the pendulum's trail history
-                    if pendulum is not None:
-                        log_message("Enabling unlimited trail history when trail is shown")
-                        pendulum.set_max_history_length(None)  # Unlimited
+            
+            # Set "Show Trail" checkbox to checked by default
+            trail_checkbox = self.host.get_element("show-trail")
+            if trail_checkbox:
+                trail_checkbox.checked = True
+                self.show_trail = True
+            
+            # Set "Keep Full Trail History" checkbox to unchecked by default
+            full_trail_checkbox = self.host.get_element("keep-full-trail")
+            if full_trail_checkbox:
+                full_trail_checkbox.checked = False
+                self.keep_full_trail = False
+                # Update the pendulum's trail history to use the default limited history
+                if self.pendulum is not None:
+                    self.log_message("Using limited trail history by default (1000 points)")
+                    self.pendulum.set_max_history_length(1000)  # Default limit
+            
+            self.log_message("Simulation initialized successfully")
+            return True
+        except Exception as e:
+            self.log_message(f"ERROR initializing simulation: {str(e)}")
+            return False
+    
+    def toggle_simulation(self, event=None):
+        """Toggle the simulation between running and paused states."""
+        try:
+            self.log_message("Toggle simulation called")
+            
+            # Check if input values have changed
+            theta1_input = self.host.get_element("theta1")
+            theta2_input = self.host.get_element("theta2")
+            sim_length_input = self.host.get_element("simulation-length")
+            
+            values_changed = False
+            
+            if theta1_input and theta2_input and sim_length_input:
+                current_theta1 = float(theta1_input.value)
+                current_theta2 = float(theta2_input.value)
+                current_sim_length = float(sim_length_input.value)
+                
+                # Check if values have changed from last used values
+                if (self.last_theta1 is None or
+                    self.last_theta2 is None or
+                    self.last_sim_length is None or
+                    current_theta1 != self.last_theta1 or
+                    current_theta2 != self.last_theta2 or
+                    current_sim_length != self.last_sim_length):
+                    values_changed = True
+                    self.log_message("Input values have changed, restarting simulation")
+                    
+                    # Hide the restart notice if it's showing
+                    restart_notice = self.host.get_element("restart-notice")
+                    if restart_notice:
+                        restart_notice.style.display = "none"
+                        restart_notice.classList.remove("flash")
+                    
+                    # Restart the simulation with new values
+                    self.restart_simulation()
+                    
+                    # Use console log instead of updating debug output
+                    self.log_message("Values changed - Simulation restarted automatically")
+            
+            # If simulation is not initialized, initialize it
+            if self.pendulum is None:
+                if not self.init_simulation():
+                    self.log_message("Failed to initialize simulation")
+                    return
+            
+            # Only toggle running state if we didn't just restart
+            if not values_changed:
+                # Toggle running state
+                self.running = not self.running
             else:
-                full_trail_container.style.display = "none"
-        
-        # Redraw
-        draw()
-    except Exception as e:
-        log_message(f"ERROR toggling trail: {str(e)}")
-
-def toggle_full_trail(event=None):
-    """Toggle between limited and unlimited trail history."""
-    global keep_full_trail
+                # Always start running after a restart
+                self.running = True
+            
+            # Update button text
+            play_button = self.host.get_element("play-button")
+            if self.running:
+                self.log_message("Starting animation")
+                play_button.textContent = "Pause"
+                self.last_timestamp = None  # Reset the timestamp when starting
+                self.accumulator = 0.0
+                self.animation_id = self.host.request_frame(self.animation_loop)
+            else:
+                self.log_message("Pausing animation")
+                play_button.textContent = "Play/Pause"
+                if self.animation_id is not None:
+                    self.host.cancel_frame(self.animation_id)
+                    self.animation_id = None
+                    self.last_timestamp = None  # Reset timestamp on pause
+        except Exception as e:
+            self.log_message(f"ERROR toggling simulation: {str(e)}")
     
-    try:
-        log_message("Toggling full trail option")
-        keep_full_trail = not keep_full_trail
-        
-        # Update checkbox state
-        full_trail_checkbox = js.document.getElementById("keep-full-trail")
-        full_trail_checkbox.checked = keep_full_trail
+    def restart_simulation(self, event=None):
+        """Restart the simulation with new parameters."""
+        try:
+            self.log_message("Restarting simulation")
+            # Stop any running animation
+            if self.animation_id is not None:
+                self.host.cancel_frame(self.animation_id)
+                self.animation_id = None
+                self.last_timestamp = None  # Reset timestamp on restart
+            
+            # Initialize simulation with new parameters
+            self.init_simulation()
+            self.previous_angles = None
+            self.render_alpha = 1.0
+            
+            # Set running state to false
+            self.running = False
+            
+            # Update button text
+            play_button = self.host.get_element("play-button")
+            play_button.textContent = "Play/Pause"
+            
+            # Hide the restart notice
+            restart_notice = self.host.get_element("restart-notice")
+            if restart_notice:
+                restart_notice.style.display = "none"
+                restart_notice.classList.remove("flash")
+            
+            # Draw initial state
+            self.draw()
+        except Exception as e:
+            self.log_message(f"ERROR restarting simulation: {str(e)}")
+    
+    def toggle_trail(self, event=None):
+        """Toggle the visibility of the tip trail."""
+        try:
+            self.log_message("Toggling trail visibility")
+            self.show_trail = not self.show_trail
+            self.invalidate_trail_layer()
+            
+            # Update checkbox state
+            trail_checkbox = self.host.get_element("show-trail")
+            trail_checkbox.checked = self.show_trail
+            
+            # Show or hide the full trail option based on trail visibility
+            full_trail_container = self.host.get_element("full-trail-container")
+            if full_trail_container:
+                if self.show_trail:
+                    full_trail_container.style.display = "flex"
+                    # Make sure full trail option is checked when trail is shown
+                    full_trail_checkbox = self.host.get_element("keep-full-trail")
+                    if full_trail_checkbox:
+                        full_trail_checkbox.checked = True
+                        self.keep_full_trail = True
+                        # Update the pendulum's trail history
+                        if self.pendulum is not None:
+                            self.log_message("Enabling unlimited trail history when trail is shown")
+                            self.pendulum.set_max_history_length(None)  # Unlimited
+                else:
+                    full_trail_container.style.display = "none"
+            
+            # Redraw
+            self.draw()
+        except Exception as e:
+            self.log_message(f"ERROR toggling trail: {str(e)}")
+    
+    def toggle_full_trail(self, event=None):
+        """Toggle between limited and unlimited trail history."""
+        try:
+            self.log_message("Toggling full trail option")
+            self.keep_full_trail = not self.keep_full_trail
+            self.invalidate_trail_layer()
+            
+            # Update checkbox state
+            full_trail_checkbox = self.host.get_element("keep-full-trail")
+            full_trail_checkbox.checked = self.keep_full_trail
+            
+            # Long trails are thinned by the LOD filter, which needs NumPy
+            if self.keep_full_trail:
+                self.host.spawn(self.require_numpy())
+            
+            # Update the pendulum's trail history length
+            if self.pendulum is not None:
+                if self.keep_full_trail:
+                    self.log_message("Enabling unlimited trail history")
+                    self.pendulum.set_max_history_length(None)  # Unlimited
+                else:
+                    self.log_message("Limiting trail history to 1000 points")
+                    self.pendulum.set_max_history_length(1000)  # Default limit
+            
+            # Redraw
+            self.draw()
+        except Exception as e:
+            self.log_message(f"ERROR toggling full trail: {str(e)}")
+    
+    def update_time_display(self):
+        """Update the time display in the UI."""
+        try:
+            if self.pendulum is not None:
+                current_time = self.pendulum.get_time()
+                time_display = self.host.get_element("time-display")
+                time_display.textContent = f"Time: {current_time:.2f}s / {self.max_time:.2f}s"
+                if self.playback_speed != 1.0:
+                    time_display.textContent += f" ({self.playback_speed:g}x)"
+                if self.precompute is not None and not self.precompute.done:
+                    time_display.textContent += f", computed {self.precompute.duration:.1f}s"
+                if self.timeline is not None:
+                    self.timeline.max = str(self.max_time)
+                    self.timeline.value = str(current_time)
+        except Exception as e:
+            self.log_message(f"ERROR updating time display: {str(e)}")
+    
+    def resume_cached_run(self):
+        """Continue a replayed cached run with live integration from its last state."""
+        try:
+            from trajectory_cache import TrajectoryRecorder
+            cached_run = self.cached_run
+            self.log_message(f"Cached run ends at {cached_run.duration:.2f} s, resuming integration")
+            resumed = cached_run.resume()
+            resumed.set_max_history_length(None if self.keep_full_trail else 1000)
+            resumed.load_tip_history(self.pendulum.get_tip_history())
+            self.recorder = TrajectoryRecorder(self.trajectory_cache, cached_run.key, prefix=cached_run)
+            self.pendulum = resumed
+            self.cached_run = None
+            self.accumulator = 0.0
+            self.previous_angles = None
+        except Exception as e:
+            self.log_message(f"ERROR resuming cached run: {str(e)}")
+    
+    def save_session(self, event=None):
+        """Store a snapshot of the running pendulum in localStorage (called on pagehide)."""
+        try:
+            # Replays and worker runs can be recreated from their inputs
+            if not isinstance(self.pendulum, DoublePendulum):
+                return
+            data = self.pendulum.snapshot({"max_time": self.max_time,
+                                           "theta1": self.last_theta1,
+                                           "theta2": self.last_theta2,
+                                           "keep_full_trail": self.keep_full_trail,
+                                           "show_trail": self.show_trail})
+            self.host.storage_set(SESSION_KEY, base64.b64encode(data).decode("ascii"))
+        except Exception as e:
+            # Typically a full storage quota; the session is simply not kept
+            self.log_message(f"ERROR saving session: {str(e)}")
+    
+    def restore_session(self):
+        """
+        Continue the run stored by save_session(), if there is one.
         
-        # Update the pendulum's trail history length
-        if pendulum is not None:
-            if keep_full_trail:
-                log_message("Enabling unlimited trail history")
-                pendulum.set_max_history_length(None)  # Unlimited
+        Returns:
+            True if a session was restored
+        """
+        try:
+            stored = self.host.storage_get(SESSION_KEY)
+            if not stored or self.use_worker or self.replay_file is not None:
+                return False
+            restored, session = read_snapshot(base64.b64decode(stored), self.backend.name)
+            if restored.time >= session["max_time"]:
+                return False
+            
+            self.log_message(f"Restoring session at t = {restored.time:.2f} s")
+            self.pendulum = restored
+            self.max_time = self.last_sim_length = session["max_time"]
+            self.last_theta1, self.last_theta2 = session["theta1"], session["theta2"]
+            self.keep_full_trail = session["keep_full_trail"]
+            self.show_trail = session["show_trail"]
+            # The run no longer starts at its initial state, so it is not cached
+            self.recorder = None
+            self.cached_run = None
+            if self.precompute is not None and not self.precompute.done:
+                self.precompute.commit()
+            self.precompute = None
+            self.keyframes = KeyframeIndex(restored)  # Seeks cannot go back before the restored time
+            self.accumulator = 0.0
+            self.previous_angles = None
+            
+            # Reflect the restored run in the UI
+            for element_id, value in (("theta1", self.last_theta1), ("theta2", self.last_theta2),
+                                      ("simulation-length", self.max_time)):
+                element = self.host.get_element(element_id)
+                if element:
+                    element.value = str(value)
+            trail_checkbox = self.host.get_element("show-trail")
+            if trail_checkbox:
+                trail_checkbox.checked = self.show_trail
+            full_trail_checkbox = self.host.get_element("keep-full-trail")
+            if full_trail_checkbox:
+                full_trail_checkbox.checked = self.keep_full_trail
+            
+            self.invalidate_trail_layer()
+            self.update_time_display()
+            self.draw()
+            return True
+        except Exception as e:
+            self.log_message(f"ERROR restoring session: {str(e)}")
+            self.host.storage_remove(SESSION_KEY)
+            return False
+    
+    def start_compute_ahead(self):
+        """Schedule compute_ahead_tick unless it is already pending."""
+        try:
+            if not self.ahead_scheduled:
+                self.ahead_scheduled = True
+                self.host.set_timeout(self.compute_ahead_tick, 0)
+        except Exception as e:
+            self.log_message(f"ERROR scheduling compute ahead: {str(e)}")
+    
+    def compute_ahead_tick(self):
+        """Integrate the next chunk of the precomputed run, then yield to the browser."""
+        try:
+            self.ahead_scheduled = False
+            precompute = self.precompute
+            if precompute is None or precompute.done:
+                return
+            if precompute.advance(AHEAD_BUDGET):
+                self.log_message(f"Run computed ahead ({precompute.duration:.2f} s)")
+                self.update_time_display()
             else:
-                log_message("Limiting trail history to 1000 points")
-                pendulum.set_max_history_length(1000)  # Default limit
+                self.start_compute_ahead()
+        except Exception as e:
+            self.log_message(f"ERROR computing ahead: {str(e)}")
+    
+    def set_playback_speed(self, speed):
+        """Set how many simulated seconds pass per real second (clamped to 0.1x-100x)."""
+        try:
+            self.playback_speed = min(max(float(speed), MIN_PLAYBACK_SPEED), MAX_PLAYBACK_SPEED)
+            self.log_message(f"Playback speed {self.playback_speed:g}x")
+            self.update_time_display()
+        except Exception as e:
+            self.log_message(f"ERROR setting playback speed: {str(e)}")
+    
+    def seek_to(self, t):
+        """
+        Jump the run to simulation time t, backwards or forwards.
         
-        # Redraw
-        draw()
-    except Exception as e:
-        log_message(f"ERROR toggling full trail: {str(e)}")
-
-def update_time_display():
-    """Update the time display in the UI."""
-    try:
-        if pendulum is not None:
-            current_time = pendulum.get_time()
-            time_display = js.document.getElementById("time-display")
-            time_display.textContent = f"Time: {current_time:.2f}s / {max_time:.2f}s"
-    except Exception as e:
-        log_message(f"ERROR updating time display: {str(e)}")
-
-def draw():
-    """Draw the pendulum and its trail on the canvas."""
-    try:
-        if pendulum is None:
-            log_message("Cannot draw: pendulum is None")
-            return
+        Replays seek in the recording; live runs restart from the nearest
+        keyframe before t, so a seek costs a bounded amount of integration.
+        """
+        try:
+            pendulum = self.pendulum
+            if pendulum is None or self.use_worker:
+                return
+            t = min(max(float(t), 0.0), self.max_time)
             
-        if ctx is None:
-            log_message("Cannot draw: context is None")
-            return
+            # Anything but a DoublePendulum is a TrajectoryPlayer here (worker runs returned above)
+            if not isinstance(pendulum, DoublePendulum) and (self.cached_run is None
+                                                             or t <= self.cached_run.duration):
+                pendulum.seek(t)
+                self.sim_target_time = pendulum.get_time()
+            elif self.keyframes is not None:
+                # What was recorded so far stays cached; the rest of the run is
+                # no longer contiguous with it
+                if self.recorder is not None:
+                    self.recorder.commit()
+                self.recorder = None
+                self.cached_run = None
+                self.pendulum = self.keyframes.seek(t, None if self.keep_full_trail else 1000)
+            else:
+                return
             
-        if canvas is None:
-            log_message("Cannot draw: canvas is None")
-            return
-        
-        # Clear canvas
-        ctx.clearRect(0, 0, width, height)
-        
-        # Get pendulum positions
-        x1, y1, x2, y2 = pendulum.get_positions()
+            self.accumulator = 0.0
+            self.previous_angles = None
+            self.render_alpha = 1.0
+            self.invalidate_trail_layer()
+            self.update_time_display()
+            self.draw()
+        except Exception as e:
+            self.log_message(f"ERROR seeking: {str(e)}")
+    
+    def setup_timeline(self):
+        """Bind the timeline slider to seek_to (creating it below the time display if the page has none)."""
+        try:
+            timeline = self.host.get_element("timeline")
+            if timeline is None:
+                time_display = self.host.get_element("time-display")
+                if time_display is None:
+                    self.log_message("WARNING: No time display to attach the timeline to")
+                    return
+                timeline = self.host.create_element("input")
+                timeline.type = "range"
+                timeline.id = "timeline"
+                time_display.insertAdjacentElement("afterend", timeline)
+            timeline.min = "0"
+            timeline.step = "0.01"
+            timeline.value = "0"
+            # The worker owns its pendulum, so worker runs cannot seek
+            timeline.disabled = self.use_worker
+            self.host.add_listener(timeline, "input", lambda event: self.seek_to(timeline.value))
+            self.timeline = timeline
+        except Exception as e:
+            self.log_message(f"ERROR setting up timeline: {str(e)}")
+    
+    def interpolated_positions(self):
+        """
+        Get the bob positions to render for the current frame.
         
-        # Scale and translate positions to canvas coordinates
-        px1 = center_x + x1 * scale
-        py1 = center_y + y1 * scale
-        px2 = center_x + x2 * scale
-        py2 = center_y + y2 * scale
+        Physics advances in whole steps of pendulum.dt, so the displayed time is
+        usually part way through the next step. Interpolating the angles between
+        the previous and current state (by render_alpha) keeps the motion smooth
+        at any display refresh rate.
         
-        # Draw trail if enabled
-        if show_trail:
-            tip_history = pendulum.get_tip_history()
-            if len(tip_history) > 1:
-                ctx.beginPath()
-                
-                # Start from the oldest point
-                first_point = tip_history[0]
-                ctx.moveTo(center_x + first_point[0] * scale, center_y + first_point[1] * scale)
-                
-                # Draw lines to each subsequent point
-                for i in range(1, len(tip_history)):
-                    x, y = tip_history[i]
-                    ctx.lineTo(center_x + x * scale, center_y + y * scale)
-                
-                # Set trail style
-                ctx.strokeStyle = "#FF5733"  # Bright orange
-                ctx.lineWidth = 2
-                ctx.stroke()
+        Returns:
+            Tuple of (x1, y1, x2, y2) coordinates
+        """
+        pendulum = self.pendulum
+        if self.previous_angles is None or self.render_alpha >= 1.0:
+            return pendulum.get_positions()
         
-        # Draw pendulum rods
-        ctx.beginPath()
-        ctx.moveTo(center_x, center_y)
-        ctx.lineTo(px1, py1)
-        ctx.lineTo(px2, py2)
-        ctx.strokeStyle = "#2C3E50"  # Dark blue
-        ctx.lineWidth = 3
-        ctx.stroke()
+        prev_theta1, prev_theta2 = self.previous_angles
+        theta1 = prev_theta1 + (pendulum.theta1 - prev_theta1) * self.render_alpha
+        theta2 = prev_theta2 + (pendulum.theta2 - prev_theta2) * self.render_alpha
         
-        # Draw pendulum bobs
-        # First bob
-        ctx.beginPath()
-        ctx.arc(px1, py1, 10, 0, 2 * np.pi)
-        ctx.fillStyle = "#3498DB"  # Blue
-        ctx.fill()
+        x1 = pendulum.length1 * math.sin(theta1)
+        y1 = -pendulum.length1 * math.cos(theta1)
+        x2 = x1 + pendulum.length2 * math.sin(theta2)
+        y2 = y1 - pendulum.length2 * math.cos(theta2)
+        return x1, y1, x2, y2
+    
+    def to_screen(self, points):
+        """
+        Convert (x, y) tip positions in simulation units to canvas pixels.
         
-        # Second bob
-        ctx.beginPath()
-        ctx.arc(px2, py2, 10, 0, 2 * np.pi)
-        ctx.fillStyle = "#E74C3C"  # Red
-        ctx.fill()
+        Args:
+            points: (n, 2) array, or a list of (x, y) tuples from a math backend trail
         
-        # Draw pivot point
-        ctx.beginPath()
-        ctx.arc(center_x, center_y, 5, 0, 2 * np.pi)
-        ctx.fillStyle = "#2C3E50"  # Dark blue
-        ctx.fill()
-    except Exception as e:
-        log_message(f"ERROR drawing: {str(e)}")
-
-def animation_loop(timestamp):
-    """Main animation loop."""
-    global animation_id, running, last_timestamp
+        Returns:
+            Canvas coordinates of the same kind as points
+        """
+        if isinstance(points, list):
+            scale, center_x, center_y = self.scale, self.center_x, self.center_y
+            return [(center_x + x * scale, center_y + y * scale) for x, y in points]
+        return points * self.scale + (self.center_x, self.center_y)
     
-    try:
-        if pendulum is None or not running:
-            return
+    def simplify_trail(self, coords):
+        """Drop consecutive canvas points that fall in the same pixel (once NumPy is loaded)."""
+        if self.trail_decimator is None:
+            return coords
+        from trail_lod import bucket_polyline
+        return bucket_polyline(coords)
+    
+    def stroke_trail(self, target_ctx, coords):
+        """
+        Stroke a polyline through trail points.
         
-        # Initialize last_timestamp if this is the first frame
-        if last_timestamp is None:
-            last_timestamp = timestamp
-            animation_id = js.window.requestAnimationFrame(create_proxy(animation_loop))
+        Args:
+            target_ctx: Canvas 2D context to draw on
+            coords: Array (or list) of (x, y) canvas coordinates; rows of
+                    NaN lift the pen
+        """
+        if len(coords) < 2:
             return
         
-        # Calculate the elapsed time in seconds since the last frame
-        elapsed = (timestamp - last_timestamp) / 1000.0  # Convert to seconds
-        last_timestamp = timestamp
-        
-        # Ensure we don't take too large steps (can happen if tab was in background)
-        if elapsed > 0.1:  # Cap maximum step size to 100ms
-            elapsed = 0.1
-        
-        # Check if simulation time has exceeded max time
-        if pendulum.get_time() >= max_time:
-            running = False
-            play_button = js.document.getElementById("play-button")
-            play_button.textContent = "Play/Pause"
-            last_timestamp = None  # Reset timestamp
+        if self.bulk_trail and self.stroke_polyline is not None:
+            # Cross the FFI once with a Float32Array and let JS build the path
+            if isinstance(coords, list):
+                packed = array("f", [value for point in coords for value in point])
+            else:
+                packed = coords.astype("float32").ravel()
+            self.stroke_polyline(unwrap(target_ctx), self.host.to_typed_array(packed), "#FF5733", 2)
+            self.ffi_counter.add(2)  # The helper call and the typed array conversion
             return
         
-        # Calculate how many physics steps to take
-        steps_to_take = max(1, round(elapsed / pendulum.dt))
-        
-        # Calculate adjusted dt to match real elapsed time
-        adjusted_dt = elapsed / steps_to_take
+        target_ctx.beginPath()
         
-        # Temporarily store the original dt
-        original_dt = pendulum.dt
-        
-        # Set the adjusted dt for more accurate time progression
-        pendulum.dt = adjusted_dt
+        # Draw lines between consecutive points, starting a new sub-path after a break
+        pen_down = False
+        for x, y in coords:
+            if math.isnan(x):
+                pen_down = False
+            elif pen_down:
+                target_ctx.lineTo(x, y)
+            else:
+                target_ctx.moveTo(x, y)
+                pen_down = True
         
-        # Update simulation state
-        for _ in range(steps_to_take):
-            pendulum.step()
+        # Set trail style
+        target_ctx.strokeStyle = "#FF5733"  # Bright orange
+        target_ctx.lineWidth = 2
+        target_ctx.lineJoin = "round"
+        target_ctx.stroke()
+    
+    def update_trail_decimator(self):
+        """
+        Feed the tip points added since the last frame to the LOD decimator.
         
-        # Restore the original dt
-        pendulum.dt = original_dt
+        Returns:
+            The decimated canvas coordinates to draw for the new points
+        """
+        new_points = self.pendulum.get_tip_history(self.trail_decimator.source_count)
+        return self.trail_decimator.extend(self.to_screen(new_points))
+    
+    def update_trail_layer(self):
+        """
+        Bring the offscreen trail layer up to date.
         
-        # Update UI
-        update_time_display()
+        Only the segments added since the last frame are stroked (through
+        the LOD decimator once NumPy is loaded). The whole history is
+        replayed only after invalidate_trail_layer(), i.e. on resize,
+        restart or when a trail option is toggled.
+        """
+        if self.trail_layer_dirty:
+            self.trail_ctx.clearRect(0, 0, self.width, self.height)
+            self.trail_layer_dirty = False
         
-        # Draw the pendulum
-        draw()
+        if self.trail_decimator is not None:
+            self.stroke_trail(self.trail_ctx, self.update_trail_decimator())
+            return
         
-        # Schedule next frame
-        animation_id = js.window.requestAnimationFrame(create_proxy(animation_loop))
-    except Exception as e:
-        log_message(f"ERROR in animation loop: {str(e)}")
-        running = False
-
-def init():
-    """Initialize the application."""
-    global initialized
+        # Start at the last point already drawn so the new segment joins the old one
+        pendulum = self.pendulum
+        new_points = pendulum.get_tip_history(max(self.trail_layer_points - 1, 0))
+        self.trail_layer_points = pendulum.get_tip_history_length()
+        self.stroke_trail(self.trail_ctx, self.to_screen(new_points))
     
-    # Check if already initialized to avoid double initialization
-    if initialized:
-        log_message("Already initialized, skipping")
-        return
+    def draw(self):
+        """Draw the pendulum and its trail on the canvas."""
+        try:
+            if self.pendulum is None:
+                self.log_message("Cannot draw: pendulum is None")
+                return
+            
+            if self.ctx is None:
+                self.log_message("Cannot draw: context is None")
+                return
+            
+            if self.canvas is None:
+                self.log_message("Cannot draw: canvas is None")
+                return
+            
+            ctx = self.ctx
+            center_x, center_y, scale = self.center_x, self.center_y, self.scale
+            
+            # Clear canvas
+            ctx.clearRect(0, 0, self.width, self.height)
+            
+            # Get pendulum positions, interpolated between the last two physics states
+            x1, y1, x2, y2 = self.interpolated_positions()
+            
+            # Scale and translate positions to canvas coordinates
+            px1 = center_x + x1 * scale
+            py1 = center_y + y1 * scale
+            px2 = center_x + x2 * scale
+            py2 = center_y + y2 * scale
+            
+            # Draw trail if enabled
+            if self.show_trail:
+                if self.keep_full_trail and self.trail_layer is not None:
+                    # The full history only grows, so draw just the new segments
+                    # onto the persistent layer and composite it
+                    self.update_trail_layer()
+                    ctx.drawImage(self.trail_layer, 0, 0)
+                elif self.keep_full_trail and self.trail_decimator is not None:
+                    # No offscreen layer: redraw the cached level-of-detail trail
+                    self.update_trail_decimator()
+                    self.stroke_trail(ctx, self.trail_decimator.coords())
+                elif self.keep_full_trail:
+                    # Neither a layer nor NumPy for the LOD filter: stroke the whole trail
+                    self.stroke_trail(ctx, self.to_screen(self.pendulum.get_tip_history()))
+                else:
+                    # A limited trail drops old points, so redraw it every frame
+                    self.stroke_trail(ctx, self.simplify_trail(self.to_screen(self.pendulum.get_tip_history())))
+            
+            # Draw the rods, bobs and pivot (shared with the first pose drawn at startup)
+            draw_pendulum(ctx, center_x, center_y, px1, py1, px2, py2)
+            
+            # Close the FFI call count for this frame
+            self.ffi_counter.end_frame()
+        except Exception as e:
+            self.log_message(f"ERROR drawing: {str(e)}")
     
-    try:
-        log_message("Initializing application...")
-        
-        # Set up canvas
-        if not setup_canvas():
-            log_message("Failed to set up canvas")
-            # Debug div has been removed, so don't try to write to it
-            return
-        
-        # Attach event handlers
-        log_message("Attaching event handlers...")
+    def animation_loop(self, timestamp):
+        """
+        Main animation loop.
         
+        Uses a fixed-timestep accumulator: real elapsed time is added to
+        accumulator and the physics always advances in whole steps of
+        pendulum.dt, carrying any remainder over to the next frame. The frame
+        is drawn part way between the last two physics states, so results do not
+        depend on the display refresh rate.
+        """
         try:
-            # Get UI elements
-            play_button = js.document.getElementById("play-button")
-            restart_button = js.document.getElementById("restart-button")
-            trail_checkbox = js.document.getElementById("show-trail")
-            full_trail_checkbox = js.document.getElementById("keep-full-trail")
-            
-            if play_button is None:
-                log_message("ERROR: Play button not found!")
+            pendulum = self.pendulum
+            if pendulum is None or not self.running:
                 return
-                
-            if restart_button is None:
-                log_message("ERROR: Restart button not found!")
+            
+            # Initialize last_timestamp if this is the first frame
+            if self.last_timestamp is None:
+                self.last_timestamp = timestamp
+                self.accumulator = 0.0
+                self.profiler.begin_frame(timestamp)  # Only starts the interval count
+                self.animation_id = self.host.request_frame(self.animation_loop)
+                return
+            
+            # Calculate the elapsed time in seconds since the last frame
+            elapsed = (timestamp - self.last_timestamp) / 1000.0  # Convert to seconds
+            self.last_timestamp = timestamp
+            self.profiler.begin_frame(timestamp)
+            
+            # Ignore long gaps (e.g. the tab was in the background) instead of catching up
+            if elapsed > MAX_FRAME_TIME:
+                elapsed = MAX_FRAME_TIME
+            elapsed *= self.playback_speed
+            
+            # Check if simulation time has exceeded max time (a precomputed run
+            # ends on its last row, which rounding may put just below max_time)
+            precompute = self.precompute
+            finished = (precompute is not None and precompute.done
+                        and pendulum.get_time() >= precompute.duration)
+            if pendulum.get_time() >= self.max_time or finished:
+                self.running = False
+                self.render_alpha = 1.0
+                if self.recorder is not None:
+                    self.recorder.commit()
+                play_button = self.host.get_element("play-button")
+                play_button.textContent = "Play/Pause"
+                self.last_timestamp = None  # Reset timestamp
+                self.draw()
                 return
+            
+            # A cached run shorter than the requested length continues live
+            if self.cached_run is not None and pendulum.get_time() >= self.cached_run.duration:
+                self.resume_cached_run()
+                pendulum = self.pendulum
+            
+            steps_taken = 0
+            if not isinstance(pendulum, DoublePendulum):
+                # Physics runs in the worker (or was recorded earlier): request
+                # the new target time and draw the latest state available
+                self.sim_target_time = min(self.max_time, self.sim_target_time + elapsed)
+                if precompute is not None:
+                    # Wait for the computation rather than running ahead of it
+                    self.sim_target_time = min(self.sim_target_time, precompute.duration)
+                pendulum.advance_to(self.sim_target_time)
+                self.render_alpha = 1.0
+            else:
+                # Advance the physics in exact dt steps
+                accumulator = self.accumulator + elapsed
+                recorder = self.recorder
+                keyframes = self.keyframes
+                max_time = self.max_time
+                dt = pendulum.dt
+                while accumulator >= dt and steps_taken < MAX_STEPS_PER_FRAME:
+                    if pendulum.get_time() >= max_time:
+                        accumulator = 0.0
+                        break
+                    self.previous_angles = (pendulum.theta1, pendulum.theta2)
+                    pendulum.step()
+                    if recorder is not None:
+                        recorder.record(pendulum)
+                    if keyframes is not None:
+                        keyframes.record(pendulum)
+                    accumulator -= dt
+                    steps_taken += 1
+                
+                # Drop time we could not simulate this frame rather than falling further behind
+                if steps_taken == MAX_STEPS_PER_FRAME and accumulator >= dt:
+                    accumulator %= dt
+                self.accumulator = accumulator
                 
-            if trail_checkbox is None:
-                log_message("ERROR: Trail checkbox not found!")
+                # Render part way towards the next physics state
+                self.render_alpha = accumulator / dt
+            self.profiler.lap("physics")
+            
+            # Update UI
+            self.update_time_display()
+            
+            # Draw the pendulum
+            self.draw()
+            self.profiler.lap("draw")
+            self.profiler.end_frame(steps=steps_taken, trail=pendulum.get_tip_history_length(),
+                                    ffi=self.ffi_counter.last_frame)
+            if self.profiler_overlay is not None and self.profiler.frames % OVERLAY_EVERY == 0:
+                self.update_profiler_overlay()
+            if "first-frame" not in self.startup.marks:
+                self.startup.mark("first-frame")
+                self.log_message(self.startup.report())
+            
+            # Schedule next frame
+            self.animation_id = self.host.request_frame(self.animation_loop)
+        except Exception as e:
+            self.log_message(f"ERROR in animation loop: {str(e)}")
+            self.running = False
+    
+    def init(self, event=None):
+        """Initialize the application."""
+        host = self.host
+        
+        # Check if already initialized to avoid double initialization
+        if self.initialized:
+            self.log_message("Already initialized, skipping")
+            return
+        
+        try:
+            self.log_message("Initializing application...")
+            
+            # Set up canvas
+            if not self.setup_canvas():
+                self.log_message("Failed to set up canvas")
+                # Debug div has been removed, so don't try to write to it
                 return
             
-            # Create proxied event handlers
-            toggle_proxy = create_proxy(toggle_simulation)
-            restart_proxy = create_proxy(restart_simulation)
-            trail_proxy = create_proxy(toggle_trail)
-            full_trail_proxy = create_proxy(toggle_full_trail)
+            # ?worker moves the physics off the main thread and ?ahead integrates
+            # each run up front. Both need NumPy, so the page starts on the math
+            # backend and switches when it has loaded.
+            worker = host.query_flag("worker")
+            ahead = host.query_flag("ahead")
+            if worker or ahead:
+                host.spawn(self.start_numpy_modes(worker, ahead))
             
-            # Add event listeners
-            play_button.addEventListener("click", toggle_proxy)
-            restart_button.addEventListener("click", restart_proxy)
-            trail_checkbox.addEventListener("change", trail_proxy)
-            if full_trail_checkbox:
-                full_trail_checkbox.addEventListener("change", full_trail_proxy)
+            # ?per-point-trail restores one lineTo call per point (for comparison)
+            self.bulk_trail = not host.query_flag("per-point-trail")
             
-            # Add event listeners for input fields
-            theta1_input = js.document.getElementById("theta1")
-            theta2_input = js.document.getElementById("theta2")
-            sim_length_input = js.document.getElementById("simulation-length")
+            # ?speed=10 plays runs 10x faster
+            if host.query_param("speed"):
+                self.set_playback_speed(host.query_param("speed"))
             
-            if theta1_input and theta2_input and sim_length_input:
-                # Create a function to notify user to restart
-                def notify_restart(event=None):
-                    restart_notice = js.document.getElementById("restart-notice")
-                    if restart_notice:
-                        restart_notice.style.display = "block"
-                        js.setTimeout(lambda: restart_notice.classList.add("flash"), 100)
+            # ?replay=<url> plays back a recorded trajectory file instead of integrating
+            replay_url = host.query_param("replay")
+            if replay_url:
+                host.spawn(self.fetch_replay(replay_url))
+            
+            # Attach event handlers
+            self.log_message("Attaching event handlers...")
+            
+            try:
+                # Get UI elements
+                play_button = host.get_element("play-button")
+                restart_button = host.get_element("restart-button")
+                trail_checkbox = host.get_element("show-trail")
+                full_trail_checkbox = host.get_element("keep-full-trail")
+                
+                if play_button is None:
+                    self.log_message("ERROR: Play button not found!")
+                    return
+                
+                if restart_button is None:
+                    self.log_message("ERROR: Restart button not found!")
+                    return
+                
+                if trail_checkbox is None:
+                    self.log_message("ERROR: Trail checkbox not found!")
+                    return
                 
                 # Add event listeners
-                theta1_input.addEventListener("change", create_proxy(notify_restart))
-                theta2_input.addEventListener("change", create_proxy(notify_restart))
-                sim_length_input.addEventListener("change", create_proxy(notify_restart))
+                host.add_listener(play_button, "click", self.toggle_simulation)
+                host.add_listener(restart_button, "click", self.restart_simulation)
+                host.add_listener(trail_checkbox, "change", self.toggle_trail)
+                if full_trail_checkbox:
+                    host.add_listener(full_trail_checkbox, "change", self.toggle_full_trail)
+                host.add_window_listener("resize", self.handle_resize)
+                replay_input = host.get_element("replay-file")
+                if replay_input:
+                    host.add_listener(replay_input, "change", self.on_replay_file_selected)
                 
-                # Also make input fields trigger restart on Enter key
-                def handle_enter_key(event):
-                    if event.key == "Enter":
-                        restart_simulation()
+                # Add event listeners for input fields
+                theta1_input = host.get_element("theta1")
+                theta2_input = host.get_element("theta2")
+                sim_length_input = host.get_element("simulation-length")
                 
-                theta1_input.addEventListener("keyup", create_proxy(handle_enter_key))
-                theta2_input.addEventListener("keyup", create_proxy(handle_enter_key))
-                sim_length_input.addEventListener("keyup", create_proxy(handle_enter_key))
-            else:
-                log_message("WARNING: Could not find all input elements")
+                if theta1_input and theta2_input and sim_length_input:
+                    # Create a function to notify user to restart
+                    def notify_restart(event=None):
+                        restart_notice = host.get_element("restart-notice")
+                        if restart_notice:
+                            restart_notice.style.display = "block"
+                            host.set_timeout(lambda: restart_notice.classList.add("flash"), 100)
+                    
+                    # Also make input fields trigger restart on Enter key
+                    def handle_enter_key(event):
+                        if event.key == "Enter":
+                            self.restart_simulation()
+                    
+                    for field in (theta1_input, theta2_input, sim_length_input):
+                        host.add_listener(field, "change", notify_restart)
+                        host.add_listener(field, "keyup", handle_enter_key)
+                else:
+                    self.log_message("WARNING: Could not find all input elements")
+                
+                self.log_message("Event handlers attached successfully")
+                
+                # Also create direct event handler bindings for debugging
+                host.expose("toggleSimulation", self.toggle_simulation)
+                host.expose("restartSimulation", self.restart_simulation)
+                host.expose("toggleTrail", self.toggle_trail)
+                host.expose("toggleFullTrail", self.toggle_full_trail)
+                host.expose("loadTrajectory", lambda url: host.spawn(self.fetch_replay(url)))
+                host.expose("saveSession", self.save_session)
+                host.expose("restoreSession", self.restore_session)
+                host.expose("seekTo", self.seek_to)
+                host.expose("setPlaybackSpeed", self.set_playback_speed)
+                host.expose("getFrameStats", self.get_frame_stats)
+                host.expose("resetFrameStats", self.profiler.reset)
+                host.expose("toggleProfiler", self.toggle_profiler_overlay)
+                host.expose("getStartupTimings", self.get_startup_timings)
+                
+                # ?profile shows the frame statistics overlay from the start
+                if host.query_flag("profile"):
+                    self.toggle_profiler_overlay()
+                speed_input = host.get_element("playback-speed")
+                if speed_input:
+                    speed_input.value = str(self.playback_speed)
+                    host.add_listener(speed_input, "change",
+                                      lambda event: self.set_playback_speed(speed_input.value))
+                
+                # Keep the run across reloads and closed tabs
+                host.add_window_listener("pagehide", self.save_session)
+            
+            except Exception as e:
+                self.log_message(f"ERROR attaching event handlers: {str(e)}")
+                return
+            
+            self.setup_timeline()
+            
+            # Initialize simulation
+            self.log_message("Setting up initial simulation...")
+            self.init_simulation()
+            self.restore_session()
+            self.startup.mark("first-draw")
             
-            log_message("Event handlers attached successfully")
+            # Mark as initialized
+            self.initialized = True
+            self.startup.mark("ready")
             
-            # Also create direct event handler bindings for debugging
-            js.window.toggleSimulation = toggle_proxy
-            js.window.restartSimulation = restart_proxy
-            js.window.toggleTrail = trail_proxy
-            js.window.toggleFullTrail = full_trail_proxy
+            # Auto-start the simulation; the loop begins on the next animation frame
+            self.toggle_simulation()
             
+            self.log_message("Initialization complete!")
         except Exception as e:
-            log_message(f"ERROR attaching event handlers: {str(e)}")
-            return
-        
-        # Initialize simulation
-        log_message("Setting up initial simulation...")
-        init_simulation()
-        
-        # Auto-start the simulation to demonstrate it works
-        js.setTimeout(create_proxy(lambda: toggle_simulation()), 1000)
-        
-        # Mark as initialized
-        initialized = True
-        
-        log_message("Initialization complete!")
-    except Exception as e:
-        log_message(f"ERROR during initialization: {str(e)}")
+            self.log_message(f"ERROR during initialization: {str(e)}")
+    
+    def update_debug_element(self, message, is_error=False):
+        """Safely update debug element if it exists"""
+        try:
+            debug_div = self.host.get_element("debug-output")
+            if debug_div:
+                style = 'class="error"' if is_error else 'style="color: blue;"'
+                debug_div.innerHTML += f'<p {style}>{message}</p>'
+        except:
+            pass  # Ignore errors if debug element doesn't exist
 
-# Function to safely update debug element if it exists
-def update_debug_element(message, is_error=False):
-    """Safely update debug element if it exists"""
-    try:
-        debug_div = js.document.getElementById("debug-output")
-        if debug_div:
-            style = 'class="error"' if is_error else 'style="color: blue;"'
-            debug_div.innerHTML += f'<p {style}>{message}</p>'
-    except:
-        pass  # Ignore errors if debug element doesn't exist
 
-# Run initialization when the script loads
-log_message("Script loaded, running manual initialization...")
+def hex_to_rgba(hex_color, alpha=1.0):
+    """Convert hex color to rgba string."""
+    hex_color = hex_color.lstrip('#')
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
 
-# Use try/except for safety
-try:
-    # Initialize after a short delay to ensure DOM is ready
-    js.setTimeout(create_proxy(init), 500)
+# The controller driving the page (created when the app starts in the browser)
+controller = None
+
+
+def start(host, startup=None):
+    """
+    Create the page's controller on a host and initialize it (safe to call more than once).
+    
+    Args:
+        host: BrowserHost (or FakeHost)
+        startup: StartupTimer with the milestones reached before the app was imported
+    """
+    global controller
     
-    # Also register a load event handler as backup
-    js.window.addEventListener("load", create_proxy(init))
+    if controller is None:
+        controller = SimulationController(host, startup)
+    controller.init()
+
+
+def init(event=None):
+    """Initialize the application in the browser."""
+    start(BrowserHost())
+
+
+# Run initialization when the page loads app.py as its script (startup.py
+# imports it instead); elsewhere the module only provides
+# SimulationController (see host.FakeHost)
+if __name__ == "__main__" and BrowserHost.available():
+    browser = BrowserHost()
+    browser.log("Script loaded, initializing once the DOM is ready...")
     
-    # Create a global manual init function
-    js.window.manualInit = create_proxy(init)
+    # Use try/except for safety
+    try:
+        # Initialize as soon as the DOM is parsed instead of after a fixed delay
+        browser.when_ready(init)
+        
+        # Create a global manual init function
+        browser.expose("manualInit", init)
     
-except Exception as e:
-    log_message(f"ERROR during script initialization: {str(e)}") 
\ No newline at end of file
+    except Exception as e:
+        browser.log(f"ERROR setting up initialization: {str(e)}")
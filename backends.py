@@ -0,0 +1,235 @@
+import importlib.util
+import struct
+import sys
+from collections import deque
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+# Storage backends of DoublePendulum: plain Python ("math", no dependencies)
+# and NumPy arrays ("numpy", zero-copy trail views)
+BACKENDS = ("math", "numpy")
+
+Point = Tuple[float, float]
+
+# Approximate size of one stored (x, y) tuple: the tuple and its two floats
+_POINT_NBYTES = sys.getsizeof((0.0, 0.0)) + 2 * sys.getsizeof(0.0)
+
+
+class ListRingHistory:
+    """
+    Fixed-capacity history of (x, y) points in a deque, without NumPy.
+    
+    Same interface as trail_history.RingHistory, but view() returns a list
+    of (x, y) tuples (a copy, so it stays valid after later appends).
+    """
+    
+    def __init__(self, capacity: int):
+        """
+        Create an empty history.
+        
+        Args:
+            capacity: Maximum number of points to keep
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._points = deque(maxlen=capacity)
+    
+    def __len__(self) -> int:
+        return len(self._points)
+    
+    @property
+    def capacity(self) -> int:
+        """Maximum number of points kept before the oldest are dropped."""
+        return self._points.maxlen
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate number of bytes used by the stored points."""
+        return sys.getsizeof(self._points) + len(self._points) * _POINT_NBYTES
+    
+    def append(self, x: float, y: float):
+        """Add a point, dropping the oldest one if the history is full."""
+        self._points.append((x, y))
+    
+    def view(self, start: int = 0) -> List[Point]:
+        """Get the stored points from index start on, oldest first."""
+        return list(islice(self._points, max(start, 0), None))
+    
+    def clear(self):
+        """Remove all points."""
+        self._points.clear()
+    
+    def resize(self, capacity: int):
+        """Change the capacity, keeping the newest points that still fit."""
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._points = deque(self._points, maxlen=capacity)
+    
+    def extend(self, points: Iterable[Point]):
+        """Append many points at once, oldest first."""
+        self._points.extend(points)
+
+
+class ListHistory:
+    """
+    Unbounded history of (x, y) points in a list, without NumPy.
+    
+    Same interface as trail_history.ChunkedHistory (apart from chunks()).
+    """
+    
+    def __init__(self):
+        self._points: List[Point] = []
+    
+    def __len__(self) -> int:
+        return len(self._points)
+    
+    @property
+    def capacity(self) -> None:
+        """List histories are unbounded."""
+        return None
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate number of bytes used by the stored points."""
+        return sys.getsizeof(self._points) + len(self._points) * _POINT_NBYTES
+    
+    def append(self, x: float, y: float):
+        """Add a point."""
+        self._points.append((x, y))
+    
+    def view(self, start: int = 0) -> List[Point]:
+        """Get the stored points from index start on, oldest first."""
+        return self._points[max(start, 0):]
+    
+    def clear(self):
+        """Remove all points."""
+        self._points = []
+    
+    def extend(self, points: Iterable[Point]):
+        """Append many points at once, oldest first."""
+        self._points.extend(points)
+
+
+class MathBackend:
+    """
+    Pure-Python backend: trail points are (x, y) tuples.
+    
+    Needs nothing beyond the standard library, so a single pendulum can be
+    simulated (e.g. in Pyodide) without loading NumPy. Each trail point
+    takes about seven times the memory of the NumPy backend.
+    """
+    
+    name = "math"
+    
+    def ring_history(self, capacity: int) -> ListRingHistory:
+        return ListRingHistory(capacity)
+    
+    def chunked_history(self) -> ListHistory:
+        return ListHistory()
+    
+    def points(self, points) -> List[Point]:
+        """Convert (x, y) rows (a list, an (n, 2) array, ...) into history points."""
+        return [(float(x), float(y)) for x, y in points]
+    
+    def pack_points(self, points: Sequence[Point]) -> bytes:
+        """Encode points as little-endian float64 x, y pairs."""
+        return struct.pack(f"<{2 * len(points)}d", *(value for point in points for value in point))
+    
+    def unpack_points(self, data: bytes, count: int, offset: int = 0) -> List[Point]:
+        """Decode count points written by pack_points, starting at offset."""
+        values = struct.unpack_from(f"<{2 * count}d", data, offset)
+        return list(zip(values[0::2], values[1::2]))
+
+
+class NumpyBackend:
+    """
+    NumPy backend: trail points live in float64 arrays (trail_history).
+    
+    Reading the trail returns (n, 2) array views without copying, which is
+    what the renderer and the trajectory tools work with.
+    """
+    
+    name = "numpy"
+    
+    def __init__(self):
+        import numpy
+        from trail_history import ChunkedHistory, RingHistory
+        self._np = numpy
+        self._ring = RingHistory
+        self._chunked = ChunkedHistory
+    
+    def ring_history(self, capacity: int):
+        return self._ring(capacity)
+    
+    def chunked_history(self):
+        return self._chunked()
+    
+    def points(self, points):
+        """Convert (x, y) rows (a list, an (n, 2) array, ...) into an (n, 2) float64 array."""
+        return self._np.asarray(points, dtype=self._np.float64).reshape(-1, 2)
+    
+    def pack_points(self, points) -> bytes:
+        """Encode points as little-endian float64 x, y pairs."""
+        return self._np.ascontiguousarray(points, dtype="<f8").tobytes()
+    
+    def unpack_points(self, data: bytes, count: int, offset: int = 0):
+        """Decode count points written by pack_points, starting at offset."""
+        return self._np.frombuffer(data, dtype="<f8", count=2 * count, offset=offset).reshape(count, 2)
+
+
+_backends = {}
+
+
+def numpy_available() -> bool:
+    """Check whether NumPy can be imported (without importing it)."""
+    return sys.modules.get("numpy") is not None or importlib.util.find_spec("numpy") is not None
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    Get a storage backend.
+    
+    Args:
+        name: One of BACKENDS, or None to pick "numpy" when it is installed
+              and "math" otherwise
+    
+    Returns:
+        The (shared) backend instance
+    """
+    if name is None:
+        name = "numpy" if numpy_available() else "math"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {BACKENDS}")
+    backend = _backends.get(name)
+    if backend is None:
+        backend = _backends[name] = MathBackend() if name == "math" else NumpyBackend()
+    return backend
+
+
+def resize_history(history, length: Optional[int], backend):
+    """
+    Apply a new maximum trail length, switching storage kinds if needed.
+    
+    Args:
+        history: Current trail history (from backend)
+        length: Maximum number of points to keep (at least 10). If None,
+                keep unlimited history.
+        backend: Backend that creates the replacement history
+    
+    Returns:
+        The history to use from now on (history itself if it was resized in place)
+    """
+    if length is None:
+        # Switch to chunked storage, which grows without dropping points
+        if history.capacity is None:
+            return history
+        resized = backend.chunked_history()
+    else:
+        length = max(10, length)  # Ensure at least 10 points
+        if history.capacity is not None:
+            history.resize(length)
+            return history
+        resized = backend.ring_history(length)
+    resized.extend(history.view())
+    return resized
@@ -0,0 +1,64 @@
+"""
+Chaos map benchmark: time-to-flip maps with and without early termination.
+
+For each grid size, computes the flip-time map with lane compaction and
+the energy cutoff, and (unless --skip-dense) the same map integrating
+every cell for the full max_time. Reports wall time, pendulum steps
+actually integrated and whether both maps agree.
+
+Usage:
+    python benchmarks/bench_chaos_map.py [--sizes 256 1024] [--max-time SECONDS] [--skip-dense]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chaos_map import FlipTimeMap, map_angles
+
+
+def run(size: int, max_time: float, dense: bool) -> dict:
+    """Compute one map and measure it."""
+    angles = map_angles(size)
+    if dense:
+        flip_map = FlipTimeMap(angles, angles, max_time, energy_cutoff=False, compact_fraction=np.inf)
+    else:
+        flip_map = FlipTimeMap(angles, angles, max_time)
+    start = time.perf_counter()
+    times = flip_map.run()
+    elapsed = time.perf_counter() - start
+    return {
+        "times": times,
+        "seconds": elapsed,
+        "lane_steps": flip_map.lane_steps,
+        "pruned": flip_map.pruned,
+        "flipped": int(np.isfinite(times).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024], help="Grid resolutions")
+    parser.add_argument("--max-time", type=float, default=10.0, help="Simulated seconds per cell")
+    parser.add_argument("--skip-dense", action="store_true", help="Do not run the full-length baseline")
+    args = parser.parse_args()
+    
+    print(f"{'size':>6} {'mode':<8} {'time[s]':>8} {'cells/s':>10} {'lane steps':>12} "
+          f"{'pruned':>8} {'flipped':>8} {'same':>5}")
+    for size in args.sizes:
+        fast = run(size, args.max_time, dense=False)
+        results = [("early", fast)]
+        if not args.skip_dense:
+            results.append(("dense", run(size, args.max_time, dense=True)))
+        for mode, r in results:
+            same = np.array_equal(r["times"], fast["times"])
+            print(f"{size:>6} {mode:<8} {r['seconds']:>8.2f} {size * size / r['seconds']:>10,.0f} "
+                  f"{r['lane_steps']:>12,} {r['pruned']:>8,} {r['flipped']:>8,} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Energy drift benchmark: RK4 versus the symplectic integrators.
+
+Runs the same initial condition with each integrator and reports the
+relative energy error per step. The symplectic runs use --dt; RK4 gets a
+smaller step chosen so that it spends the same number of derivative
+evaluations over the run ("equal cost"), plus a run at the same dt.
+
+Usage:
+    python benchmarks/bench_energy.py [--duration SECONDS] [--dt DT]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from double_pendulum import DoublePendulum
+
+
+def run(integrator: str, dt: float, duration: float) -> dict:
+    """Integrate for the given duration and measure the energy error."""
+    pendulum = DoublePendulum(theta1=2.0, theta2=2.5, dt=dt, integrator=integrator)
+    pendulum.set_max_history_length(10)
+    e0 = pendulum.energy()
+    steps = round(duration / dt)
+    
+    max_error = 0.0
+    start = time.perf_counter()
+    for _ in range(steps):
+        pendulum.step()
+        max_error = max(max_error, abs(pendulum.energy() - e0))
+    elapsed = time.perf_counter() - start
+    
+    stats = pendulum.get_integrator_stats()
+    return {
+        "integrator": integrator,
+        "dt": dt,
+        "steps": steps,
+        "nfev": stats["nfev"],
+        "seconds": elapsed,
+        "final_rel_error": abs(pendulum.energy() - e0) / abs(e0),
+        "max_rel_error": max_error / abs(e0),
+        "drift_per_step": abs(pendulum.energy() - e0) / abs(e0) / steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=100.0, help="Simulated seconds per run")
+    parser.add_argument("--dt", type=float, default=0.01, help="Step of the symplectic runs")
+    args = parser.parse_args()
+    
+    results = [run("gl4", args.dt, args.duration), run("midpoint", args.dt, args.duration)]
+    
+    # Give RK4 the same derivative-evaluation budget as the 4th order symplectic run
+    gl4_cost_per_step = results[0]["nfev"] / results[0]["steps"]
+    results.append(run("rk4", args.dt * 4 / gl4_cost_per_step, args.duration))
+    results.append(run("rk4", args.dt, args.duration))
+    
+    print(f"{'integrator':<10} {'dt':>9} {'nfev':>9} {'time[s]':>8} "
+          f"{'max rel dE':>11} {'final rel dE':>12} {'drift/step':>11}")
+    for r in results:
+        print(f"{r['integrator']:<10} {r['dt']:>9.5f} {r['nfev']:>9} {r['seconds']:>8.2f} "
+              f"{r['max_rel_error']:>11.2e} {r['final_rel_error']:>12.2e} {r['drift_per_step']:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for DoublePendulum.step().
+
+Compares the current allocation-free scalar RK4 step against the original
+NumPy-array implementation (reproduced below as the "before" baseline)
+and reports steps per second for each. That both produce bit-for-bit
+identical states is checked by tests/test_double_pendulum.py.
+
+Usage:
+    python benchmarks/bench_step.py [--steps N] [--repeats R]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from double_pendulum import DoublePendulum
+
+
+class LegacyDoublePendulum(DoublePendulum):
+    """DoublePendulum with the original array-based RK4 step."""
+    
+    def _legacy_derivatives(self):
+        t1, t2 = self.theta1, self.theta2
+        w1, w2 = self.omega1, self.omega2
+        m1, m2 = self.mass1, self.mass2
+        l1, l2 = self.length1, self.length2
+        g = self.gravity
+        
+        delta = t1 - t2
+        denom = (2*m1 + m2 - m2 * np.cos(2*delta))
+        
+        num1 = -g*(2*m1 + m2)*np.sin(t1) - m2*g*np.sin(t1 - 2*t2)
+        num2 = -2*np.sin(delta)*m2*((w2**2)*l2 + (w1**2)*l1*np.cos(delta))
+        alpha1 = (num1 + num2) / (l1 * denom)
+        
+        num1 = 2*np.sin(delta)
+        num2 = (w1**2)*l1*(m1 + m2) + g*(m1 + m2)*np.cos(t1) + (w2**2)*l2*m2*np.cos(delta)
+        alpha2 = (num1 * num2) / (l2 * denom)
+        
+        return w1, w2, alpha1, alpha2
+    
+    def _compute_derivatives_vec(self, y):
+        theta1_orig, theta2_orig = self.theta1, self.theta2
+        omega1_orig, omega2_orig = self.omega1, self.omega2
+        self.theta1, self.theta2 = y[0], y[1]
+        self.omega1, self.omega2 = y[2], y[3]
+        derivatives = self._legacy_derivatives()
+        self.theta1, self.theta2 = theta1_orig, theta2_orig
+        self.omega1, self.omega2 = omega1_orig, omega2_orig
+        return derivatives
+    
+    def step(self):
+        dt = self.dt
+        y = np.array([self.theta1, self.theta2, self.omega1, self.omega2])
+        k1 = dt * np.array(self._compute_derivatives_vec(y))
+        k2 = dt * np.array(self._compute_derivatives_vec(y + 0.5 * k1))
+        k3 = dt * np.array(self._compute_derivatives_vec(y + 0.5 * k2))
+        k4 = dt * np.array(self._compute_derivatives_vec(y + k3))
+        y_new = y + (1/6) * (k1 + 2*k2 + 2*k3 + k4)
+        self.theta1 = y_new[0]
+        self.theta2 = y_new[1]
+        self.omega1 = y_new[2]
+        self.omega2 = y_new[3]
+        self._update_positions()
+        self.time += dt
+
+
+def time_steps(pendulum_cls, steps: int, repeats: int) -> float:
+    """Return the best steps/second over several repeats."""
+    best = 0.0
+    for _ in range(repeats):
+        pendulum = pendulum_cls(theta1=2.0, theta2=2.5)
+        start = time.perf_counter()
+        for _ in range(steps):
+            pendulum.step()
+        elapsed = time.perf_counter() - start
+        best = max(best, steps / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=20000, help="Steps per timing run")
+    parser.add_argument("--repeats", type=int, default=3, help="Timing runs per implementation")
+    args = parser.parse_args()
+    
+    before = time_steps(LegacyDoublePendulum, args.steps, args.repeats)
+    after = time_steps(DoublePendulum, args.steps, args.repeats)
+    
+    print(f"before (NumPy arrays): {before:12,.0f} steps/s")
+    print(f"after  (scalar math):  {after:12,.0f} steps/s")
+    print(f"speedup:               {after / before:12.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Benchmark suite: physics core and rendering path, with JSON results.
+
+Measures DoublePendulum.step() throughput per integrator (and on the
+pure-Python "math" backend), the cost of trail history appends at
+1k/100k/1M points, SimulationController.draw() and the whole frame loop
+on a host.FakeHost (a canvas context that records its calls and a
+manual clock, so no browser is needed), the time from interpreter start
+to the first drawn pose and animated frame, and DoublePendulumBatch /
+ParameterSweep throughput as the number of pendulums grows. Results can be written as JSON and compared against an
+earlier run to catch regressions between commits.
+
+Usage:
+    python benchmarks/bench_suite.py [--quick] [--only step history draw loop startup batch sweep]
+                                     [--output results.json] [--compare old.json] [--threshold 0.1]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from double_pendulum import INTEGRATORS, DoublePendulum, DoublePendulumBatch
+from host import FakeHost
+from sweep import ParameterSweep, angle_grid
+from trail_history import ChunkedHistory, RingHistory
+
+BENCHMARKS = ("step", "history", "draw", "loop", "startup", "batch", "sweep")
+
+
+def result(name: str, value: float, unit: str, better: str = "higher", **details) -> dict:
+    """One measurement; better is "higher" or "lower" (used by --compare)."""
+    return {"name": name, "value": value, "unit": unit, "better": better, **details}
+
+
+def best_rate(run, count: int, repeats: int) -> float:
+    """Best count/second over several calls of run()."""
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def bench_step(quick: bool) -> list:
+    """Single-pendulum step throughput for every integrator, and for RK4 on the "math" backend."""
+    steps = 5000 if quick else 20000
+    results = []
+    cases = [(integrator, integrator, None) for integrator in INTEGRATORS]
+    cases.append(("rk4.math", "rk4", "math"))
+    for name, integrator, backend in cases:
+        def run():
+            pendulum = DoublePendulum(theta1=2.0, theta2=2.5, integrator=integrator, backend=backend)
+            for _ in range(steps):
+                pendulum.step()
+        results.append(result(f"step.{name}", best_rate(run, steps, 3), "steps/s"))
+    return results
+
+
+def bench_history(quick: bool) -> list:
+    """Cost of one append to a trail that already holds n points."""
+    rng = np.random.default_rng(0)
+    appended = rng.standard_normal((20000 if quick else 100000, 2)).tolist()
+    results = []
+    for n in (1000, 100000, 1000000):
+        points = rng.standard_normal((n, 2))
+        for kind, history in (("ring", RingHistory(n)), ("chunked", ChunkedHistory())):
+            history.extend(points)
+            start = time.perf_counter()
+            for x, y in appended:
+                history.append(x, y)
+            elapsed = time.perf_counter() - start
+            results.append(result(f"history.{kind}.{n}", elapsed / len(appended) * 1e9, "ns/append",
+                                  better="lower"))
+    return results
+
+
+def bench_draw(quick: bool) -> list:
+    """draw() time and FFI calls per frame for the trail drawing strategies."""
+    from app import SimulationController
+    from ffi_counter import CountingProxy
+    
+    frames = 100 if quick else 300
+    full_points = 20000 if quick else 100000
+    host = FakeHost()
+    controller = SimulationController(host)
+    host.spawn(controller.require_numpy())  # The full-trail cases use the LOD filter
+    controller.setup_canvas()
+    context = host.canvas.getContext("2d")
+    
+    # A pendulum with a realistic full trail, shared by the full-trail cases
+    source = DoublePendulum(theta1=2.0, theta2=2.5, backend="numpy")
+    source.set_max_history_length(None)
+    for _ in range(full_points):
+        source.step()
+    
+    results = []
+    for name, keep_full, bulk, layer in (("limited.bulk", False, True, False),
+                                         ("limited.per_point", False, False, False),
+                                         ("full.layer", True, True, True),
+                                         ("full.lod", True, True, False)):
+        pendulum = DoublePendulum(theta1=2.0, theta2=2.5, backend="numpy")
+        pendulum.set_max_history_length(None if keep_full else 1000)
+        pendulum.load_tip_history(source.get_tip_history() if keep_full else source.get_tip_history()[-1000:])
+        pendulum.theta1, pendulum.theta2 = source.theta1, source.theta2
+        pendulum.omega1, pendulum.omega2 = source.omega1, source.omega2
+        
+        context.calls.clear()
+        controller.pendulum = pendulum
+        controller.keep_full_trail = keep_full
+        controller.bulk_trail = bulk
+        controller.trail_layer = host.create_element("canvas") if layer else None
+        controller.trail_ctx = CountingProxy(context, controller.ffi_counter) if layer else None
+        controller.invalidate_trail_layer()
+        controller.draw()  # The first frame replays the whole trail
+        
+        elapsed = 0.0
+        ffi_calls = 0
+        for _ in range(frames):
+            pendulum.step()
+            pendulum.step()
+            start = time.perf_counter()
+            controller.draw()
+            elapsed += time.perf_counter() - start
+            ffi_calls += controller.ffi_counter.last_frame
+        # draw() logs and swallows its errors; do not report a failed frame as a fast one
+        if context.calls["fill"] < frames or host.errors:
+            raise RuntimeError(f"draw() did not complete in the {name} case")
+        
+        points = pendulum.get_tip_history_length()
+        results.append(result(f"draw.{name}", elapsed / frames * 1000, "ms/frame", better="lower",
+                              trail_points=points))
+        results.append(result(f"draw.{name}.ffi", ffi_calls / frames, "calls/frame", better="lower",
+                              trail_points=points))
+    return results
+
+
+def bench_loop(quick: bool) -> list:
+    """
+    The whole app on a FakeHost: frame cost from the profiler while playing
+    at 60 Hz, and the time to restart a run.
+    """
+    from app import SimulationController
+    
+    frames = 300 if quick else 1200
+    host = FakeHost(sim_length=frames / 60 + 10)
+    controller = SimulationController(host)
+    host.spawn(controller.require_numpy())  # The restart below replays from the trajectory cache
+    controller.init()
+    if not controller.running:
+        raise RuntimeError("the simulation did not start")
+    host.run_frames(frames)
+    if host.errors:
+        raise RuntimeError(f"the frame loop failed: {host.errors[0]}")
+    
+    stats = controller.profiler.summary()
+    results = []
+    for field in ("physics", "draw"):
+        results.append(result(f"loop.{field}.p50", stats[field]["p50"], "ms/frame", better="lower"))
+        results.append(result(f"loop.{field}.p99", stats[field]["p99"], "ms/frame", better="lower"))
+    results.append(result("loop.ffi.p50", stats["ffi"]["p50"], "calls/frame", better="lower"))
+    
+    # A restart with unchanged inputs replays the run from the trajectory cache
+    start = time.perf_counter()
+    controller.restart_simulation()
+    elapsed = time.perf_counter() - start
+    results.append(result("loop.restart", elapsed * 1000, "ms", better="lower",
+                          cached=controller.cached_run is not None))
+    return results
+
+
+# Run in a fresh interpreter: the startup path on a FakeHost, timed on the wall clock
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import asyncio, json, sys
+from host import FakeHost
+import startup
+host = FakeHost()
+timer = startup.StartupTimer(lambda: (time.perf_counter() - start) * 1000)
+asyncio.run(startup.start(host, timer))
+host.run_frames(2)
+print(json.dumps({"marks": timer.marks, "numpy_loaded": "numpy" in sys.modules, "errors": host.errors}))
+"""
+
+
+def bench_startup(quick: bool) -> list:
+    """Time from interpreter start to the first pose and the first animated frame."""
+    runs = 3 if quick else 7
+    best = {}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        report = json.loads(output)
+        if report["errors"] or "first-frame" not in report["marks"]:
+            raise RuntimeError(f"the app did not start: {report['errors']}")
+        for name, ms in report["marks"].items():
+            best[name] = min(best.get(name, ms), ms)
+    return [result("startup.first_pose", best["first-pose"], "ms", better="lower"),
+            result("startup.ready", best["ready"], "ms", better="lower"),
+            result("startup.first_frame", best["first-frame"], "ms", better="lower",
+                   numpy_loaded=report["numpy_loaded"])]
+
+
+def bench_batch(quick: bool) -> list:
+    """DoublePendulumBatch throughput as the batch grows."""
+    sizes = (1, 16, 256, 4096) if quick else (1, 16, 256, 4096, 65536)
+    results = []
+    for n in sizes:
+        steps = min(max(400000 // n, 20), 2000)
+        rng = np.random.default_rng(0)
+        theta1, theta2 = rng.uniform(-np.pi, np.pi, (2, n))
+        
+        def run():
+            batch = DoublePendulumBatch(theta1, theta2)
+            for _ in range(steps):
+                batch.step()
+        results.append(result(f"batch.{n}", best_rate(run, n * steps, 2), "pendulum-steps/s"))
+    return results
+
+
+def bench_sweep(quick: bool) -> list:
+    """ParameterSweep throughput (all CPUs) as the grid grows, including process startup."""
+    grids = (16, 64) if quick else (16, 64, 128)
+    results = []
+    for grid in grids:
+        angles = np.linspace(-np.pi, np.pi, grid)
+        theta1, theta2 = angle_grid(angles, angles)
+        sweep = ParameterSweep(theta1, theta2, duration=1.0)
+        start = time.perf_counter()
+        sweep.run()
+        elapsed = time.perf_counter() - start
+        results.append(result(f"sweep.{grid * grid}", len(sweep) * sweep.steps / elapsed,
+                              "pendulum-steps/s", seconds=elapsed))
+    return results
+
+
+def environment() -> dict:
+    """Where and on what the results were measured."""
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> bool:
+    """
+    Print the change of every result against a baseline file.
+    
+    Returns:
+        True if no result got worse by more than threshold (a fraction)
+    """
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    
+    ok = True
+    print(f"\ncompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old is None or old["value"] == 0:
+            continue
+        change = r["value"] / old["value"] - 1
+        worse = -change if r["better"] == "higher" else change
+        flag = "REGRESSION" if worse > threshold else ""
+        ok &= not flag
+        print(f"  {r['name']:<28} {old['value']:>14,.2f} -> {r['value']:>14,.2f} {r['unit']:<16} "
+              f"{change:>+7.1%} {flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for a fast check")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS,
+                        help="Benchmarks to run")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown reported as a regression (exit status 1)")
+    args = parser.parse_args()
+    
+    functions = {"step": bench_step, "history": bench_history, "draw": bench_draw,
+                 "loop": bench_loop, "startup": bench_startup, "batch": bench_batch, "sweep": bench_sweep}
+    results = []
+    for name in BENCHMARKS:
+        if name not in args.only:
+            continue
+        for r in functions[name](args.quick):
+            print(f"{r['name']:<28} {r['value']:>16,.2f} {r['unit']}", flush=True)
+            results.append(r)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "quick": args.quick, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"wrote {args.output}")
+    
+    if args.compare and not compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Parameter sweep scaling benchmark: throughput versus number of worker processes.
+
+Integrates the same (theta1, theta2) grid with 1, 2, 4, ... workers up to
+the number of CPUs and reports pendulum-steps per second and the speedup
+over a single worker. Results are checked against the single-worker run.
+
+Usage:
+    python benchmarks/bench_sweep.py [--grid N] [--duration SECONDS] [--max-workers W]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep import ParameterSweep, angle_grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--grid", type=int, default=128, help="Grid points per angle")
+    parser.add_argument("--duration", type=float, default=10.0, help="Simulated seconds per pendulum")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="Largest pool size")
+    args = parser.parse_args()
+    
+    angles = np.linspace(-np.pi, np.pi, args.grid)
+    theta1, theta2 = angle_grid(angles, angles)
+    
+    counts = [1]
+    while counts[-1] * 2 <= args.max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+    
+    print(f"{args.grid}x{args.grid} grid, {args.duration} s each, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'time[s]':>8} {'steps/s':>12} {'speedup':>8} {'identical':>9}")
+    reference = baseline = None
+    for workers in counts:
+        sweep = ParameterSweep(theta1, theta2, args.duration, workers=workers)
+        start = time.perf_counter()
+        states = sweep.run()
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference, baseline = states, elapsed
+        rate = len(sweep) * sweep.steps / elapsed
+        print(f"{workers:>7} {elapsed:>8.2f} {rate:>12,.0f} {baseline / elapsed:>8.2f} "
+              f"{str(np.array_equal(states, reference)):>9}")
+
+
+if __name__ == "__main__":
+    main()
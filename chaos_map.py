@@ -0,0 +1,280 @@
+import math
+import struct
+import zlib
+from typing import Callable, Optional
+
+import numpy as np
+
+from double_pendulum import BATCH_INTEGRATORS, DoublePendulumBatch
+from sweep import angle_grid
+
+
+# Colour stops of the map palette, from fast flips (or strong chaos) to
+# slow ones. Cells that never flip are drawn black.
+_PALETTE_POSITIONS = (0.0, 0.25, 0.5, 0.75, 1.0)
+_PALETTE_COLORS = ((255, 255, 224), (253, 174, 97), (215, 48, 39), (116, 42, 131), (38, 24, 95))
+
+
+def hanging_angle(gravity: float) -> float:
+    """
+    Angle of an arm hanging at rest.
+    
+    With the y = -l*cos(theta) convention of DoublePendulum a negative
+    gravity pulls towards theta = pi and a positive one towards theta = 0.
+    """
+    return math.pi if gravity < 0 else 0.0
+
+
+def map_angles(resolution: int, gravity: float = -9.8) -> np.ndarray:
+    """
+    Cell-centre angles covering one turn around the hanging position.
+    
+    Cell centres never land exactly on the upright position, which would
+    count as an immediate flip.
+    
+    Args:
+        resolution: Number of cells
+        gravity: Gravitational acceleration (selects the hanging angle)
+    
+    Returns:
+        Angles in (down - pi, down + pi), shape (resolution,)
+    """
+    offsets = (np.arange(resolution) + 0.5) / resolution * 2 * np.pi - np.pi
+    return hanging_angle(gravity) + offsets
+
+
+class FlipTimeMap:
+    """
+    Time-to-flip map of the second arm over a grid of initial angles.
+    
+    Every cell starts at rest at (theta1, theta2). The second arm flips
+    when it swings over the top, i.e. when it gets more than pi away from
+    the hanging position. The whole grid is one DoublePendulumBatch; a
+    cell stops being integrated as soon as it flips, and finished lanes
+    are compacted out of the batch once they make up compact_fraction of
+    it, so each step costs only as much as the cells still running.
+    
+    Cells whose energy is below the minimum potential energy of any pose
+    with the second arm upright can never flip. With energy_cutoff they
+    are marked as never flipping without being integrated at all.
+    """
+    
+    def __init__(self, theta1_values, theta2_values,
+                 max_time: float = 10.0,
+                 length1: float = 1.0,
+                 length2: float = 1.0,
+                 mass1: float = 1.0,
+                 mass2: float = 1.0,
+                 gravity: float = -9.8,
+                 dt: float = 0.01,
+                 integrator: str = "rk4",
+                 energy_cutoff: bool = True,
+                 compact_fraction: float = 0.1):
+        """
+        Describe a map.
+        
+        Args:
+            theta1_values: First-arm angles, one per column (radians)
+            theta2_values: Second-arm angles, one per row (radians)
+            max_time: Cells that have not flipped by then are given np.inf
+            length1, length2, mass1, mass2, gravity: Physical parameters
+            dt: Time step (the resolution of the flip times)
+            integrator: "rk4" or "rk45"
+            energy_cutoff: Skip cells that cannot flip energetically
+            compact_fraction: Compact the batch when this fraction of its
+                lanes has finished
+        """
+        if integrator not in BATCH_INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator!r}, expected one of {BATCH_INTEGRATORS}")
+        
+        self.theta1, self.theta2 = angle_grid(theta1_values, theta2_values)
+        self.shape = self.theta1.shape
+        self.max_time = max_time
+        self.length1, self.length2 = length1, length2
+        self.mass1, self.mass2 = mass1, mass2
+        self.gravity = gravity
+        self.dt = dt
+        self.integrator = integrator
+        self.energy_cutoff = energy_cutoff
+        self.compact_fraction = compact_fraction
+        
+        # Work counters, filled in by run()
+        self.lane_steps = 0  # Pendulum steps actually integrated
+        self.pruned = 0      # Cells skipped by the energy cutoff
+    
+    def flip_energy(self) -> float:
+        """Lowest energy at which the second arm can reach the upright position."""
+        g = abs(self.gravity)
+        return g * (self.mass2 * self.length2 - (self.mass1 + self.mass2) * self.length1)
+    
+    def run(self, progress: Optional[Callable[[float, int], None]] = None) -> np.ndarray:
+        """
+        Integrate the grid.
+        
+        Args:
+            progress: Optional callback progress(time, active) called after
+                every step with the simulation time and the number of cells
+                still running
+        
+        Returns:
+            Flip times, shape (len(theta2_values), len(theta1_values)), with
+            np.inf for cells that did not flip within max_time
+        """
+        down = hanging_angle(self.gravity)
+        
+        # Shift the initial angles into (down - pi, down + pi] so a flip is
+        # simply |theta2 - down| > pi (the dynamics are 2*pi periodic)
+        theta1 = np.ravel(self.theta1 - down + np.pi) % (2 * np.pi) + down - np.pi
+        theta2 = np.ravel(self.theta2 - down + np.pi) % (2 * np.pi) + down - np.pi
+        
+        batch = DoublePendulumBatch(theta1, theta2,
+                                    length1=self.length1, length2=self.length2,
+                                    mass1=self.mass1, mass2=self.mass2,
+                                    gravity=self.gravity, dt=self.dt,
+                                    integrator=self.integrator)
+        times = np.full(len(batch), np.inf)
+        lanes = np.arange(len(batch))  # Grid cell of every batch lane
+        
+        self.lane_steps = 0
+        self.pruned = 0
+        if self.energy_cutoff:
+            can_flip = batch.energy() >= self.flip_energy()
+            self.pruned = int(len(batch) - can_flip.sum())
+            batch.compact(can_flip)
+            lanes = lanes[can_flip]
+        
+        active = np.ones(len(batch), dtype=bool)
+        finished = 0  # Lanes finished since the last compaction
+        steps = round(self.max_time / self.dt)
+        for _ in range(steps):
+            if len(batch) == 0:
+                break
+            batch.step()
+            self.lane_steps += len(batch)
+            
+            flipped = np.abs(batch.theta2 - down) > np.pi
+            flipped &= active
+            if flipped.any():
+                times[lanes[flipped]] = batch.time
+                active &= ~flipped
+                finished += int(flipped.sum())
+                
+                if finished >= self.compact_fraction * len(batch):
+                    batch.compact(active)
+                    lanes = lanes[active]
+                    active = np.ones(len(batch), dtype=bool)
+                    finished = 0
+            
+            if progress is not None:
+                progress(batch.time, len(batch) - finished)
+        
+        return times.reshape(self.shape)
+
+
+def flip_time_map(theta1_values, theta2_values, max_time: float = 10.0,
+                  progress: Optional[Callable[[float, int], None]] = None, **options) -> np.ndarray:
+    """
+    Compute a time-to-flip map.
+    
+    Shorthand for FlipTimeMap(theta1_values, theta2_values, max_time, **options).run(progress).
+    """
+    return FlipTimeMap(theta1_values, theta2_values, max_time, **options).run(progress)
+
+
+def lyapunov_map(theta1_values, theta2_values, duration: float = 20.0,
+                 renormalize_every: int = 10, **options) -> np.ndarray:
+    """
+    Compute the maximal Lyapunov exponent over a grid of initial angles.
+    
+    Every cell starts at rest and the whole grid is integrated as one
+    DoublePendulumBatch together with its tangent vectors, so the cost is
+    about twice that of a plain trajectory over the same duration.
+    
+    Args:
+        theta1_values: First-arm angles, one per column (radians)
+        theta2_values: Second-arm angles, one per row (radians)
+        duration: Time over which growth is averaged
+        renormalize_every: Steps between renormalizations of the tangent vectors
+        **options: Further DoublePendulumBatch keyword arguments
+                   (lengths, masses, gravity, dt)
+    
+    Returns:
+        Exponents in 1/s, shape (len(theta2_values), len(theta1_values))
+    """
+    theta1, theta2 = angle_grid(theta1_values, theta2_values)
+    batch = DoublePendulumBatch(theta1.ravel(), theta2.ravel(), **options)
+    return batch.lyapunov_exponents(duration, renormalize_every).reshape(theta1.shape)
+
+
+def _colorize(level: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Map levels in [0, 1] through the palette; invalid cells are black."""
+    image = np.zeros(level.shape + (3,), dtype=np.uint8)
+    for channel in range(3):
+        values = np.interp(level, _PALETTE_POSITIONS, [c[channel] for c in _PALETTE_COLORS])
+        image[..., channel] = np.where(valid, np.round(values), 0)
+    return image[::-1]
+
+
+def flip_time_image(times: np.ndarray, dt: float, max_time: float) -> np.ndarray:
+    """
+    Colour a flip-time map.
+    
+    Times are mapped on a log scale from dt to max_time; cells that never
+    flipped are black. Rows are reversed so theta2 increases upwards.
+    
+    Args:
+        times: Flip times from FlipTimeMap.run()
+        dt: Time step of the map
+        max_time: Maximum time of the map
+    
+    Returns:
+        RGB image, shape times.shape + (3,), dtype uint8
+    """
+    flipped = np.isfinite(times)
+    level = np.zeros(times.shape)
+    level[flipped] = np.log(np.maximum(times[flipped], dt) / dt) / math.log(max_time / dt)
+    return _colorize(level, flipped)
+
+
+def lyapunov_image(exponents: np.ndarray) -> np.ndarray:
+    """
+    Colour a Lyapunov map.
+    
+    Exponents are mapped linearly from zero (regular motion, dark) to the
+    largest exponent in the map (bright). Rows are reversed so theta2
+    increases upwards.
+    
+    Args:
+        exponents: Exponents from lyapunov_map()
+    
+    Returns:
+        RGB image, shape exponents.shape + (3,), dtype uint8
+    """
+    top = max(float(np.nanmax(exponents)), 1e-12)
+    level = 1 - np.clip(exponents / top, 0, 1)
+    return _colorize(level, np.isfinite(exponents))
+
+
+def save_png(path: str, image: np.ndarray):
+    """
+    Write an RGB image as a PNG file (no imaging library needed).
+    
+    Args:
+        path: Output file
+        image: Array of shape (height, width, 3), dtype uint8
+    """
+    height, width, _ = image.shape
+    
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+    
+    # Every scanline starts with filter type 0 (none)
+    rows = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    rows[:, 1:] = np.ascontiguousarray(image, dtype=np.uint8).reshape(height, -1)
+    
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
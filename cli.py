@@ -0,0 +1,290 @@
+import argparse
+import math
+import os
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from chaos_map import (FlipTimeMap, flip_time_image, lyapunov_image, lyapunov_map,
+                       map_angles, save_png)
+from double_pendulum import BATCH_INTEGRATORS, INTEGRATORS, DoublePendulum, read_snapshot
+from sweep import ParameterSweep, SweepCancelled, angle_grid
+from trajectory import COLUMNS, TrajectoryWriter, record_trajectory
+
+
+class CsvTrajectorySink:
+    """Writes trajectory blocks to a CSV file as they are produced."""
+    
+    def __init__(self, path: str, resume_at: Optional[int] = None):
+        """
+        Args:
+            path: Output file
+            resume_at: Continue an existing file from this byte offset
+                       (everything after it is discarded)
+        """
+        self.path = path
+        if resume_at is None:
+            self._file = open(path, "w")
+            self._file.write(",".join(COLUMNS) + "\n")
+        else:
+            self._file = open(path, "r+")
+            self._file.truncate(resume_at)
+            self._file.seek(resume_at)
+        self.bytes_written = self._file.tell()
+    
+    def write(self, block: np.ndarray):
+        """
+        Append rows to the file.
+        
+        Args:
+            block: Array of shape (n, len(COLUMNS))
+        """
+        np.savetxt(self._file, block, fmt="%.17g", delimiter=",")
+        self.bytes_written = self._file.tell()
+    
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def close(self):
+        self._file.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="double-pendulum",
+        description="Headless double pendulum simulator")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run = commands.add_parser("run", help="Integrate one pendulum and write its trajectory to disk")
+    run.add_argument("--theta1", type=float, default=90.0, help="Initial angle of the first arm (degrees)")
+    run.add_argument("--theta2", type=float, default=90.0, help="Initial angle of the second arm (degrees)")
+    run.add_argument("--omega1", type=float, default=0.0, help="Initial angular velocity of the first arm (rad/s)")
+    run.add_argument("--omega2", type=float, default=0.0, help="Initial angular velocity of the second arm (rad/s)")
+    run.add_argument("--length1", type=float, default=1.0, help="Length of the first arm")
+    run.add_argument("--length2", type=float, default=1.0, help="Length of the second arm")
+    run.add_argument("--mass1", type=float, default=1.0, help="Mass of the first bob")
+    run.add_argument("--mass2", type=float, default=1.0, help="Mass of the second bob")
+    run.add_argument("--gravity", type=float, default=-9.8, help="Gravitational acceleration")
+    run.add_argument("--duration", type=float, default=60.0, help="Simulated time (seconds)")
+    run.add_argument("--dt", type=float, default=0.01, help="Time step (output spacing for rk45)")
+    run.add_argument("--integrator", choices=INTEGRATORS, default="rk4", help="Integration scheme")
+    run.add_argument("--rtol", type=float, default=1e-6, help="Relative tolerance (rk45)")
+    run.add_argument("--atol", type=float, default=1e-9, help="Absolute tolerance (rk45)")
+    run.add_argument("--chunk-size", type=int, default=10000, help="Rows buffered before each write")
+    run.add_argument("-o", "--output", default="trajectory.csv", help="Output file")
+    run.add_argument("--format", choices=("csv", "traj"),
+                     help="Output format (default: traj for *.traj outputs, csv otherwise)")
+    run.add_argument("--checkpoint", help="Snapshot file written periodically during the run")
+    run.add_argument("--checkpoint-every", type=float, default=30.0,
+                     help="Seconds of wall time between checkpoints")
+    run.add_argument("--resume", action="store_true",
+                     help="Continue an interrupted run from --checkpoint (other options are ignored)")
+    
+    grid = commands.add_parser("sweep", help="Integrate a grid of initial angles in parallel")
+    grid.add_argument("--theta1", type=float, nargs=2, default=(-180.0, 180.0), metavar=("MIN", "MAX"),
+                      help="Range of first-arm angles (degrees)")
+    grid.add_argument("--theta2", type=float, nargs=2, default=(-180.0, 180.0), metavar=("MIN", "MAX"),
+                      help="Range of second-arm angles (degrees)")
+    grid.add_argument("--resolution", type=int, default=256, help="Grid points per angle")
+    grid.add_argument("--duration", type=float, default=10.0, help="Simulated time per pendulum (seconds)")
+    grid.add_argument("--dt", type=float, default=0.01, help="Time step")
+    grid.add_argument("--integrator", choices=BATCH_INTEGRATORS, default="rk4", help="Integration scheme")
+    grid.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    grid.add_argument("-o", "--output", default="sweep.npy",
+                      help="Output .npy file with final [theta1, theta2, omega1, omega2] per grid point")
+    
+    chaos = commands.add_parser("map", help="Compute a time-to-flip or Lyapunov exponent map")
+    chaos.add_argument("--quantity", choices=("flip", "lyapunov"), default="flip",
+                       help="Time until the second arm flips, or the maximal Lyapunov exponent")
+    chaos.add_argument("--resolution", type=int, default=256, help="Grid cells per angle")
+    chaos.add_argument("--max-time", type=float, default=10.0,
+                       help="Longest simulated time per cell (flip), or averaging time (lyapunov)")
+    chaos.add_argument("--dt", type=float, default=0.01, help="Time step")
+    chaos.add_argument("--integrator", choices=BATCH_INTEGRATORS, default=None,
+                       help="Integration scheme (flip only, default rk4; Lyapunov exponents use RK4)")
+    chaos.add_argument("--gravity", type=float, default=-9.8, help="Gravitational acceleration")
+    chaos.add_argument("-o", "--output", default="flip_map.png",
+                       help="Output file: a .png image, or a .npy array of flip times")
+    return parser
+
+
+def write_checkpoint(path: str, pendulum: DoublePendulum, metadata: dict):
+    """Atomically replace the checkpoint file with a snapshot of the pendulum."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(pendulum.snapshot(metadata))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def command_run(args: argparse.Namespace) -> int:
+    if args.resume:
+        if not args.checkpoint:
+            print("--resume needs --checkpoint", file=sys.stderr)
+            return 2
+        with open(args.checkpoint, "rb") as f:
+            pendulum, run = read_snapshot(f.read())
+        output, output_format, steps = run["output"], run["format"], run["steps"]
+        if output_format == "traj":
+            sink = TrajectoryWriter.reopen(output, rows=run["rows"])
+        else:
+            sink = CsvTrajectorySink(output, resume_at=run["bytes"])
+        rows_before = run["rows"]
+        print(f"resuming {output} at t = {pendulum.time:.3f} s ({rows_before} rows)")
+    else:
+        pendulum = DoublePendulum(theta1=math.radians(args.theta1),
+                                  theta2=math.radians(args.theta2),
+                                  omega1=args.omega1, omega2=args.omega2,
+                                  length1=args.length1, length2=args.length2,
+                                  mass1=args.mass1, mass2=args.mass2,
+                                  gravity=args.gravity, dt=args.dt,
+                                  integrator=args.integrator,
+                                  rtol=args.rtol, atol=args.atol)
+        # The trajectory goes to disk; keep only a token trail in memory
+        pendulum.set_max_history_length(10)
+        output = args.output
+        steps = round(args.duration / args.dt)
+        
+        output_format = args.format or ("traj" if output.endswith(".traj") else "csv")
+        if output_format == "traj":
+            params = {name: getattr(args, name)
+                      for name in ("length1", "length2", "mass1", "mass2", "gravity",
+                                   "omega1", "omega2", "integrator", "rtol", "atol")}
+            params["theta1"] = pendulum.theta1
+            params["theta2"] = pendulum.theta2
+            sink = TrajectoryWriter(output, capacity=steps + 1, dt=args.dt, params=params)
+        else:
+            sink = CsvTrajectorySink(output)
+        rows_before = 0
+    
+    last_checkpoint = time.perf_counter()
+    
+    def checkpoint(rows: int):
+        nonlocal last_checkpoint
+        now = time.perf_counter()
+        if args.checkpoint and now - last_checkpoint >= args.checkpoint_every:
+            # Data first, so the checkpoint never points past what is on disk
+            sink.flush()
+            write_checkpoint(args.checkpoint, pendulum,
+                             {"output": output, "format": output_format, "steps": steps,
+                              "rows": rows_before + rows, "bytes": sink.bytes_written})
+            last_checkpoint = now
+    
+    # Row k holds step k, so the last written row is step rows_before - 1
+    remaining = steps - max(rows_before - 1, 0)
+    start = time.perf_counter()
+    try:
+        rows = record_trajectory(pendulum, remaining, sink, args.chunk_size,
+                                 include_start=not rows_before, on_block=checkpoint)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - start
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)  # The run is complete
+    
+    print(f"wrote {rows} rows to {output}")
+    print(f"steps:         {remaining}")
+    print(f"elapsed:       {elapsed:.3f} s")
+    print(f"throughput:    {remaining / elapsed:,.0f} steps/s")
+    print(f"bytes written: {sink.bytes_written:,}")
+    return 0
+
+
+def command_sweep(args: argparse.Namespace) -> int:
+    theta1, theta2 = angle_grid(np.radians(np.linspace(*args.theta1, args.resolution)),
+                                np.radians(np.linspace(*args.theta2, args.resolution)))
+    sweep = ParameterSweep(theta1, theta2, args.duration, dt=args.dt,
+                           integrator=args.integrator, workers=args.workers)
+    start = time.perf_counter()
+    
+    def progress(done: int, total: int):
+        rate = done * sweep.steps / max(time.perf_counter() - start, 1e-9)
+        print(f"\r{done:,}/{total:,} pendulums ({100 * done / total:.0f}%), "
+              f"{rate:,.0f} steps/s", end="", file=sys.stderr, flush=True)
+    
+    try:
+        states = sweep.run(progress)
+    except (KeyboardInterrupt, SweepCancelled):
+        print("\nsweep cancelled", file=sys.stderr)
+        return 130
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    
+    np.save(args.output, states)
+    print(f"wrote {states.shape} final states to {args.output}")
+    print(f"workers:       {sweep.workers}")
+    print(f"elapsed:       {elapsed:.3f} s")
+    print(f"throughput:    {len(sweep) * sweep.steps / elapsed:,.0f} pendulum steps/s")
+    return 0
+
+
+def command_map(args: argparse.Namespace) -> int:
+    angles = map_angles(args.resolution, args.gravity)
+    if args.quantity == "lyapunov":
+        # The tangent vectors are integrated with RK4 alongside the states
+        if args.integrator not in (None, "rk4"):
+            print("--integrator is not supported with --quantity lyapunov (always rk4)", file=sys.stderr)
+            return 2
+        start = time.perf_counter()
+        exponents = lyapunov_map(angles, angles, args.max_time, gravity=args.gravity, dt=args.dt)
+        elapsed = time.perf_counter() - start
+        if args.output.endswith(".npy"):
+            np.save(args.output, exponents)
+        else:
+            save_png(args.output, lyapunov_image(exponents))
+        print(f"wrote {args.resolution}x{args.resolution} Lyapunov map to {args.output}")
+        print(f"exponents:     {exponents.min():.3f} .. {exponents.max():.3f} 1/s")
+        print(f"elapsed:       {elapsed:.3f} s")
+        return 0
+    
+    flip_map = FlipTimeMap(angles, angles, args.max_time, gravity=args.gravity,
+                           dt=args.dt, integrator=args.integrator or "rk4")
+    
+    last_percent, last_report = -1, 0.0
+    
+    def progress(t: float, active: int):
+        # Called after every dt step; redraw only when the percentage moves or every half second
+        nonlocal last_percent, last_report
+        percent = int(100 * t / args.max_time)
+        now = time.perf_counter()
+        if percent == last_percent and now - last_report < 0.5:
+            return
+        last_percent, last_report = percent, now
+        print(f"\rt = {t:6.2f} s ({percent}%), {active:,} cells running", end="", file=sys.stderr, flush=True)
+    
+    start = time.perf_counter()
+    times = flip_map.run(progress)
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    
+    if args.output.endswith(".npy"):
+        np.save(args.output, times)
+    else:
+        save_png(args.output, flip_time_image(times, args.dt, args.max_time))
+    cells = times.size
+    print(f"wrote {args.resolution}x{args.resolution} flip map to {args.output}")
+    print(f"flipped:       {int(np.isfinite(times).sum()):,} of {cells:,} cells")
+    print(f"pruned:        {flip_map.pruned:,} cells (cannot flip)")
+    print(f"elapsed:       {elapsed:.3f} s")
+    print(f"work:          {flip_map.lane_steps:,} pendulum steps "
+          f"({100 * flip_map.lane_steps / (cells * round(args.max_time / args.dt)):.0f}% of a full run)")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return command_run(args)
+    if args.command == "sweep":
+        return command_sweep(args)
+    if args.command == "map":
+        return command_map(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
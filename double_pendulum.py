@@ -1,5 +1,322 @@
-import numpy as np
-from typing import Tuple, List, Optional
+from __future__ import annotations
+
+import json
+import math
+import struct
+from typing import Tuple, Optional
+
+# NumPy is imported by the first DoublePendulumBatch (see _import_numpy), so
+# single pendulums run without loading it
+np = None
+
+from backends import get_backend, resize_history
+from integrators import BatchDormandPrince45, DormandPrince45, gauss_legendre_step
+
+
+State = Tuple[float, float, float, float]
+
+# Available integration schemes: fixed-step RK4, adaptive Dormand-Prince 5(4)
+# and the symplectic implicit midpoint / 4th order Gauss-Legendre methods
+INTEGRATORS = ("rk4", "rk45", "midpoint", "gl4")
+
+# Integration schemes supported by DoublePendulumBatch
+BATCH_INTEGRATORS = ("rk4", "rk45")
+
+# Number of collocation stages of the symplectic integrators
+_SYMPLECTIC_STAGES = {"midpoint": 1, "gl4": 2}
+
+# Binary snapshot layout (little-endian): magic, 13 float64 fields (state,
+# time, parameters, tolerances), integrator index, history capacity (-1 if
+# unlimited), the three integrator counters, number of trail points and
+# length of the JSON metadata. The trail points (float64 x, y pairs) and
+# the metadata follow the header.
+_SNAPSHOT_MAGIC = b"DPSNAP01"
+_SNAPSHOT_HEADER = struct.Struct("<8s13dBq3qqI")
+_SNAPSHOT_FLOATS = ("theta1", "theta2", "omega1", "omega2", "time",
+                    "length1", "length2", "mass1", "mass2", "gravity",
+                    "dt", "rtol", "atol")
+
+
+def _import_numpy():
+    """Import NumPy into this module for the batch code."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("DoublePendulumBatch requires NumPy") from None
+        np = numpy
+
+
+def _derivatives(state: State,
+                 m1: float, m2: float,
+                 l1: float, l2: float,
+                 g: float) -> State:
+    """
+    Compute derivatives for a single double pendulum state.
+    
+    Pure function on Python floats: it uses the math module instead of NumPy
+    and does not touch any pendulum instance, so it can be called in tight
+    loops without allocating arrays.
+    
+    Args:
+        state: State tuple (theta1, theta2, omega1, omega2)
+        m1, m2: Masses of the pendulum bobs
+        l1, l2: Lengths of the pendulum arms
+        g: Gravitational acceleration
+        
+    Returns:
+        Tuple of (omega1, omega2, alpha1, alpha2)
+    """
+    t1, t2, w1, w2 = state
+    
+    # Common terms
+    delta = t1 - t2
+    sin_delta = math.sin(delta)
+    cos_delta = math.cos(delta)
+    denom = (2*m1 + m2 - m2 * math.cos(2*delta))
+    
+    # Angular acceleration for the first pendulum
+    num1 = -g*(2*m1 + m2)*math.sin(t1) - m2*g*math.sin(t1 - 2*t2)
+    num2 = -2*sin_delta*m2*((w2**2)*l2 + (w1**2)*l1*cos_delta)
+    alpha1 = (num1 + num2) / (l1 * denom)
+    
+    # Angular acceleration for the second pendulum
+    num1 = 2*sin_delta
+    num2 = (w1**2)*l1*(m1 + m2) + g*(m1 + m2)*math.cos(t1) + (w2**2)*l2*m2*cos_delta
+    alpha2 = (num1 * num2) / (l2 * denom)
+    
+    return w1, w2, alpha1, alpha2
+
+
+def _rk4_step(y: State, dt: float,
+              m1: float, m2: float,
+              l1: float, l2: float,
+              g: float) -> State:
+    """
+    Advance a single state tuple by one classic RK4 step.
+    
+    The arithmetic is written out per component in the same order as the
+    original array-based implementation, so the result is bit-for-bit
+    identical to it.
+    
+    Args:
+        y: State tuple (theta1, theta2, omega1, omega2)
+        dt: Time step
+        m1, m2, l1, l2, g: Physical parameters (see _derivatives)
+        
+    Returns:
+        New state tuple after one step
+    """
+    t1, t2, w1, w2 = y
+    
+    d1, d2, d3, d4 = _derivatives(y, m1, m2, l1, l2, g)
+    a1, a2, a3, a4 = dt*d1, dt*d2, dt*d3, dt*d4
+    
+    d1, d2, d3, d4 = _derivatives((t1 + 0.5*a1, t2 + 0.5*a2, w1 + 0.5*a3, w2 + 0.5*a4),
+                                  m1, m2, l1, l2, g)
+    b1, b2, b3, b4 = dt*d1, dt*d2, dt*d3, dt*d4
+    
+    d1, d2, d3, d4 = _derivatives((t1 + 0.5*b1, t2 + 0.5*b2, w1 + 0.5*b3, w2 + 0.5*b4),
+                                  m1, m2, l1, l2, g)
+    c1, c2, c3, c4 = dt*d1, dt*d2, dt*d3, dt*d4
+    
+    d1, d2, d3, d4 = _derivatives((t1 + c1, t2 + c2, w1 + c3, w2 + c4),
+                                  m1, m2, l1, l2, g)
+    e1, e2, e3, e4 = dt*d1, dt*d2, dt*d3, dt*d4
+    
+    sixth = 1/6
+    return (t1 + sixth*(a1 + 2*b1 + 2*c1 + e1),
+            t2 + sixth*(a2 + 2*b2 + 2*c2 + e2),
+            w1 + sixth*(a3 + 2*b3 + 2*c3 + e3),
+            w2 + sixth*(a4 + 2*b4 + 2*c4 + e4))
+
+
+def _momenta(state: State,
+             m1: float, m2: float,
+             l1: float, l2: float,
+             g: float) -> State:
+    """
+    Convert (theta1, theta2, omega1, omega2) to canonical coordinates.
+    
+    Returns:
+        Tuple of (theta1, theta2, p1, p2) with the conjugate momenta p1, p2
+    """
+    t1, t2, w1, w2 = state
+    cos_delta = math.cos(t1 - t2)
+    p1 = (m1 + m2)*l1**2*w1 + m2*l1*l2*w2*cos_delta
+    p2 = m2*l2**2*w2 + m2*l1*l2*w1*cos_delta
+    return t1, t2, p1, p2
+
+
+def _velocities(canonical: State,
+                m1: float, m2: float,
+                l1: float, l2: float,
+                g: float) -> State:
+    """
+    Convert canonical coordinates (theta1, theta2, p1, p2) back to angular velocities.
+    
+    Returns:
+        Tuple of (theta1, theta2, omega1, omega2)
+    """
+    t1, t2, p1, p2 = canonical
+    w1, w2, _, _ = _hamiltonian_derivatives(canonical, m1, m2, l1, l2, g)
+    return t1, t2, w1, w2
+
+
+def _hamiltonian_derivatives(canonical: State,
+                             m1: float, m2: float,
+                             l1: float, l2: float,
+                             g: float) -> State:
+    """
+    Compute Hamilton's equations for the double pendulum.
+    
+    Args:
+        canonical: Canonical state (theta1, theta2, p1, p2)
+        m1, m2, l1, l2, g: Physical parameters (see _derivatives)
+        
+    Returns:
+        Tuple of (dtheta1/dt, dtheta2/dt, dp1/dt, dp2/dt)
+    """
+    t1, t2, p1, p2 = canonical
+    
+    delta = t1 - t2
+    sin_delta = math.sin(delta)
+    cos_delta = math.cos(delta)
+    s = m1 + m2*sin_delta**2
+    
+    # dH/dp
+    dt1 = (l2*p1 - l1*p2*cos_delta) / (l1**2*l2*s)
+    dt2 = (l1*(m1 + m2)*p2 - l2*m2*p1*cos_delta) / (l1*l2**2*m2*s)
+    
+    # dH/d(delta) of the kinetic energy
+    c1 = p1*p2*sin_delta / (l1*l2*s)
+    c2 = ((m2*l2**2*p1**2 + (m1 + m2)*l1**2*p2**2 - 2*m2*l1*l2*p1*p2*cos_delta)
+          * sin_delta*cos_delta / (l1**2*l2**2*s**2))
+    
+    # -dH/dtheta
+    dp1 = -(m1 + m2)*g*l1*math.sin(t1) - c1 + c2
+    dp2 = -m2*g*l2*math.sin(t2) + c1 - c2
+    
+    return dt1, dt2, dp1, dp2
+
+
+def _energy(state: State,
+            m1: float, m2: float,
+            l1: float, l2: float,
+            g: float) -> float:
+    """
+    Compute the total mechanical energy of a state (theta1, theta2, omega1, omega2).
+    """
+    t1, t2, w1, w2 = state
+    kinetic = (0.5*(m1 + m2)*l1**2*w1**2 + 0.5*m2*l2**2*w2**2
+               + m2*l1*l2*w1*w2*math.cos(t1 - t2))
+    potential = -(m1 + m2)*g*l1*math.cos(t1) - m2*g*l2*math.cos(t2)
+    return kinetic + potential
+
+
+def _acceleration_jacobian(state: State,
+                           m1: float, m2: float,
+                           l1: float, l2: float,
+                           g: float) -> Tuple[State, State]:
+    """
+    Compute the analytic partial derivatives of the angular accelerations.
+    
+    Each acceleration has the form alpha = n / (l * denom) (see
+    _derivatives), so d(alpha)/dx = (dn/dx - alpha * l * d(denom)/dx) / (l * denom).
+    Only the angles enter denom, with d(denom)/d(theta1) = -d(denom)/d(theta2).
+    
+    Args:
+        state: State tuple (theta1, theta2, omega1, omega2)
+        m1, m2, l1, l2, g: Physical parameters (see _derivatives)
+        
+    Returns:
+        Two rows of the Jacobian, the gradients of alpha1 and alpha2 with
+        respect to (theta1, theta2, omega1, omega2)
+    """
+    t1, t2, w1, w2 = state
+    
+    delta = t1 - t2
+    sin_delta = math.sin(delta)
+    cos_delta = math.cos(delta)
+    denom = (2*m1 + m2 - m2 * math.cos(2*delta))
+    d_denom = 2*m2*math.sin(2*delta)
+    
+    # First pendulum
+    bracket = (w2**2)*l2 + (w1**2)*l1*cos_delta
+    n1 = -g*(2*m1 + m2)*math.sin(t1) - m2*g*math.sin(t1 - 2*t2) - 2*sin_delta*m2*bracket
+    alpha1 = n1 / (l1 * denom)
+    common = 2*m2*(cos_delta*bracket - (w1**2)*l1*sin_delta**2)
+    dn1_t1 = -g*(2*m1 + m2)*math.cos(t1) - m2*g*math.cos(t1 - 2*t2) - common
+    dn1_t2 = 2*m2*g*math.cos(t1 - 2*t2) + common
+    dn1_w1 = -4*m2*l1*w1*sin_delta*cos_delta
+    dn1_w2 = -4*m2*l2*w2*sin_delta
+    scale = l1 * denom
+    row1 = ((dn1_t1 - alpha1*l1*d_denom) / scale,
+            (dn1_t2 + alpha1*l1*d_denom) / scale,
+            dn1_w1 / scale,
+            dn1_w2 / scale)
+    
+    # Second pendulum
+    inner = (w1**2)*l1*(m1 + m2) + g*(m1 + m2)*math.cos(t1) + (w2**2)*l2*m2*cos_delta
+    alpha2 = 2*sin_delta*inner / (l2 * denom)
+    dinner_t1 = -g*(m1 + m2)*math.sin(t1) - (w2**2)*l2*m2*sin_delta
+    dinner_t2 = (w2**2)*l2*m2*sin_delta
+    dn2_t1 = 2*cos_delta*inner + 2*sin_delta*dinner_t1
+    dn2_t2 = -2*cos_delta*inner + 2*sin_delta*dinner_t2
+    dn2_w1 = 4*sin_delta*w1*l1*(m1 + m2)
+    dn2_w2 = 4*sin_delta*w2*l2*m2*cos_delta
+    scale = l2 * denom
+    row2 = ((dn2_t1 - alpha2*l2*d_denom) / scale,
+            (dn2_t2 + alpha2*l2*d_denom) / scale,
+            dn2_w1 / scale,
+            dn2_w2 / scale)
+    
+    return row1, row2
+
+
+def _rk4_tangent_step(y: State, v: State, dt: float,
+                      m1: float, m2: float,
+                      l1: float, l2: float,
+                      g: float) -> Tuple[State, State]:
+    """
+    Advance a state and a tangent vector by one RK4 step.
+    
+    The tangent vector v follows the variational equations dv/dt = J(y) v,
+    where J is the Jacobian of _derivatives at the current state, so it
+    tracks how an infinitesimal perturbation of y grows.
+    
+    Args:
+        y: State tuple (theta1, theta2, omega1, omega2)
+        v: Tangent vector (perturbation of y)
+        dt: Time step
+        m1, m2, l1, l2, g: Physical parameters (see _derivatives)
+        
+    Returns:
+        Tuple of (new state, new tangent vector)
+    """
+    params = (m1, m2, l1, l2, g)
+    
+    def rates(y, v):
+        row1, row2 = _acceleration_jacobian(y, *params)
+        dv = (v[2], v[3],
+              row1[0]*v[0] + row1[1]*v[1] + row1[2]*v[2] + row1[3]*v[3],
+              row2[0]*v[0] + row2[1]*v[1] + row2[2]*v[2] + row2[3]*v[3])
+        return _derivatives(y, *params), dv
+    
+    def shift(x, k, h):
+        return tuple(a + h*b for a, b in zip(x, k))
+    
+    ky1, kv1 = rates(y, v)
+    ky2, kv2 = rates(shift(y, ky1, 0.5*dt), shift(v, kv1, 0.5*dt))
+    ky3, kv3 = rates(shift(y, ky2, 0.5*dt), shift(v, kv2, 0.5*dt))
+    ky4, kv4 = rates(shift(y, ky3, dt), shift(v, kv3, dt))
+    
+    sixth = dt/6
+    y = tuple(x + sixth*(a + 2*b + 2*c + d) for x, a, b, c, d in zip(y, ky1, ky2, ky3, ky4))
+    v = tuple(x + sixth*(a + 2*b + 2*c + d) for x, a, b, c, d in zip(v, kv1, kv2, kv3, kv4))
+    return y, v
+
 
 class DoublePendulum:
     """
@@ -10,8 +327,8 @@ class DoublePendulum:
     """
     
     def __init__(self, 
-                 theta1: float = np.pi/2, 
-                 theta2: float = np.pi/2,
+                 theta1: float = math.pi/2, 
+                 theta2: float = math.pi/2,
                  omega1: float = 0.0, 
                  omega2: float = 0.0,
                  length1: float = 1.0, 
@@ -19,7 +336,11 @@ class DoublePendulum:
                  mass1: float = 1.0, 
                  mass2: float = 1.0,
                  gravity: float = -9.8,
-                 dt: float = 0.01):
+                 dt: float = 0.01,
+                 integrator: str = "rk4",
+                 rtol: float = 1e-6,
+                 atol: float = 1e-9,
+                 backend: Optional[str] = None):
         """
         Initialize the double pendulum system.
         
@@ -33,8 +354,19 @@ class DoublePendulum:
             mass1: Mass of the first pendulum bob
             mass2: Mass of the second pendulum bob
             gravity: Gravitational acceleration
-            dt: Time step for numerical integration
+            dt: Time step for numerical integration (with "rk45", the
+                spacing of reported states rather than the internal step)
+            integrator: Integration scheme, one of INTEGRATORS
+            rtol: Relative error tolerance of the adaptive integrator
+            atol: Absolute error tolerance of the adaptive integrator
+            backend: Trail storage, one of backends.BACKENDS ("math" keeps
+                     plain (x, y) tuples, "numpy" float64 arrays); by default
+                     "math", so a single pendulum does not load NumPy. The
+                     physics is the same.
         """
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator!r}, expected one of {INTEGRATORS}")
+        
         # Initial conditions
         self.theta1 = theta1
         self.theta2 = theta2
@@ -52,9 +384,17 @@ class DoublePendulum:
         self.dt = dt
         self.time = 0.0
         
-        # History of the tip position for trail
-        self.tip_history: List[Tuple[float, float]] = []
-        self.max_history_length = 1000  # Maximum number of positions to store
+        # Integrator settings
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self._solver = None      # Adaptive solver, created on first use
+        self._solver_key = None  # (state, time, params) the solver is valid for
+        self._stats = {"nsteps": 0, "nrejected": 0, "nfev": 0}
+        
+        # History of the tip position for trail (at most 1000 positions)
+        self.backend = get_backend(backend or "math")
+        self._tip_history = self.backend.ring_history(1000)
         
         # Calculate initial positions
         self._update_positions()
@@ -62,19 +402,15 @@ class DoublePendulum:
     def _update_positions(self):
         """Update the positions of the pendulum bobs based on current angles."""
         # Position of the first pendulum bob
-        self.x1 = self.length1 * np.sin(self.theta1)
-        self.y1 = -self.length1 * np.cos(self.theta1)
+        self.x1 = self.length1 * math.sin(self.theta1)
+        self.y1 = -self.length1 * math.cos(self.theta1)
         
         # Position of the second pendulum bob
-        self.x2 = self.x1 + self.length2 * np.sin(self.theta2)
-        self.y2 = self.y1 - self.length2 * np.cos(self.theta2)
+        self.x2 = self.x1 + self.length2 * math.sin(self.theta2)
+        self.y2 = self.y1 - self.length2 * math.cos(self.theta2)
         
-        # Add current tip position to history
-        self.tip_history.append((self.x2, self.y2))
-        
-        # Limit the history length
-        if len(self.tip_history) > self.max_history_length:
-            self.tip_history = self.tip_history[-self.max_history_length:]
+        # Add current tip position to history (drops the oldest when full)
+        self._tip_history.append(self.x2, self.y2)
     
     def _compute_derivatives(self) -> Tuple[float, float, float, float]:
         """
@@ -85,57 +421,84 @@ class DoublePendulum:
                 omega1, omega2 are the angular velocities
                 alpha1, alpha2 are the angular accelerations
         """
-        # Shorthand variables for readability
-        t1, t2 = self.theta1, self.theta2
-        w1, w2 = self.omega1, self.omega2
-        m1, m2 = self.mass1, self.mass2
-        l1, l2 = self.length1, self.length2
-        g = self.gravity
-        
-        # Calculate the derivatives using the equations of motion
-        # These are the standard equations for a double pendulum
-        
-        # Common terms
-        delta = t1 - t2
-        denom = (2*m1 + m2 - m2 * np.cos(2*delta))
-        
-        # Angular acceleration for the first pendulum
-        num1 = -g*(2*m1 + m2)*np.sin(t1) - m2*g*np.sin(t1 - 2*t2)
-        num2 = -2*np.sin(delta)*m2*((w2**2)*l2 + (w1**2)*l1*np.cos(delta))
-        alpha1 = (num1 + num2) / (l1 * denom)
+        return _derivatives((self.theta1, self.theta2, self.omega1, self.omega2),
+                            self.mass1, self.mass2,
+                            self.length1, self.length2, self.gravity)
+    
+    def _params(self) -> Tuple[float, float, float, float, float]:
+        return self.mass1, self.mass2, self.length1, self.length2, self.gravity
+    
+    def _adaptive_solver(self) -> DormandPrince45:
+        """
+        Get the adaptive solver, restarting it if the pendulum was modified.
         
-        # Angular acceleration for the second pendulum
-        num1 = 2*np.sin(delta)
-        num2 = (w1**2)*l1*(m1 + m2) + g*(m1 + m2)*np.cos(t1) + (w2**2)*l2*m2*np.cos(delta)
-        alpha2 = (num1 * num2) / (l2 * denom)
+        Returns:
+            Solver positioned at the current state and time
+        """
+        state = (self.theta1, self.theta2, self.omega1, self.omega2)
+        key = (state, self.time, self._params())
+        if self._solver is None or key != self._solver_key:
+            self._collect_solver_stats()
+            params = self._params()
+            self._solver = DormandPrince45(lambda y: _derivatives(y, *params),
+                                           state, t0=self.time,
+                                           rtol=self.rtol, atol=self.atol)
+        return self._solver
+    
+    def _collect_solver_stats(self):
+        """Fold the counters of the current adaptive solver into the totals."""
+        if self._solver is not None:
+            self._stats["nsteps"] += self._solver.nsteps
+            self._stats["nrejected"] += self._solver.nrejected
+            self._stats["nfev"] += self._solver.nfev
+            self._solver = None
+    
+    def _advance(self, dt: float):
+        """
+        Advance the state by dt with the selected integrator.
         
-        return w1, w2, alpha1, alpha2
+        Args:
+            dt: Time interval to advance
+        """
+        if self.integrator == "rk4":
+            # RK4 integration step on plain floats (no temporary arrays)
+            self.theta1, self.theta2, self.omega1, self.omega2 = _rk4_step(
+                (self.theta1, self.theta2, self.omega1, self.omega2), dt,
+                self.mass1, self.mass2, self.length1, self.length2, self.gravity)
+            self._stats["nsteps"] += 1
+            self._stats["nfev"] += 4
+        elif self.integrator in _SYMPLECTIC_STAGES:
+            # Symplectic step in canonical (theta, p) coordinates
+            params = self._params()
+            canonical, nfev = gauss_legendre_step(
+                lambda y: _hamiltonian_derivatives(y, *params),
+                _momenta((self.theta1, self.theta2, self.omega1, self.omega2), *params),
+                dt, stages=_SYMPLECTIC_STAGES[self.integrator])
+            self.theta1, self.theta2, self.omega1, self.omega2 = _velocities(canonical, *params)
+            self._stats["nsteps"] += 1
+            self._stats["nfev"] += nfev
+        else:
+            # Adaptive steps with dense output at the requested time
+            solver = self._adaptive_solver()
+            state = solver.advance_to(self.time + dt)
+            self.theta1, self.theta2, self.omega1, self.omega2 = state
+            self._solver_key = (state, self.time + dt, self._params())
     
     def step(self):
         """
-        Perform one step of numerical integration using RK4 method.
-        Update the system state and increment time.
+        Perform one step of numerical integration.
+        
+        With the default "rk4" integrator this is a single RK4 step of size
+        dt. With "rk45" the state is advanced by dt using as many (or as few)
+        adaptive steps as the tolerances require. "midpoint" and "gl4" take
+        one symplectic Gauss-Legendre step in canonical coordinates, which
+        keeps the energy error bounded on long runs. Update the system state
+        and increment time.
         """
-        # Implement 4th-order Runge-Kutta method
         dt = self.dt
         
-        # Initial state
-        y = np.array([self.theta1, self.theta2, self.omega1, self.omega2])
-        
-        # RK4 integration step
-        k1 = dt * np.array(self._compute_derivatives_vec(y))
-        k2 = dt * np.array(self._compute_derivatives_vec(y + 0.5 * k1))
-        k3 = dt * np.array(self._compute_derivatives_vec(y + 0.5 * k2))
-        k4 = dt * np.array(self._compute_derivatives_vec(y + k3))
-        
-        # Update state
-        y_new = y + (1/6) * (k1 + 2*k2 + 2*k3 + k4)
-        
-        # Update the system state
-        self.theta1 = y_new[0]
-        self.theta2 = y_new[1]
-        self.omega1 = y_new[2]
-        self.omega2 = y_new[3]
+        # Integrate the equations of motion
+        self._advance(dt)
         
         # Update positions
         self._update_positions()
@@ -143,32 +506,92 @@ class DoublePendulum:
         # Increment time
         self.time += dt
     
-    def _compute_derivatives_vec(self, y: np.ndarray) -> Tuple[float, float, float, float]:
+    def advance_to(self, t: float):
         """
-        Helper function for RK4 integration that computes derivatives for a state vector.
+        Advance the simulation to an arbitrary time.
+        
+        With "rk45" the state at t is read from the dense output, so a single
+        point is added to the tip history. The fixed-step integrators take
+        regular steps and a final shorter step to land exactly on t.
         
         Args:
-            y: State vector [theta1, theta2, omega1, omega2]
-            
+            t: Target time, not earlier than the current time
+        """
+        if t < self.time:
+            raise ValueError(f"Cannot advance backwards from t={self.time} to t={t}")
+        
+        if self.integrator != "rk45":
+            while self.time + self.dt <= t:
+                self.step()
+        
+        remaining = t - self.time
+        if remaining > 0:
+            self._advance(remaining)
+            self._update_positions()
+            self.time = t
+    
+    def energy(self) -> float:
+        """
+        Get the total mechanical (kinetic + potential) energy.
+        
         Returns:
-            Tuple of derivatives [omega1, omega2, alpha1, alpha2]
+            Energy of the current state; conserved by the exact dynamics
         """
-        # Temporarily store the current state
-        theta1_orig, theta2_orig = self.theta1, self.theta2
-        omega1_orig, omega2_orig = self.omega1, self.omega2
+        return _energy((self.theta1, self.theta2, self.omega1, self.omega2), *self._params())
+    
+    def lyapunov_exponent(self, duration: float, renormalize_every: int = 10) -> float:
+        """
+        Estimate the maximal Lyapunov exponent starting from the current state.
         
-        # Set the state to the input state
-        self.theta1, self.theta2 = y[0], y[1]
-        self.omega1, self.omega2 = y[2], y[3]
+        A tangent vector is integrated alongside a copy of the state with
+        RK4 at step dt, using the analytic Jacobian of the equations of
+        motion. Every renormalize_every steps its growth factor is
+        accumulated on a log scale and it is scaled back to unit length,
+        which keeps it from overflowing. The pendulum itself is not
+        advanced.
         
-        # Compute derivatives
-        derivatives = self._compute_derivatives()
+        Args:
+            duration: Time over which growth is averaged (longer is more accurate)
+            renormalize_every: Steps between renormalizations
+            
+        Returns:
+            Estimated exponent in 1/s; near zero for regular motion and
+            positive for chaotic motion
         
-        # Restore the original state
-        self.theta1, self.theta2 = theta1_orig, theta2_orig
-        self.omega1, self.omega2 = omega1_orig, omega2_orig
+        Raises:
+            ValueError: If renormalize_every is not a positive number of steps
+        """
+        if renormalize_every < 1:
+            raise ValueError(f"renormalize_every must be at least 1, got {renormalize_every}")
+        params = self._params()
+        dt = self.dt
+        steps = max(1, round(duration / dt))
+        y = (self.theta1, self.theta2, self.omega1, self.omega2)
+        v = (0.5, 0.5, 0.5, 0.5)
+        
+        log_growth = 0.0
+        for i in range(1, steps + 1):
+            y, v = _rk4_tangent_step(y, v, dt, *params)
+            if i % renormalize_every == 0 or i == steps:
+                norm = math.sqrt(sum(x*x for x in v))
+                log_growth += math.log(norm)
+                v = tuple(x / norm for x in v)
+        return log_growth / (steps * dt)
+    
+    def get_integrator_stats(self) -> dict:
+        """
+        Get integration statistics since the last reset.
         
-        return derivatives
+        Returns:
+            Dictionary with the number of accepted steps ("nsteps"), rejected
+            steps ("nrejected") and derivative evaluations ("nfev")
+        """
+        stats = dict(self._stats)
+        if self._solver is not None:
+            stats["nsteps"] += self._solver.nsteps
+            stats["nrejected"] += self._solver.nrejected
+            stats["nfev"] += self._solver.nfev
+        return stats
     
     def reset(self, theta1: float = None, theta2: float = None):
         """
@@ -188,8 +611,12 @@ class DoublePendulum:
         self.omega2 = 0.0
         self.time = 0.0
         
+        # Restart the integrator statistics
+        self._solver = None
+        self._stats = {"nsteps": 0, "nrejected": 0, "nfev": 0}
+        
         # Clear history
-        self.tip_history = []
+        self._tip_history.clear()
         
         # Update positions
         self._update_positions()
@@ -203,15 +630,51 @@ class DoublePendulum:
         """
         return self.x1, self.y1, self.x2, self.y2
     
-    def get_tip_history(self) -> List[Tuple[float, float]]:
+    @property
+    def tip_history(self) -> np.ndarray:
+        """Tip positions, oldest first (see get_tip_history)."""
+        return self._tip_history.view()
+    
+    @property
+    def max_history_length(self) -> Optional[int]:
+        """Maximum number of tip positions kept in the history (None if unlimited)."""
+        return self._tip_history.capacity
+    
+    def get_tip_history(self, start: int = 0) -> np.ndarray:
         """
         Get the history of the distal tip positions.
         
+        Args:
+            start: Index of the first point to return. With unlimited history
+                   points are never dropped, so this gives the points added
+                   since an earlier call cheaply.
+            
+        Returns:
+            Read-only array of shape (n, 2) with (x, y) rows, oldest first.
+            It is a view into the history buffer and is only valid until
+            the next step. With the "math" backend, a list of (x, y) tuples.
+        """
+        return self._tip_history.view(start)
+    
+    def get_tip_history_length(self) -> int:
+        """
+        Get the number of points in the trail history.
+        
         Returns:
-            List of (x, y) coordinates
+            Number of stored tip positions (without building the array
+            get_tip_history() returns)
         """
-        return self.tip_history
+        return len(self._tip_history)
 
+    def get_history_nbytes(self) -> int:
+        """
+        Get the memory allocated for the tip history.
+        
+        Returns:
+            Size of the history storage in bytes
+        """
+        return self._tip_history.nbytes
+    
     def get_time(self) -> float:
         """
         Get the current simulation time.
@@ -221,6 +684,63 @@ class DoublePendulum:
         """
         return self.time 
 
+    def load_tip_history(self, points: np.ndarray):
+        """
+        Replace the trail history with the given tip positions.
+        
+        Used when a run continues from a recorded prefix, so the trail
+        shows the whole run. Only the newest points are kept if the
+        history is limited.
+        
+        Args:
+            points: Tip positions, oldest first, shape (n, 2)
+        """
+        self._tip_history.clear()
+        self._tip_history.extend(self.backend.points(points))
+    
+    def snapshot(self, metadata: Optional[dict] = None) -> bytes:
+        """
+        Serialize the complete pendulum into a compact binary snapshot.
+        
+        The snapshot holds the state, time, physical parameters, integrator
+        settings and counters, and the trail history, so restore() gives a
+        pendulum that continues exactly where this one is (the adaptive
+        "rk45" solver restarts its step size control, like after reset()).
+        
+        Args:
+            metadata: Optional JSON-serializable data stored alongside
+                      (e.g. how much output a checkpointed run had written)
+        
+        Returns:
+            Snapshot bytes (about 160 bytes plus 16 per trail point)
+        """
+        stats = self.get_integrator_stats()
+        history = self._tip_history.view()
+        capacity = self._tip_history.capacity
+        extra = json.dumps(metadata or {}).encode("utf-8")
+        header = _SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC,
+            *(float(getattr(self, name)) for name in _SNAPSHOT_FLOATS),
+            INTEGRATORS.index(self.integrator),
+            -1 if capacity is None else capacity,
+            stats["nsteps"], stats["nrejected"], stats["nfev"],
+            len(history), len(extra))
+        return header + self.backend.pack_points(history) + extra
+    
+    @classmethod
+    def restore(cls, data: bytes, backend: Optional[str] = None) -> "DoublePendulum":
+        """
+        Recreate a pendulum from snapshot() bytes.
+        
+        Args:
+            data: Snapshot bytes
+            backend: Trail storage of the restored pendulum (see __init__)
+        
+        Returns:
+            The restored pendulum (see read_snapshot for the metadata)
+        """
+        return read_snapshot(data, backend)[0]
+    
     def set_max_history_length(self, length: Optional[int] = None):
         """
         Set the maximum number of positions to store in the trail history.
@@ -228,8 +748,450 @@ class DoublePendulum:
         Args:
             length: Maximum number of points to keep. If None, keep unlimited history.
         """
-        if length is None:
-            # Use a very large number to effectively store unlimited history
-            self.max_history_length = 1000000
+        self._tip_history = resize_history(self._tip_history, length, self.backend)
+
+
+def read_snapshot(data: bytes, backend: Optional[str] = None) -> Tuple[DoublePendulum, dict]:
+    """
+    Decode a snapshot written by DoublePendulum.snapshot().
+    
+    Args:
+        data: Snapshot bytes
+        backend: Trail storage of the restored pendulum (see DoublePendulum)
+    
+    Returns:
+        Tuple of (restored pendulum, metadata dictionary)
+    """
+    data = bytes(data)
+    if len(data) < _SNAPSHOT_HEADER.size or not data.startswith(_SNAPSHOT_MAGIC):
+        raise ValueError("Not a double pendulum snapshot")
+    fields = _SNAPSHOT_HEADER.unpack_from(data)
+    values = dict(zip(_SNAPSHOT_FLOATS, fields[1:14]))
+    integrator, capacity, nsteps, nrejected, nfev, points, extra = fields[14:]
+    
+    offset = _SNAPSHOT_HEADER.size
+    end = offset + 16 * points
+    if len(data) != end + extra:
+        raise ValueError("Truncated double pendulum snapshot")
+    metadata = json.loads(data[end:].decode("utf-8"))
+    
+    time = values.pop("time")
+    pendulum = DoublePendulum(integrator=INTEGRATORS[integrator], backend=backend, **values)
+    history = pendulum.backend.unpack_points(data, points, offset)
+    pendulum.time = time
+    pendulum._stats = {"nsteps": nsteps, "nrejected": nrejected, "nfev": nfev}
+    pendulum.set_max_history_length(None if capacity < 0 else capacity)
+    pendulum.load_tip_history(history)
+    return pendulum, metadata
+
+
+def _batch_derivatives(y: np.ndarray,
+                       m1: np.ndarray, m2: np.ndarray,
+                       l1: np.ndarray, l2: np.ndarray,
+                       g: np.ndarray) -> np.ndarray:
+    """
+    Compute derivatives for a whole batch of double pendulums at once.
+    
+    Uses the same expressions (and order of operations) as
+    DoublePendulum._compute_derivatives, applied column-wise. The only
+    difference is that NumPy squares arrays with a correctly rounded
+    multiply where Python floats go through pow(), so results can differ
+    from the scalar class in the last bit.
+    
+    Args:
+        y: State array of shape (N, 4) with rows [theta1, theta2, omega1, omega2]
+        m1, m2, l1, l2, g: Per-pendulum parameters, each of shape (N,)
+        
+    Returns:
+        Array of shape (N, 4) with rows [omega1, omega2, alpha1, alpha2]
+    """
+    t1, t2, w1, w2 = y[:, 0], y[:, 1], y[:, 2], y[:, 3]
+    
+    # Common terms
+    delta = t1 - t2
+    denom = (2*m1 + m2 - m2 * np.cos(2*delta))
+    
+    # Angular acceleration for the first pendulum
+    num1 = -g*(2*m1 + m2)*np.sin(t1) - m2*g*np.sin(t1 - 2*t2)
+    num2 = -2*np.sin(delta)*m2*((w2**2)*l2 + (w1**2)*l1*np.cos(delta))
+    alpha1 = (num1 + num2) / (l1 * denom)
+    
+    # Angular acceleration for the second pendulum
+    num1 = 2*np.sin(delta)
+    num2 = (w1**2)*l1*(m1 + m2) + g*(m1 + m2)*np.cos(t1) + (w2**2)*l2*m2*np.cos(delta)
+    alpha2 = (num1 * num2) / (l2 * denom)
+    
+    return np.stack((w1, w2, alpha1, alpha2), axis=1)
+
+
+def _batch_tangent_derivatives(y: np.ndarray, v: np.ndarray,
+                               m1: np.ndarray, m2: np.ndarray,
+                               l1: np.ndarray, l2: np.ndarray,
+                               g: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute state derivatives and Jacobian-vector products for a whole batch.
+    
+    Uses the expressions of _acceleration_jacobian, applied column-wise,
+    but multiplies the Jacobian into the tangent vectors directly instead
+    of building (N, 4, 4) matrices, and shares the trigonometric terms with
+    the state derivatives (which match _batch_derivatives exactly).
+    
+    Args:
+        y: State array of shape (N, 4)
+        v: Tangent vectors, shape (N, 4)
+        m1, m2, l1, l2, g: Per-pendulum parameters, each of shape (N,)
+        
+    Returns:
+        Tuple of (dy/dt, dv/dt), each of shape (N, 4)
+    """
+    t1, t2, w1, w2 = y[:, 0], y[:, 1], y[:, 2], y[:, 3]
+    v1, v2, v3, v4 = v[:, 0], v[:, 1], v[:, 2], v[:, 3]
+    
+    delta = t1 - t2
+    sin_delta = np.sin(delta)
+    cos_delta = np.cos(delta)
+    sin_t1 = np.sin(t1)
+    cos_t1 = np.cos(t1)
+    denom = (2*m1 + m2 - m2 * np.cos(2*delta))
+    d_denom = 2*m2*np.sin(2*delta)
+    dy = np.empty_like(y)
+    dv = np.empty_like(v)
+    dy[:, 0] = w1
+    dy[:, 1] = w2
+    dv[:, 0] = v3
+    dv[:, 1] = v4
+    
+    # First pendulum
+    bracket = (w2**2)*l2 + (w1**2)*l1*cos_delta
+    n1 = -g*(2*m1 + m2)*sin_t1 - m2*g*np.sin(t1 - 2*t2) - 2*sin_delta*m2*bracket
+    scale = l1 * denom
+    alpha1 = n1 / scale
+    common = 2*m2*(cos_delta*bracket - (w1**2)*l1*sin_delta**2)
+    cos_t12 = m2*g*np.cos(t1 - 2*t2)
+    dy[:, 2] = alpha1
+    dv[:, 2] = ((-g*(2*m1 + m2)*cos_t1 - cos_t12 - common - alpha1*l1*d_denom) * v1
+                + (2*cos_t12 + common + alpha1*l1*d_denom) * v2
+                - 4*m2*l1*w1*sin_delta*cos_delta * v3
+                - 4*m2*l2*w2*sin_delta * v4) / scale
+    
+    # Second pendulum
+    inner = (w1**2)*l1*(m1 + m2) + g*(m1 + m2)*cos_t1 + (w2**2)*l2*m2*cos_delta
+    scale = l2 * denom
+    alpha2 = 2*sin_delta*inner / scale
+    dinner_t2 = (w2**2)*l2*m2*sin_delta
+    dy[:, 3] = alpha2
+    dv[:, 3] = ((2*cos_delta*inner - 2*sin_delta*(g*(m1 + m2)*sin_t1 + dinner_t2)
+                 - alpha2*l2*d_denom) * v1
+                + (-2*cos_delta*inner + 2*sin_delta*dinner_t2 + alpha2*l2*d_denom) * v2
+                + 4*sin_delta*w1*l1*(m1 + m2) * v3
+                + 4*sin_delta*w2*l2*m2*cos_delta * v4) / scale
+    
+    return dy, dv
+
+
+class DoublePendulumBatch:
+    """
+    Vectorized simulator for many independent double pendulums.
+    
+    The state of N pendulums is held in a single (N, 4) array whose rows are
+    [theta1, theta2, omega1, omega2]. Every physical parameter is stored per
+    pendulum as an (N,) array, so sweeps over masses, lengths or gravity are
+    as cheap as sweeps over initial angles. Each call to step() advances the
+    whole batch with the same RK4 scheme as DoublePendulum.step().
+    """
+    
+    def __init__(self,
+                 theta1,
+                 theta2,
+                 omega1=0.0,
+                 omega2=0.0,
+                 length1=1.0,
+                 length2=1.0,
+                 mass1=1.0,
+                 mass2=1.0,
+                 gravity=-9.8,
+                 dt: float = 0.01,
+                 integrator: str = "rk4",
+                 rtol: float = 1e-6,
+                 atol: float = 1e-9):
+        """
+        Initialize a batch of double pendulums.
+        
+        Every argument except dt may be a scalar or a 1-D array-like; they
+        are broadcast against each other to determine the batch size N.
+        
+        Args:
+            theta1: Initial angles of the first pendulums (in radians)
+            theta2: Initial angles of the second pendulums (in radians)
+            omega1: Initial angular velocities of the first pendulums
+            omega2: Initial angular velocities of the second pendulums
+            length1: Lengths of the first pendulum arms
+            length2: Lengths of the second pendulum arms
+            mass1: Masses of the first pendulum bobs
+            mass2: Masses of the second pendulum bobs
+            gravity: Gravitational acceleration
+            dt: Time step for numerical integration (shared by the batch)
+            integrator: Integration scheme, "rk4" or "rk45". With "rk45"
+                every pendulum gets its own adaptive step size.
+            rtol: Relative error tolerance of the adaptive integrator
+            atol: Absolute error tolerance of the adaptive integrator
+        """
+        if integrator not in BATCH_INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator!r}, expected one of {BATCH_INTEGRATORS}")
+        _import_numpy()
+        
+        values = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=float))
+              for v in (theta1, theta2, omega1, omega2,
+                        length1, length2, mass1, mass2, gravity)))
+        if values[0].ndim != 1:
+            raise ValueError("Batch parameters must be scalars or 1-D arrays")
+        
+        # State vectors, one row per pendulum
+        self.state = np.stack(values[:4], axis=1)
+        
+        # Physical parameters (contiguous copies, one entry per pendulum)
+        self.length1, self.length2, self.mass1, self.mass2, self.gravity = (
+            np.ascontiguousarray(v) for v in values[4:])
+        
+        # Simulation parameters
+        self.dt = dt
+        self.time = 0.0
+        
+        # Integrator settings
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self._solver = None         # Adaptive solver, created on first use
+        self._solver_output = None  # State array last produced by the solver
+    
+    def __len__(self) -> int:
+        return self.state.shape[0]
+    
+    @property
+    def theta1(self) -> np.ndarray:
+        return self.state[:, 0]
+    
+    @property
+    def theta2(self) -> np.ndarray:
+        return self.state[:, 1]
+    
+    @property
+    def omega1(self) -> np.ndarray:
+        return self.state[:, 2]
+    
+    @property
+    def omega2(self) -> np.ndarray:
+        return self.state[:, 3]
+    
+    def _compute_derivatives(self, y: np.ndarray) -> np.ndarray:
+        """
+        Compute derivatives for a batch state array.
+        
+        Args:
+            y: State array of shape (N, 4)
+            
+        Returns:
+            Array of shape (N, 4) with rows [omega1, omega2, alpha1, alpha2]
+        """
+        return _batch_derivatives(y, self.mass1, self.mass2,
+                                  self.length1, self.length2, self.gravity)
+    
+    def _adaptive_solver(self) -> BatchDormandPrince45:
+        """
+        Get the adaptive solver, restarting it if the state was replaced.
+        
+        Returns:
+            Solver positioned at the current state and time
+        """
+        if self._solver is None or self.state is not self._solver_output:
+            params = (self.mass1, self.mass2, self.length1, self.length2, self.gravity)
+            self._solver = BatchDormandPrince45(lambda y, p: _batch_derivatives(y, *p),
+                                                self.state, params, t0=self.time,
+                                                rtol=self.rtol, atol=self.atol)
+        return self._solver
+    
+    def step(self):
+        """
+        Advance every pendulum in the batch by dt.
+        
+        With "rk4" this is one RK4 step, mirroring DoublePendulum.step();
+        with "rk45" each pendulum takes adaptive steps and the state at the
+        new time comes from dense output. Update the state array and
+        increment time.
+        """
+        if self.integrator == "rk45":
+            self.advance_to(self.time + self.dt)
+            return
+        
+        dt = self.dt
+        y = self.state
+        
+        # RK4 integration step, mirroring DoublePendulum.step()
+        k1 = dt * self._compute_derivatives(y)
+        k2 = dt * self._compute_derivatives(y + 0.5 * k1)
+        k3 = dt * self._compute_derivatives(y + 0.5 * k2)
+        k4 = dt * self._compute_derivatives(y + k3)
+        
+        self.state = y + (1/6) * (k1 + 2*k2 + 2*k3 + k4)
+        self.time += dt
+    
+    def advance_to(self, t: float):
+        """
+        Advance the whole batch to an arbitrary time.
+        
+        With "rk45" the states at t are read from the dense output of each
+        pendulum. With "rk4" the batch takes regular steps and a final
+        shorter step to land exactly on t.
+        
+        Args:
+            t: Target time, not earlier than the current time
+        """
+        if t < self.time:
+            raise ValueError(f"Cannot advance backwards from t={self.time} to t={t}")
+        
+        if self.integrator == "rk45":
+            self.state = self._solver_output = self._adaptive_solver().advance_to(t)
+            self.time = t
+            return
+        
+        while self.time + self.dt <= t:
+            self.step()
+        
+        remaining = t - self.time
+        if remaining > 0:
+            dt = self.dt
+            self.dt = remaining
+            self.step()
+            self.dt = dt
+            self.time = t
+    
+    def get_integrator_stats(self) -> dict:
+        """
+        Get adaptive integration statistics, counted per pendulum step.
+        
+        Returns:
+            Dictionary with the number of accepted steps ("nsteps"), rejected
+            steps ("nrejected") and derivative evaluations ("nfev"); all zero
+            for "rk4"
+        """
+        if self._solver is None:
+            return {"nsteps": 0, "nrejected": 0, "nfev": 0}
+        return {"nsteps": self._solver.nsteps,
+                "nrejected": self._solver.nrejected,
+                "nfev": self._solver.nfev}
+    
+    def lyapunov_exponents(self, duration: float, renormalize_every: int = 10) -> np.ndarray:
+        """
+        Estimate the maximal Lyapunov exponent of every pendulum.
+        
+        Vectorized counterpart of DoublePendulum.lyapunov_exponent(): one
+        tangent vector per pendulum is integrated with RK4 alongside a copy
+        of the batch state and renormalized every renormalize_every steps.
+        The batch itself is not advanced.
+        
+        Args:
+            duration: Time over which growth is averaged
+            renormalize_every: Steps between renormalizations
+            
+        Returns:
+            Array of shape (N,) with the estimated exponents in 1/s
+        
+        Raises:
+            ValueError: If renormalize_every is not a positive number of steps
+        """
+        if renormalize_every < 1:
+            raise ValueError(f"renormalize_every must be at least 1, got {renormalize_every}")
+        params = (self.mass1, self.mass2, self.length1, self.length2, self.gravity)
+        dt = self.dt
+        steps = max(1, round(duration / dt))
+        
+        y = self.state.copy()
+        v = np.full_like(y, 0.5)
+        log_growth = np.zeros(len(y))
+        for i in range(1, steps + 1):
+            ky1, kv1 = _batch_tangent_derivatives(y, v, *params)
+            ky2, kv2 = _batch_tangent_derivatives(y + 0.5*dt*ky1, v + 0.5*dt*kv1, *params)
+            ky3, kv3 = _batch_tangent_derivatives(y + 0.5*dt*ky2, v + 0.5*dt*kv2, *params)
+            ky4, kv4 = _batch_tangent_derivatives(y + dt*ky3, v + dt*kv3, *params)
+            y = y + (dt/6) * (ky1 + 2*ky2 + 2*ky3 + ky4)
+            v = v + (dt/6) * (kv1 + 2*kv2 + 2*kv3 + kv4)
+            
+            if i % renormalize_every == 0 or i == steps:
+                norm = np.sqrt(np.einsum("ni,ni->n", v, v))
+                log_growth += np.log(norm)
+                v /= norm[:, None]
+        return log_growth / (steps * dt)
+    
+    def energy(self) -> np.ndarray:
+        """
+        Get the total mechanical energy of every pendulum.
+        
+        Returns:
+            Array of shape (N,), computed like DoublePendulum.energy()
+        """
+        t1, t2, w1, w2 = self.state.T
+        m1, m2, l1, l2, g = self.mass1, self.mass2, self.length1, self.length2, self.gravity
+        kinetic = (0.5*(m1 + m2)*l1**2*w1**2 + 0.5*m2*l2**2*w2**2
+                   + m2*l1*l2*w1*w2*np.cos(t1 - t2))
+        potential = -(m1 + m2)*g*l1*np.cos(t1) - m2*g*l2*np.cos(t2)
+        return kinetic + potential
+    
+    def compact(self, keep: np.ndarray):
+        """
+        Drop pendulums from the batch, e.g. once they need no more steps.
+        
+        The remaining pendulums continue exactly as if nothing had been
+        removed (the adaptive solver keeps their step sizes), so the work of
+        later steps shrinks with the batch.
+        
+        Args:
+            keep: Boolean mask of shape (N,) or integer indices of the
+                  pendulums to keep, in the order they should be kept
+        """
+        keep = np.asarray(keep)
+        if keep.dtype == bool:
+            keep = np.flatnonzero(keep)
+        
+        in_sync = self._solver is not None and self.state is self._solver_output
+        self.state = self.state[keep]
+        self.length1, self.length2, self.mass1, self.mass2, self.gravity = (
+            v[keep] for v in (self.length1, self.length2, self.mass1, self.mass2, self.gravity))
+        
+        if in_sync:
+            self._solver.select(keep)
+            self._solver_output = self.state
         else:
-            self.max_history_length = max(10, length)  # Ensure at least 10 points 
\ No newline at end of file
+            self._solver = self._solver_output = None
+    
+    def run(self, steps: int):
+        """
+        Advance the whole batch by a number of steps.
+        
+        Args:
+            steps: Number of RK4 steps to take
+        """
+        for _ in range(steps):
+            self.step()
+    
+    def get_positions(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the current positions of both bobs for every pendulum.
+        
+        Returns:
+            Tuple of (x1, y1, x2, y2) arrays, each of shape (N,)
+        """
+        x1 = self.length1 * np.sin(self.theta1)
+        y1 = -self.length1 * np.cos(self.theta1)
+        x2 = x1 + self.length2 * np.sin(self.theta2)
+        y2 = y1 - self.length2 * np.cos(self.theta2)
+        return x1, y1, x2, y2
+    
+    def get_time(self) -> float:
+        """
+        Get the current simulation time.
+        
+        Returns:
+            Current time in seconds
+        """
+        return self.time
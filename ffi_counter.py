@@ -0,0 +1,68 @@
+class FfiCounter:
+    """
+    Counts Python -> JavaScript calls made while rendering.
+    
+    Each method call, property read and property assignment on a wrapped
+    object counts as one crossing of the Pyodide FFI. Counts are collected
+    per frame so the effect of batching draw calls can be measured.
+    """
+    
+    def __init__(self):
+        self.calls = 0       # Crossings in the frame being drawn
+        self.last_frame = 0  # Crossings in the last completed frame
+        self.total = 0       # Crossings since creation
+        self.frames = 0      # Completed frames
+    
+    def add(self, count: int = 1):
+        """Record count FFI crossings."""
+        self.calls += count
+        self.total += count
+    
+    def end_frame(self) -> int:
+        """
+        Close the current frame.
+        
+        Returns:
+            Number of crossings recorded during the frame
+        """
+        self.last_frame = self.calls
+        self.calls = 0
+        self.frames += 1
+        return self.last_frame
+
+
+class CountingProxy:
+    """
+    Transparent wrapper that counts the FFI crossings made through an object.
+    
+    Wrap a canvas context (or any JS proxy) with it and use it as usual;
+    every access is forwarded to the wrapped object and recorded in the
+    counter. Use unwrap() where the raw object has to be handed back to
+    JavaScript.
+    """
+    
+    def __init__(self, target, counter: FfiCounter):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_counter", counter)
+    
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        counter = self._counter
+        if callable(value):
+            def call(*args):
+                counter.add()
+                return value(*args)
+            return call
+        counter.add()
+        return value
+    
+    def __setattr__(self, name, value):
+        self._counter.add()
+        setattr(self._target, name, value)
+
+
+def unwrap(obj):
+    """Return the object wrapped by a CountingProxy (or obj itself)."""
+    if isinstance(obj, CountingProxy):
+        return object.__getattribute__(obj, "_target")
+    return obj
@@ -0,0 +1,548 @@
+import asyncio
+import heapq
+import importlib.util
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+
+# JS side of the bulk trail path: build a Path2D from packed x, y coordinates
+STROKE_POLYLINE_JS = """
+const n = coords.length / 2;
+if (n < 2) return;
+const path = new Path2D();
+let penDown = false;
+for (let i = 0; i < n; i++) {
+    const x = coords[2 * i];
+    const y = coords[2 * i + 1];
+    if (x !== x) {  // NaN marks a break in the polyline
+        penDown = false;
+    } else if (penDown) {
+        path.lineTo(x, y);
+    } else {
+        path.moveTo(x, y);
+        penDown = true;
+    }
+}
+ctx.strokeStyle = style;
+ctx.lineWidth = lineWidth;
+ctx.lineJoin = "round";
+ctx.stroke(path);
+"""
+
+
+class BrowserHost:
+    """
+    Host backed by the browser: the DOM, canvas, timers and storage reached
+    through Pyodide's js module.
+    
+    Everything app.SimulationController needs from its environment goes
+    through a host, so the controller itself never imports js. FakeHost
+    implements the same interface in pure Python.
+    """
+    
+    def __init__(self):
+        import js
+        from pyodide.ffi import create_once_callable, create_proxy, to_js
+        self._js = js
+        self._create_proxy = create_proxy
+        self._create_once_callable = create_once_callable
+        self._to_js = to_js
+        self._proxies: Dict[Callable, object] = {}
+    
+    @staticmethod
+    def available() -> bool:
+        """Check whether the code runs inside Pyodide (i.e. js can be imported)."""
+        return importlib.util.find_spec("js") is not None
+    
+    def proxy(self, callback: Callable):
+        """Get a JS-callable proxy for a Python function (one per function, reused)."""
+        proxy = self._proxies.get(callback)
+        if proxy is None:
+            proxy = self._proxies[callback] = self._create_proxy(callback)
+        return proxy
+    
+    def once(self, callback: Callable):
+        """
+        Get a JS-callable proxy for a callback that runs at most once.
+        
+        The proxy frees itself after the call and is not cached, so one-shot
+        callbacks (timeouts, often fresh lambdas) do not pile up in proxy().
+        """
+        return self._create_once_callable(callback)
+    
+    # Logging and page parameters
+    
+    def log(self, message: str):
+        self._js.console.log(message)
+    
+    @property
+    def search(self) -> str:
+        """Query string of the page URL (e.g. "?worker&speed=2")."""
+        return str(self._js.window.location.search)
+    
+    def query_param(self, name: str) -> Optional[str]:
+        value = self._js.URLSearchParams.new(self._js.window.location.search).get(name)
+        return None if value is None else str(value)
+    
+    def query_flag(self, name: str) -> bool:
+        """Check whether the page URL has the parameter name (e.g. ?worker), with or without a value."""
+        return bool(self._js.URLSearchParams.new(self._js.window.location.search).has(name))
+    
+    def clock(self) -> float:
+        """Milliseconds since the page started loading (performance.now())."""
+        return self._js.performance.now()
+    
+    async def load_packages(self, names: List[str]):
+        """Load Pyodide packages (e.g. numpy) that were not loaded with the page."""
+        import pyodide_js
+        await pyodide_js.loadPackage(self._to_js(list(names)))
+    
+    def spawn(self, coroutine):
+        """Run a coroutine in the background on the page's event loop."""
+        return asyncio.ensure_future(coroutine)
+    
+    # DOM
+    
+    def get_element(self, element_id: str):
+        return self._js.document.getElementById(element_id)
+    
+    def create_element(self, tag: str):
+        return self._js.document.createElement(tag)
+    
+    def append_to_body(self, element):
+        self._js.document.body.appendChild(element)
+    
+    def add_listener(self, target, event: str, callback: Callable):
+        target.addEventListener(event, self.proxy(callback))
+    
+    def add_window_listener(self, event: str, callback: Callable):
+        self._js.window.addEventListener(event, self.proxy(callback))
+    
+    def when_ready(self, callback: Callable[[], None]):
+        """Call callback once the DOM is parsed (right away if it already is)."""
+        if self._js.document.readyState == "loading":
+            self._js.document.addEventListener("DOMContentLoaded", self.once(lambda event: callback()),
+                                               self.to_object({"once": True}))
+        else:
+            callback()
+    
+    def expose(self, name: str, function: Callable):
+        """Make a function callable from JS as window.<name>."""
+        setattr(self._js.window, name, self.proxy(function))
+    
+    def to_object(self, data: dict):
+        """Convert a dictionary into a plain JS object."""
+        return self._to_js(data, dict_converter=self._js.Object.fromEntries)
+    
+    def to_typed_array(self, array):
+        """Convert a NumPy array into a JS typed array."""
+        return self._to_js(array)
+    
+    # Timers
+    
+    def request_frame(self, callback: Callable[[float], None]) -> int:
+        return self._js.window.requestAnimationFrame(self.proxy(callback))
+    
+    def cancel_frame(self, frame_id: int):
+        self._js.window.cancelAnimationFrame(frame_id)
+    
+    def set_timeout(self, callback: Callable[[], None], delay: float = 0) -> int:
+        return self._js.setTimeout(self.once(callback), delay)
+    
+    # Canvas
+    
+    def polyline_stroker(self) -> Callable:
+        """
+        Get the native helper that strokes a whole trail in one call.
+        
+        Returns:
+            Function stroke(ctx, coords, style, line_width) taking packed
+            float32 coordinates
+        """
+        return self._js.Function.new("ctx", "coords", "style", "lineWidth", STROKE_POLYLINE_JS)
+    
+    # Storage
+    
+    def storage_get(self, key: str) -> Optional[str]:
+        value = self._js.window.localStorage.getItem(key)
+        return None if value is None else str(value)
+    
+    def storage_set(self, key: str, value: str):
+        self._js.window.localStorage.setItem(key, value)
+    
+    def storage_remove(self, key: str):
+        self._js.window.localStorage.removeItem(key)
+    
+    # Files and workers
+    
+    async def fetch_bytes(self, url: str) -> bytes:
+        from pyodide.http import pyfetch
+        response = await pyfetch(url)
+        return await response.bytes()
+    
+    async def read_selected_file(self, event) -> Optional[bytes]:
+        """Read the file picked in an <input type="file"> change event."""
+        files = event.target.files
+        if files.length == 0:
+            return None
+        buffer = await files.item(0).arrayBuffer()
+        return buffer.to_bytes()
+    
+    def start_worker(self, script: str, on_message: Callable[[dict], None]):
+        """
+        Start a Web Worker.
+        
+        Args:
+            script: URL of the worker script
+            on_message: Called with each message converted to a dictionary
+                        (keys "type", "session", "message" and "frame")
+        
+        Returns:
+            The worker, for post_message()
+        """
+        def receive(event):
+            data = event.data
+            message = {"type": data.type, "session": getattr(data, "session", 0)}
+            if data.type == "error":
+                message["message"] = data.message
+            if data.type == "frame":
+                message["frame"] = data.frame.to_py()
+            on_message(message)
+        
+        worker = self._js.Worker.new(script)
+        worker.addEventListener("message", self.proxy(receive))
+        return worker
+    
+    def post_message(self, worker, message: dict):
+        worker.postMessage(self.to_object(message))
+
+
+class RecordingContext:
+    """Fake CanvasRenderingContext2D: every method call is counted by name."""
+    
+    def __init__(self):
+        self.calls = Counter()
+    
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        calls = self.calls
+        
+        def method(*args):
+            calls[name] += 1
+        return method
+
+
+class FakeStyle:
+    """Accepts any CSS property assignment."""
+
+
+class FakeClassList:
+    def __init__(self):
+        self.names = set()
+    
+    def add(self, name: str):
+        self.names.add(name)
+    
+    def remove(self, name: str):
+        self.names.discard(name)
+    
+    def contains(self, name: str) -> bool:
+        return name in self.names
+
+
+class FakeElement:
+    """
+    Minimal DOM element: free-form attributes, style and classList, event
+    listeners that dispatch() invokes, and the few tree operations the
+    app uses.
+    """
+    
+    def __init__(self, tag: str = "div", element_id: str = "", **attributes):
+        self.tagName = tag.upper()
+        self.id = element_id
+        self.value = ""
+        self.checked = False
+        self.textContent = ""
+        self.style = FakeStyle()
+        self.classList = FakeClassList()
+        self.children: List["FakeElement"] = []
+        self.parent: Optional["FakeElement"] = None
+        self.listeners: Dict[str, List[Callable]] = {}
+        for name, value in attributes.items():
+            setattr(self, name, value)
+    
+    def addEventListener(self, event: str, callback: Callable):
+        self.listeners.setdefault(event, []).append(callback)
+    
+    def dispatch(self, event: str, event_object=None):
+        """Invoke the listeners of an event, like a user interaction would."""
+        for callback in list(self.listeners.get(event, [])):
+            callback(event_object)
+    
+    def appendChild(self, child: "FakeElement"):
+        child.parent = self
+        self.children.append(child)
+    
+    def insertAdjacentElement(self, position: str, element: "FakeElement"):
+        parent = self.parent
+        element.parent = parent
+        if parent is not None:
+            parent.children.insert(parent.children.index(self) + 1, element)
+    
+    def remove(self):
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+
+
+class FakeCanvas(FakeElement):
+    """Canvas element whose 2D context is a RecordingContext."""
+    
+    def __init__(self, element_id: str = "", width: int = 800, height: int = 600):
+        super().__init__("canvas", element_id, width=width, height=height)
+        self.context = RecordingContext()
+    
+    def getContext(self, kind: str):
+        return self.context
+
+
+class FakeEvent:
+    """Event object with arbitrary attributes (e.g. FakeEvent(key="Enter"))."""
+    
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class FakeHost:
+    """
+    Pure-Python host for running the app without a browser.
+    
+    Provides the page elements app.py expects (canvas, angle and length
+    inputs, buttons, checkboxes, time display), a recording canvas
+    context, and a manual clock: timers and animation frames only run when
+    advance() or run_frames() is called, so frame-loop behavior and cost can
+    be exercised deterministically. Fetches and file reads return bytes
+    configured up front, and start_worker() runs a physics_worker.PhysicsWorker
+    in-process, delivering messages in both directions on the next advance().
+    """
+    
+    def __init__(self, search: str = "", theta1: float = 120.0, theta2: float = -10.0,
+                 sim_length: float = 60.0, width: int = 800, height: int = 600,
+                 echo: bool = False, files: Optional[Dict[str, bytes]] = None):
+        """
+        Args:
+            search: Page query string (e.g. "?ahead&speed=10")
+            theta1, theta2: Initial values of the angle inputs (degrees)
+            sim_length: Initial value of the simulation length input (seconds)
+            width, height: Canvas size
+            echo: Also print logged messages
+            files: Contents served by fetch_bytes(), by URL
+        """
+        self.search = search
+        self.echo = echo
+        self.files: Dict[str, bytes] = dict(files or {})
+        self.selected_file: Optional[bytes] = None  # Returned by read_selected_file()
+        self.posted: List[dict] = []  # Every message sent with post_message()
+        self.messages: List[str] = []
+        self.now = 0.0  # Clock in milliseconds
+        self.exposed: Dict[str, Callable] = {}
+        self.storage: Dict[str, str] = {}
+        self.window_listeners: Dict[str, List[Callable]] = {}
+        self.loaded_packages: List[str] = []
+        self._timers: list = []  # Heap of (due, timer id, callback)
+        self._frames: Dict[int, Callable[[float], None]] = {}
+        self._next_id = 1
+        
+        self.body = FakeElement("body")
+        self.canvas = FakeCanvas("pendulum-canvas", width, height)
+        self.elements: Dict[str, FakeElement] = {"pendulum-canvas": self.canvas}
+        for element in (FakeElement("input", "theta1", value=str(theta1)),
+                        FakeElement("input", "theta2", value=str(theta2)),
+                        FakeElement("input", "simulation-length", value=str(sim_length)),
+                        FakeElement("button", "play-button", textContent="Play/Pause"),
+                        FakeElement("button", "restart-button", textContent="Restart"),
+                        FakeElement("input", "show-trail", checked=True),
+                        FakeElement("input", "keep-full-trail"),
+                        FakeElement("div", "full-trail-container"),
+                        FakeElement("div", "restart-notice"),
+                        FakeElement("div", "time-display")):
+            self.elements[element.id] = element
+        for element in self.elements.values():
+            self.body.appendChild(element)
+    
+    @property
+    def errors(self) -> List[str]:
+        """Logged error messages."""
+        return [message for message in self.messages if message.startswith("ERROR")]
+    
+    def proxy(self, callback: Callable) -> Callable:
+        return callback
+    
+    def once(self, callback: Callable) -> Callable:
+        return callback
+    
+    def log(self, message: str):
+        self.messages.append(message)
+        if self.echo:
+            print(message)
+    
+    def query_param(self, name: str) -> Optional[str]:
+        values = parse_qs(self.search.lstrip("?")).get(name)
+        return values[0] if values else None
+    
+    def query_flag(self, name: str) -> bool:
+        return name in parse_qs(self.search.lstrip("?"), keep_blank_values=True)
+    
+    def clock(self) -> float:
+        return self.now
+    
+    async def load_packages(self, names: List[str]):
+        # Packages are installed in the Python environment already
+        self.loaded_packages.extend(names)
+    
+    def spawn(self, coroutine):
+        # The fake's awaitables are ready at once, so the coroutine runs to its end here
+        try:
+            while True:
+                coroutine.send(None)
+        except StopIteration:
+            pass
+    
+    def get_element(self, element_id: str) -> Optional[FakeElement]:
+        return self.elements.get(element_id)
+    
+    def create_element(self, tag: str) -> FakeElement:
+        return FakeCanvas() if tag == "canvas" else FakeElement(tag)
+    
+    def append_to_body(self, element: FakeElement):
+        self.body.appendChild(element)
+    
+    def add_listener(self, target: FakeElement, event: str, callback: Callable):
+        target.addEventListener(event, callback)
+    
+    def add_window_listener(self, event: str, callback: Callable):
+        self.window_listeners.setdefault(event, []).append(callback)
+    
+    def dispatch_window(self, event: str, event_object=None):
+        for callback in list(self.window_listeners.get(event, [])):
+            callback(event_object)
+    
+    def when_ready(self, callback: Callable[[], None]):
+        # The fake page is complete from the start
+        callback()
+    
+    def expose(self, name: str, function: Callable):
+        self.exposed[name] = function
+    
+    def to_object(self, data: dict) -> dict:
+        return data
+    
+    def to_typed_array(self, array):
+        return array
+    
+    def request_frame(self, callback: Callable[[float], None]) -> int:
+        frame_id = self._next_id
+        self._next_id += 1
+        self._frames[frame_id] = callback
+        return frame_id
+    
+    def cancel_frame(self, frame_id: int):
+        self._frames.pop(frame_id, None)
+    
+    def set_timeout(self, callback: Callable[[], None], delay: float = 0) -> int:
+        timer_id = self._next_id
+        self._next_id += 1
+        heapq.heappush(self._timers, (self.now + delay, timer_id, callback))
+        return timer_id
+    
+    def advance(self, milliseconds: float):
+        """Move the clock forward, running the timers that fall due."""
+        end = self.now + milliseconds
+        while self._timers and self._timers[0][0] <= end:
+            due, _, callback = heapq.heappop(self._timers)
+            self.now = max(self.now, due)
+            callback()
+        self.now = end
+    
+    def run_frames(self, count: int, interval: float = 1000 / 60) -> int:
+        """
+        Run animation frames at a fixed refresh interval.
+        
+        Args:
+            count: Number of display refreshes
+            interval: Milliseconds between refreshes
+        
+        Returns:
+            Number of frame callbacks invoked (0 once nothing requests frames)
+        """
+        invoked = 0
+        for _ in range(count):
+            self.advance(interval)
+            frames, self._frames = self._frames, {}
+            for callback in frames.values():
+                callback(self.now)
+                invoked += 1
+        return invoked
+    
+    def polyline_stroker(self) -> Callable:
+        def stroke(ctx, coords, style, line_width):
+            ctx.calls["strokePolyline"] += 1
+        return stroke
+    
+    def storage_get(self, key: str) -> Optional[str]:
+        return self.storage.get(key)
+    
+    def storage_set(self, key: str, value: str):
+        self.storage[key] = value
+    
+    def storage_remove(self, key: str):
+        self.storage.pop(key, None)
+    
+    async def fetch_bytes(self, url: str) -> bytes:
+        if url not in self.files:
+            raise FileNotFoundError(url)
+        return self.files[url]
+    
+    async def read_selected_file(self, event) -> Optional[bytes]:
+        return self.selected_file
+    
+    def start_worker(self, script: str, on_message: Callable[[dict], None]) -> "FakeWorker":
+        return FakeWorker(self, on_message)
+    
+    def post_message(self, worker: "FakeWorker", message: dict):
+        self.posted.append(message)
+        worker.post(message)
+
+
+class FakeWorker:
+    """
+    In-process stand-in for the physics Web Worker.
+    
+    Runs a physics_worker.PhysicsWorker on the host's manual clock: a posted
+    command is handled by a zero-delay timer, and the worker's replies reach
+    on_message through another one, so both directions are asynchronous
+    like postMessage but complete within the next FakeHost.advance().
+    """
+    
+    def __init__(self, host: FakeHost, on_message: Callable[[dict], None]):
+        from physics_worker import PhysicsWorker
+        self.host = host
+        self.on_message = on_message
+        self.worker = PhysicsWorker(self._reply)
+        self.handled = 0  # Commands processed so far
+        host.set_timeout(lambda: on_message({"type": "ready", "session": 0}))
+    
+    def post(self, message: dict):
+        """Queue a command for the worker."""
+        def handle():
+            self.worker.handle(dict(message))
+            self.handled += 1
+        self.host.set_timeout(handle)
+    
+    def _reply(self, message: dict):
+        message = {"session": 0, **message}
+        if "frame" in message:
+            message["frame"] = message["frame"].copy()  # Transferred, not shared
+        self.host.set_timeout(lambda: self.on_message(message))
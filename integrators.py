@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Only BatchDormandPrince45 uses NumPy; it is imported when the first one is created
+np = None
+
+
+def _import_numpy():
+    """Import NumPy into this module on first use."""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+# Dormand-Prince 5(4) Butcher tableau
+_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+)
+_B = (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84)
+
+# Difference between the 5th and embedded 4th order solutions (7 stages, FSAL)
+_E = (-71/57600, 0.0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40)
+
+# Continuous extension: y(t_old + s*h) = y_old + h * sum_i k_i * (P[i] . [s, s^2, s^3, s^4])
+_P = (
+    (1.0, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432),
+    (0.0, 0.0, 0.0, 0.0),
+    (0.0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799),
+    (0.0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072),
+    (0.0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632),
+    (0.0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844),
+    (0.0, 40617522/29380423, -110615467/29380423, 69997945/29380423),
+)
+
+# Step size controller
+_SAFETY = 0.9
+_MIN_FACTOR = 0.2
+_MAX_FACTOR = 10.0
+_ERROR_EXPONENT = -1/5
+
+
+def _dense_weights(s: float) -> Tuple[float, ...]:
+    """Weights of the seven stages for the continuous extension at fraction s."""
+    s2 = s * s
+    powers = (s, s2, s2 * s, s2 * s2)
+    return tuple(sum(p * q for p, q in zip(row, powers)) for row in _P)
+
+
+class DormandPrince45:
+    """
+    Adaptive Dormand-Prince 5(4) integrator for a single state tuple.
+    
+    Works on plain tuples of floats, so it can drive the allocation-free
+    scalar derivative functions. Step sizes are chosen to keep the local
+    error below atol + rtol * |y| per component, and the 4th order
+    continuous extension of the last accepted step gives the state at any
+    time inside it (dense output).
+    """
+    
+    def __init__(self,
+                 fun: Callable[[Tuple[float, ...]], Tuple[float, ...]],
+                 y0: Sequence[float],
+                 t0: float = 0.0,
+                 rtol: float = 1e-6,
+                 atol: float = 1e-9,
+                 first_step: Optional[float] = None,
+                 max_step: float = math.inf):
+        """
+        Initialize the integrator.
+        
+        Args:
+            fun: Derivative function mapping a state tuple to its derivative
+            y0: Initial state
+            t0: Initial time
+            rtol: Relative error tolerance
+            atol: Absolute error tolerance
+            first_step: Initial step size (estimated automatically if None)
+            max_step: Upper bound on the step size
+        """
+        self.fun = fun
+        self.t = t0
+        self.y = tuple(y0)
+        self.rtol = rtol
+        self.atol = atol
+        self.max_step = max_step
+        
+        # Statistics
+        self.nsteps = 0
+        self.nrejected = 0
+        self.nfev = 0
+        
+        self.f = self._call(self.y)
+        self.h = first_step if first_step is not None else self._initial_step()
+        
+        # Last accepted step, used for dense output
+        self._t_old = t0
+        self._y_old = self.y
+        self._h_old = 0.0
+        self._k: List[Tuple[float, ...]] = []
+    
+    def _call(self, y: Tuple[float, ...]) -> Tuple[float, ...]:
+        self.nfev += 1
+        return self.fun(y)
+    
+    def _error_norm(self, err, y, y_new) -> float:
+        """RMS norm of the error scaled by the mixed tolerance."""
+        total = 0.0
+        for e, a, b in zip(err, y, y_new):
+            scale = self.atol + max(abs(a), abs(b)) * self.rtol
+            total += (e / scale) ** 2
+        return math.sqrt(total / len(err))
+    
+    def _initial_step(self) -> float:
+        """Estimate a first step size (Hairer, Norsett & Wanner, II.4)."""
+        y, f = self.y, self.f
+        scale = [self.atol + abs(v) * self.rtol for v in y]
+        d0 = math.sqrt(sum((v / s) ** 2 for v, s in zip(y, scale)) / len(y))
+        d1 = math.sqrt(sum((v / s) ** 2 for v, s in zip(f, scale)) / len(y))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        
+        f1 = self._call(tuple(v + h0 * d for v, d in zip(y, f)))
+        d2 = math.sqrt(sum(((a - b) / s) ** 2 for a, b, s in zip(f1, f, scale)) / len(y)) / h0
+        if d1 <= 1e-15 and d2 <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2)) ** (1/5)
+        return min(100 * h0, h1, self.max_step)
+    
+    def _attempt(self, h: float):
+        """Take one trial step of size h; return (y_new, f_new, stages, error norm)."""
+        y = self.y
+        n = len(y)
+        k = [self.f]
+        for i in range(1, 6):
+            a = _A[i]
+            k.append(self._call(tuple(
+                y[j] + h * sum(a[s] * k[s][j] for s in range(i)) for j in range(n))))
+        
+        y_new = tuple(y[j] + h * sum(_B[s] * k[s][j] for s in range(6)) for j in range(n))
+        f_new = self._call(y_new)
+        k.append(f_new)
+        
+        err = [h * sum(_E[s] * k[s][j] for s in range(7)) for j in range(n)]
+        return y_new, f_new, k, self._error_norm(err, y, y_new)
+    
+    def step(self):
+        """
+        Take one accepted adaptive step, retrying with smaller steps as needed.
+        
+        Raises:
+            RuntimeError: If the step size underflows
+        """
+        h = min(self.h, self.max_step)
+        rejected = False
+        while True:
+            if h < 10 * math.ulp(max(abs(self.t), 1.0)):
+                raise RuntimeError(f"Step size underflow at t={self.t}")
+            
+            y_new, f_new, k, err_norm = self._attempt(h)
+            if err_norm < 1:
+                if err_norm == 0:
+                    factor = _MAX_FACTOR
+                else:
+                    factor = min(_MAX_FACTOR, _SAFETY * err_norm ** _ERROR_EXPONENT)
+                if rejected:
+                    factor = min(1.0, factor)
+                break
+            
+            h *= max(_MIN_FACTOR, _SAFETY * err_norm ** _ERROR_EXPONENT)
+            rejected = True
+            self.nrejected += 1
+        
+        self._t_old, self._y_old, self._h_old, self._k = self.t, self.y, h, k
+        self.t += h
+        self.y = y_new
+        self.f = f_new
+        self.h = min(h * factor, self.max_step)
+        self.nsteps += 1
+    
+    def state_at(self, t: float) -> Tuple[float, ...]:
+        """
+        Interpolate the state inside the last accepted step.
+        
+        Args:
+            t: Time between the start and end of the last step
+        
+        Returns:
+            Interpolated state tuple
+        """
+        if t == self.t:
+            return self.y
+        if not self._k or not (self._t_old <= t <= self.t):
+            raise ValueError(f"t={t} is outside the last step [{self._t_old}, {self.t}]")
+        
+        h = self._h_old
+        weights = _dense_weights((t - self._t_old) / h)
+        k = self._k
+        return tuple(y + h * sum(w * k[s][j] for s, w in enumerate(weights))
+                     for j, y in enumerate(self._y_old))
+    
+    def advance_to(self, t: float) -> Tuple[float, ...]:
+        """
+        Integrate until time t is covered and return the state at t.
+        
+        Steps are not truncated at t; the state is taken from the dense output,
+        so requesting closely spaced times does not force small steps.
+        
+        Args:
+            t: Target time, not earlier than the start of the last step
+        
+        Returns:
+            State tuple at time t
+        """
+        while self.t < t:
+            self.step()
+        return self.state_at(t)
+
+
+class BatchDormandPrince45:
+    """
+    Adaptive Dormand-Prince 5(4) integrator for a batch of independent states.
+    
+    Each row of the (N, d) state array is an independent system with its own
+    time and step size, so a chaotic lane that needs tiny steps does not slow
+    down the calm ones. Lanes that have reached the requested time are
+    dropped from the active set until the next call to advance_to().
+    """
+    
+    def __init__(self,
+                 fun: Callable[[np.ndarray, Tuple[np.ndarray, ...]], np.ndarray],
+                 y0: np.ndarray,
+                 params: Tuple[np.ndarray, ...] = (),
+                 t0: float = 0.0,
+                 rtol: float = 1e-6,
+                 atol: float = 1e-9,
+                 first_step: float = 1e-3):
+        """
+        Initialize the integrator.
+        
+        Args:
+            fun: Derivative function fun(y, params) for a (k, d) state array
+                 and the matching rows of every per-lane parameter array
+            y0: Initial states, shape (N, d)
+            params: Per-lane parameter arrays, each of shape (N,)
+            t0: Initial time shared by all lanes
+            rtol: Relative error tolerance
+            atol: Absolute error tolerance
+            first_step: Initial step size for every lane
+        """
+        _import_numpy()
+        self.fun = fun
+        self.params = params
+        self.rtol = rtol
+        self.atol = atol
+        
+        self.y = np.array(y0, dtype=np.float64)
+        n = self.y.shape[0]
+        self.t = np.full(n, t0, dtype=np.float64)
+        self.h = np.full(n, first_step, dtype=np.float64)
+        self.f = fun(self.y, params)
+        
+        # Last accepted step per lane, used for dense output
+        self._t_old = self.t.copy()
+        self._h_old = np.zeros(n)
+        self._y_old = self.y.copy()
+        self._k = np.zeros((n, 7) + self.y.shape[1:])
+        
+        # Statistics (counted per lane-step)
+        self.nsteps = 0
+        self.nrejected = 0
+        self.nfev = n
+        
+        self._a = [np.array(row) for row in _A]
+        self._b = np.array(_B)
+        self._e = np.array(_E)
+        self._p = np.array(_P)
+    
+    def _step_lanes(self, lanes: np.ndarray):
+        """Attempt one step for the given lanes, updating the accepted ones."""
+        params = tuple(p[lanes] for p in self.params)
+        y = self.y[lanes]
+        t = self.t[lanes]
+        h = self.h[lanes]
+        hc = h[:, None]
+        
+        k = np.empty((len(lanes), 7) + y.shape[1:])
+        k[:, 0] = self.f[lanes]
+        for i in range(1, 6):
+            k[:, i] = self.fun(y + hc * np.einsum("s,nsd->nd", self._a[i], k[:, :i]), params)
+        y_new = y + hc * np.einsum("s,nsd->nd", self._b, k[:, :6])
+        k[:, 6] = self.fun(y_new, params)
+        self.nfev += 6 * len(lanes)
+        
+        err = hc * np.einsum("s,nsd->nd", self._e, k)
+        scale = self.atol + np.maximum(np.abs(y), np.abs(y_new)) * self.rtol
+        err_norm = np.sqrt(np.mean((err / scale) ** 2, axis=1))
+        
+        accepted = err_norm < 1
+        with np.errstate(divide="ignore"):
+            factor = _SAFETY * err_norm ** _ERROR_EXPONENT
+        self.h[lanes] = h * np.where(accepted,
+                                     np.minimum(_MAX_FACTOR, factor),
+                                     np.maximum(_MIN_FACTOR, factor))
+        
+        ok = lanes[accepted]
+        self._t_old[ok] = t[accepted]
+        self._h_old[ok] = h[accepted]
+        self._y_old[ok] = y[accepted]
+        self._k[ok] = k[accepted]
+        self.t[ok] = t[accepted] + h[accepted]
+        self.y[ok] = y_new[accepted]
+        self.f[ok] = k[accepted, 6]
+        
+        self.nsteps += int(accepted.sum())
+        self.nrejected += int(len(lanes) - accepted.sum())
+    
+    def select(self, lanes: np.ndarray):
+        """
+        Keep only the given lanes, with their step sizes and dense output.
+        
+        Args:
+            lanes: Integer indices of the lanes to keep
+        """
+        self.params = tuple(p[lanes] for p in self.params)
+        for name in ("y", "t", "h", "f", "_t_old", "_h_old", "_y_old", "_k"):
+            setattr(self, name, getattr(self, name)[lanes])
+    
+    def state_at(self, t: float) -> np.ndarray:
+        """
+        Interpolate every lane at time t inside its last accepted step.
+        
+        Args:
+            t: Time covered by the last step of every lane
+        
+        Returns:
+            State array of shape (N, d)
+        """
+        if np.any(t < self._t_old) or np.any(t > self.t):
+            raise ValueError(f"t={t} is outside the last step of some lanes")
+        
+        h = self._h_old
+        s = np.divide(t - self._t_old, h, out=np.ones_like(h), where=h > 0)
+        powers = np.stack((s, s**2, s**3, s**4), axis=1)
+        weights = powers @ self._p.T
+        y = self._y_old + h[:, None] * np.einsum("ns,nsd->nd", weights, self._k)
+        
+        # Lanes sitting exactly on t need no interpolation
+        exact = self.t == t
+        y[exact] = self.y[exact]
+        return y
+    
+    def advance_to(self, t: float) -> np.ndarray:
+        """
+        Integrate every lane until time t is covered and return the states at t.
+        
+        Like DormandPrince45.advance_to(), steps are not truncated at t and
+        the result comes from the dense output of each lane.
+        
+        Args:
+            t: Target time, not earlier than the start of any lane's last step
+        
+        Returns:
+            State array of shape (N, d) at time t
+        """
+        lanes = np.flatnonzero(self.t < t)
+        while len(lanes):
+            self._step_lanes(lanes)
+            lanes = lanes[self.t[lanes] < t]
+        return self.state_at(t)
+
+
+# Gauss-Legendre collocation tableaus (A matrix, b weights) by number of stages
+_SQRT3 = math.sqrt(3)
+_GAUSS_LEGENDRE = {
+    1: (((1/2,),), (1.0,)),
+    2: (((1/4, 1/4 - _SQRT3/6), (1/4 + _SQRT3/6, 1/4)), (1/2, 1/2)),
+}
+
+
+def gauss_legendre_step(fun: Callable[[Tuple[float, ...]], Tuple[float, ...]],
+                        y: Tuple[float, ...],
+                        h: float,
+                        stages: int = 2,
+                        tol: float = 1e-14,
+                        max_iter: int = 100) -> Tuple[Tuple[float, ...], int]:
+    """
+    Take one implicit Gauss-Legendre collocation step.
+    
+    Gauss-Legendre methods are symplectic, so applied to a Hamiltonian
+    system in canonical coordinates they keep the energy error bounded
+    instead of letting it drift. One stage is the implicit midpoint rule
+    (order 2), two stages give order 4. The implicit stage equations are
+    solved by fixed-point iteration.
+    
+    Args:
+        fun: Derivative function mapping a state tuple to its derivative
+        y: Current state
+        h: Step size
+        stages: Number of collocation stages (1 or 2)
+        tol: Convergence threshold on the change of the stage values
+        max_iter: Maximum number of fixed-point iterations
+        
+    Returns:
+        Tuple of (new state, number of derivative evaluations)
+        
+    Raises:
+        RuntimeError: If the stage equations do not converge
+    """
+    a, b = _GAUSS_LEGENDRE[stages]
+    n = len(y)
+    f0 = fun(y)
+    k = [f0] * stages
+    nfev = 1
+    
+    for _ in range(max_iter):
+        k_new = [fun(tuple(y[j] + h * sum(a[i][s] * k[s][j] for s in range(stages))
+                           for j in range(n)))
+                 for i in range(stages)]
+        nfev += stages
+        change = max(abs(h * (p - q)) for kn, ko in zip(k_new, k) for p, q in zip(kn, ko))
+        k = k_new
+        if change <= tol * (1.0 + max(abs(v) for v in y)):
+            break
+    else:
+        raise RuntimeError("Gauss-Legendre stage iteration did not converge; reduce the step size")
+    
+    return tuple(y[j] + h * sum(b[i] * k[i][j] for i in range(stages)) for j in range(n)), nfev
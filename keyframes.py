@@ -0,0 +1,111 @@
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from double_pendulum import DoublePendulum
+
+
+class KeyframeIndex:
+    """
+    Full-state keyframes of one run, recorded at regular intervals.
+    
+    A seek restores the nearest keyframe before the target and integrates
+    only the gap, so jumping anywhere in the run takes a bounded number of
+    steps (one keyframe interval plus the length of the trail to rebuild)
+    instead of replaying the run from the start. Seeking past the last
+    keyframe integrates forward once and records the keyframes on the way.
+    
+    Continuing from a keyframe reproduces the original run exactly for the
+    fixed-step integrators; the adaptive "rk45" solver restarts its step
+    size control at the keyframe, so there the states differ slightly and
+    (the motion being chaotic) drift apart over time.
+    """
+    
+    def __init__(self, pendulum: DoublePendulum, interval: int = 100):
+        """
+        Args:
+            pendulum: Pendulum at the start of the run (recorded as the
+                      first keyframe; its parameters are used for seeks)
+            interval: Steps between keyframes
+        """
+        self.interval = interval
+        self.dt = pendulum.dt
+        self.params = {name: getattr(pendulum, name)
+                       for name in ("length1", "length2", "mass1", "mass2", "gravity",
+                                    "dt", "integrator", "rtol", "atol")}
+        self.params["backend"] = pendulum.backend.name  # Seeks keep the run's trail storage
+        self._times: List[float] = []
+        self._states: List[Tuple[float, float, float, float]] = []
+        self._next_time = float("-inf")
+        self.record(pendulum)
+    
+    def __len__(self) -> int:
+        return len(self._times)
+    
+    @property
+    def end_time(self) -> float:
+        """Time of the last keyframe."""
+        return self._times[-1]
+    
+    def record_state(self, time: float, theta1: float, theta2: float,
+                     omega1: float, omega2: float):
+        """
+        Add a keyframe if the interval since the last one has passed.
+        
+        Times already covered (e.g. when a run plays on after seeking
+        backwards) are ignored, so this can be called after every step.
+        """
+        if time < self._next_time:
+            return
+        self._times.append(time)
+        self._states.append((theta1, theta2, omega1, omega2))
+        # Half a step of slack absorbs rounding in the accumulated time
+        self._next_time = time + (self.interval - 0.5) * self.dt
+    
+    def record(self, pendulum: DoublePendulum):
+        """Add the current state of the pendulum as a keyframe if one is due."""
+        self.record_state(pendulum.time, pendulum.theta1, pendulum.theta2,
+                          pendulum.omega1, pendulum.omega2)
+    
+    def restore(self, index: int) -> DoublePendulum:
+        """
+        Create a pendulum at a keyframe.
+        
+        Args:
+            index: Keyframe number
+        
+        Returns:
+            Pendulum at the keyframe, trail holding its tip only
+        """
+        theta1, theta2, omega1, omega2 = self._states[index]
+        pendulum = DoublePendulum(theta1=theta1, theta2=theta2,
+                                  omega1=omega1, omega2=omega2, **self.params)
+        pendulum.time = self._times[index]
+        return pendulum
+    
+    def seek(self, t: float, trail: Optional[int] = 1000) -> DoublePendulum:
+        """
+        Create a pendulum at simulation time t.
+        
+        Integration starts early enough to rebuild the trail, so the result
+        looks as if the run had been played up to t: the trail ends at t
+        and holds nothing recorded after it.
+        
+        Args:
+            t: Target time (rounded to whole steps, at least the time of
+               the first keyframe)
+            trail: Trail points to rebuild (None for the full trail, which
+                   integrates from the start of the run)
+        
+        Returns:
+            Pendulum at time t with max_history_length set to trail
+        """
+        t = max(t, self._times[0])
+        start = self._times[0] if trail is None else t - trail * self.dt
+        index = max(bisect_right(self._times, start) - 1, 0)
+        pendulum = self.restore(index)
+        pendulum.set_max_history_length(trail)
+        
+        for _ in range(round((t - pendulum.time) / self.dt)):
+            pendulum.step()
+            self.record(pendulum)
+        return pendulum
@@ -0,0 +1,40 @@
+// Web Worker that runs the DoublePendulum integration in Pyodide.
+//
+// The main thread (app.py) posts command objects ({type: "init" | "advance" |
+// "reset", ...}); the Python PhysicsWorker replies with {type: "frame", frame}
+// messages whose Float64Array buffer is transferred, not copied.
+importScripts("https://cdn.jsdelivr.net/pyodide/v0.23.4/full/pyodide.js");
+
+const PYTHON_MODULES = [
+    "backends.py",
+    "double_pendulum.py",
+    "integrators.py",
+    "trail_history.py",
+    "physics_worker.py",
+];
+
+let pyodide = null;
+
+async function boot() {
+    pyodide = await loadPyodide();
+    await pyodide.loadPackage("numpy");
+
+    for (const name of PYTHON_MODULES) {
+        const source = await (await fetch(name)).text();
+        pyodide.FS.writeFile(name, source);
+    }
+
+    const worker = pyodide.runPython(`
+from physics_worker import PhysicsWorker, post_message_transport
+PhysicsWorker(post_message_transport())
+`);
+    self.postMessage({ type: "ready" });
+    return worker;
+}
+
+const ready = boot();
+
+self.onmessage = async (event) => {
+    const worker = await ready;
+    worker.handle(pyodide.toPy(event.data));
+};
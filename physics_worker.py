@@ -0,0 +1,305 @@
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+from backends import resize_history
+from double_pendulum import DoublePendulum
+
+
+# Layout of a frame buffer: a fixed header followed by interleaved tip points
+FRAME_FIELDS = ("time", "theta1", "theta2", "omega1", "omega2", "x1", "y1", "x2", "y2", "count")
+FRAME_HEADER = len(FRAME_FIELDS)
+
+
+def encode_frame(pendulum: DoublePendulum, points: np.ndarray) -> np.ndarray:
+    """
+    Pack the pendulum state and the new tip points into one float64 buffer.
+    
+    Args:
+        pendulum: Pendulum whose current state is sent
+        points: Tip points added since the previous frame, shape (n, 2)
+    
+    Returns:
+        Flat float64 array: FRAME_FIELDS followed by x0, y0, x1, y1, ...
+    """
+    frame = np.empty(FRAME_HEADER + 2 * len(points), dtype=np.float64)
+    frame[:FRAME_HEADER] = (pendulum.time,
+                            pendulum.theta1, pendulum.theta2,
+                            pendulum.omega1, pendulum.omega2,
+                            *pendulum.get_positions(),
+                            len(points))
+    frame[FRAME_HEADER:] = np.asarray(points, dtype=np.float64).ravel()
+    return frame
+
+
+def decode_frame(frame) -> dict:
+    """
+    Unpack a frame buffer produced by encode_frame.
+    
+    Args:
+        frame: Flat float64 array (or anything convertible to one)
+    
+    Returns:
+        Dictionary with one entry per FRAME_FIELDS name plus "points",
+        an (n, 2) array of new tip positions
+    """
+    frame = np.asarray(frame, dtype=np.float64)
+    decoded = dict(zip(FRAME_FIELDS, frame[:FRAME_HEADER].tolist()))
+    count = int(decoded["count"])
+    decoded["points"] = frame[FRAME_HEADER:FRAME_HEADER + 2 * count].reshape(count, 2)
+    return decoded
+
+
+class PhysicsWorker:
+    """
+    Worker-side half of the physics protocol.
+    
+    Receives command messages (plain dicts with a "type" key), integrates a
+    DoublePendulum and posts "frame" messages carrying the state and the tip
+    points produced since the previous frame. It does no rendering and never
+    touches the DOM, so it can run in a Web Worker or, for tests and
+    benchmarks, in-process behind a QueueTransport.
+    
+    Commands:
+        init:    {"type": "init", "session", "theta1", "theta2", optional
+                  DoublePendulum keyword arguments}
+        advance: {"type": "advance", "time": t} integrates whole dt steps up
+                 to simulation time t and replies with a frame
+        reset:   {"type": "reset"} drops the pendulum
+    """
+    
+    def __init__(self, post: Callable[[dict], None]):
+        """
+        Args:
+            post: Function used to send a message to the main thread
+        """
+        self.post = post
+        self.pendulum: Optional[DoublePendulum] = None
+        self.session = 0  # Echoed in every frame so stale frames can be ignored
+        self.max_steps_per_message = 10000  # Bounds the latency of a single advance
+    
+    def handle(self, message: dict):
+        """
+        Process one command message.
+        
+        Args:
+            message: Command dictionary
+        """
+        kind = message.get("type")
+        if kind == "init":
+            options = {key: value for key, value in message.items()
+                       if key not in ("type", "session")}
+            self.session = message.get("session", 0)
+            self.pendulum = DoublePendulum(**options)
+            self._post_frame(np.empty((0, 2)))
+        elif kind == "advance":
+            self._advance(float(message["time"]))
+        elif kind == "reset":
+            self.pendulum = None
+        else:
+            self.post({"type": "error", "message": f"Unknown command {kind!r}"})
+    
+    def _advance(self, target: float):
+        """Integrate up to the target time and post the resulting frame."""
+        pendulum = self.pendulum
+        if pendulum is None:
+            self.post({"type": "error", "message": "advance before init"})
+            return
+        
+        # Whole steps only; 1e-9 guards against rounding in the accumulated time
+        steps = int((target - pendulum.time) / pendulum.dt + 1e-9)
+        steps = max(0, min(steps, self.max_steps_per_message))
+        
+        points = np.empty((steps, 2), dtype=np.float64)
+        for i in range(steps):
+            pendulum.step()
+            points[i, 0] = pendulum.x2
+            points[i, 1] = pendulum.y2
+        
+        self._post_frame(points)
+    
+    def _post_frame(self, points: np.ndarray):
+        self.post({"type": "frame", "session": self.session,
+                   "frame": encode_frame(self.pendulum, points)})
+
+
+class WorkerClient:
+    """
+    Main-thread half of the physics protocol.
+    
+    Sends commands to a PhysicsWorker and mirrors the latest frame it
+    received. It exposes the parts of the DoublePendulum interface used for
+    rendering (get_positions, get_tip_history, get_time, theta1, ...), so
+    the drawing code works unchanged whether physics runs locally or in a
+    worker.
+    
+    At most one request is in flight: while the worker has not answered,
+    advance_to() only records the new target, and the reply triggers a
+    single request for the latest one. A slow worker thus gets larger
+    requests instead of a growing queue of small ones.
+    """
+    
+    def __init__(self, send: Callable[[dict], None],
+                 theta1: float, theta2: float, session: int = 0, **options):
+        """
+        Create the client and ask the worker to set up a pendulum.
+        
+        Args:
+            send: Function used to send a message to the worker
+            theta1: Initial angle of the first pendulum (in radians)
+            theta2: Initial angle of the second pendulum (in radians)
+            session: Identifier of this run; frames from other runs are ignored
+            **options: Further DoublePendulum keyword arguments
+        """
+        self.send = send
+        
+        # Mirror the initial state locally so the first frame can be drawn at once
+        local = DoublePendulum(theta1=theta1, theta2=theta2, **options)
+        self.dt = local.dt
+        self.length1 = local.length1
+        self.length2 = local.length2
+        self.time = local.time
+        self.theta1, self.theta2 = local.theta1, local.theta2
+        self.omega1, self.omega2 = local.omega1, local.omega2
+        self._positions = local.get_positions()
+        self.backend = local.backend
+        self._tip_history = self.backend.ring_history(1000)
+        self._tip_history.append(*self._positions[2:])
+        
+        self.session = session
+        self.requested_time = 0.0  # Latest target passed to advance_to()
+        self.sent_time = 0.0       # Target of the last advance sent to the worker
+        self.frames_received = 0
+        self._in_flight = True     # The init reply is pending
+        self.send({"type": "init", "session": session,
+                   "theta1": theta1, "theta2": theta2, **options})
+    
+    def advance_to(self, t: float):
+        """
+        Ask the worker to integrate up to simulation time t (non-blocking).
+        
+        If a request is still in flight, t is sent once its reply arrives.
+        
+        Args:
+            t: Target simulation time
+        """
+        self.requested_time = t
+        if not self._in_flight:
+            self._send_advance()
+    
+    def _send_advance(self):
+        self._in_flight = True
+        self.sent_time = self.requested_time
+        self.send({"type": "advance", "time": self.requested_time})
+    
+    def receive(self, message: dict):
+        """
+        Handle a message from the worker.
+        
+        Args:
+            message: Message dictionary; frames carry a float64 buffer
+        """
+        if message.get("type") != "frame" or message.get("session", 0) != self.session:
+            return
+        
+        frame = decode_frame(message["frame"])
+        self.time = frame["time"]
+        self.theta1, self.theta2 = frame["theta1"], frame["theta2"]
+        self.omega1, self.omega2 = frame["omega1"], frame["omega2"]
+        self._positions = (frame["x1"], frame["y1"], frame["x2"], frame["y2"])
+        self._tip_history.extend(self.backend.points(frame["points"]))
+        self.frames_received += 1
+        
+        self._in_flight = False
+        if self.requested_time > self.sent_time:
+            self._send_advance()
+    
+    def get_positions(self):
+        return self._positions
+    
+    def get_tip_history(self, start: int = 0) -> np.ndarray:
+        return self._tip_history.view(start)
+    
+    def get_tip_history_length(self) -> int:
+        return len(self._tip_history)
+    
+    def get_time(self) -> float:
+        return self.time
+    
+    def set_max_history_length(self, length: Optional[int] = None):
+        """Same semantics as DoublePendulum.set_max_history_length."""
+        self._tip_history = resize_history(self._tip_history, length, self.backend)
+
+
+class QueueTransport:
+    """
+    In-process stand-in for the postMessage channel between threads.
+    
+    Messages are queued in both directions and delivered by pump(), which
+    mimics the asynchronous delivery of a real worker while keeping tests
+    and benchmarks deterministic.
+    """
+    
+    def __init__(self):
+        self.to_worker = deque()
+        self.to_main = deque()
+        self.worker = PhysicsWorker(self.to_main.append)
+        self.client: Optional[WorkerClient] = None
+    
+    def connect(self, theta1: float, theta2: float, **options) -> WorkerClient:
+        """
+        Create a WorkerClient wired to the in-process worker.
+        
+        Returns:
+            The connected client
+        """
+        self.client = WorkerClient(self.to_worker.append, theta1, theta2, **options)
+        return self.client
+    
+    def pump(self) -> int:
+        """
+        Deliver all pending messages in both directions.
+        
+        Returns:
+            Number of messages delivered
+        """
+        delivered = 0
+        while self.to_worker or self.to_main:
+            while self.to_worker:
+                self.worker.handle(self.to_worker.popleft())
+                delivered += 1
+            while self.to_main:
+                message = self.to_main.popleft()
+                if self.client is not None:
+                    self.client.receive(message)
+                delivered += 1
+        return delivered
+
+
+def post_message_transport() -> Callable[[dict], None]:
+    """
+    Build the post function for a PhysicsWorker running in a Pyodide Web Worker.
+    
+    Frame buffers are copied once into a JS Float64Array whose ArrayBuffer is
+    then transferred (not copied again) to the main thread.
+    
+    Returns:
+        Function that posts a message dictionary to the main thread
+    """
+    import js
+    from pyodide.ffi import to_js
+    
+    def post(message: dict):
+        frame = message.get("frame")
+        payload = to_js({key: value for key, value in message.items() if key != "frame"},
+                        dict_converter=js.Object.fromEntries)
+        if frame is None:
+            js.postMessage(payload)
+            return
+        array = js.Float64Array.new(len(frame))
+        array.assign(frame)
+        payload.frame = array
+        js.postMessage(payload, to_js([array.buffer]))
+    
+    return post
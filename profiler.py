@@ -0,0 +1,170 @@
+import math
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Quantities recorded per frame: the interval since the previous frame,
+# time spent integrating and drawing (all in milliseconds), the number of
+# physics steps taken, the trail length in points and the FFI calls made
+FRAME_FIELDS = ("interval", "physics", "draw", "steps", "trail", "ffi")
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Percentile with linear interpolation (as numpy.percentile's default).
+    
+    Args:
+        values: Non-empty samples
+        q: Percentile in [0, 100]
+    
+    Returns:
+        The interpolated value
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class FrameProfiler:
+    """
+    Rolling per-frame statistics of the animation loop.
+    
+    The last `capacity` frames are kept in a fixed-size ring buffer (one row
+    per frame, one column per FRAME_FIELDS entry), so the profiler can stay
+    on indefinitely without growing; percentiles are computed over that
+    window on request. It has no browser (or NumPy) dependency: the clock
+    is injectable and frame timestamps are passed in, so the same collector
+    runs headlessly.
+    
+    Usage per frame:
+        profiler.begin_frame(timestamp)
+        ... physics ...
+        profiler.lap("physics")
+        ... drawing ...
+        profiler.lap("draw")
+        profiler.end_frame(steps=..., trail=..., ffi=...)
+    """
+    
+    def __init__(self, capacity: int = 600, clock: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            capacity: Number of most recent frames the statistics cover
+            clock: Function returning seconds (default: time.perf_counter)
+        """
+        self.capacity = capacity
+        self.clock = clock or time.perf_counter
+        self._frames: List[Tuple[float, ...]] = [()] * capacity
+        self._row = [0.0] * len(FRAME_FIELDS)
+        self.frames = 0                # Frames recorded since creation (or reset)
+        self._last_timestamp = None    # Timestamp of the previous frame (ms)
+        self._lap_start = None         # Clock reading at the last lap (s)
+    
+    def __len__(self) -> int:
+        """Number of frames in the window."""
+        return min(self.frames, self.capacity)
+    
+    def reset(self):
+        """Forget all recorded frames."""
+        self.frames = 0
+        self._last_timestamp = None
+        self._lap_start = None
+    
+    def begin_frame(self, timestamp: Optional[float] = None):
+        """
+        Start timing a frame.
+        
+        Args:
+            timestamp: Frame timestamp in milliseconds (e.g. from
+                       requestAnimationFrame); defaults to the clock
+        """
+        now = self.clock()
+        if timestamp is None:
+            timestamp = now * 1000.0
+        self._row = [0.0] * len(FRAME_FIELDS)
+        if self._last_timestamp is not None:
+            self._row[0] = timestamp - self._last_timestamp
+        self._last_timestamp = timestamp
+        self._lap_start = now
+    
+    def lap(self, field: str):
+        """Add the time since begin_frame or the previous lap to a field."""
+        now = self.clock()
+        self._row[FRAME_FIELDS.index(field)] += (now - self._lap_start) * 1000.0
+        self._lap_start = now
+    
+    def end_frame(self, steps: int = 0, trail: int = 0, ffi: int = 0):
+        """
+        Store the frame in the window.
+        
+        Args:
+            steps: Physics steps taken during the frame
+            trail: Trail length in points
+            ffi: Python -> JS calls made during the frame
+        """
+        row = self._row
+        row[3] = float(steps)
+        row[4] = float(trail)
+        row[5] = float(ffi)
+        self._frames[self.frames % self.capacity] = tuple(row)
+        self.frames += 1
+    
+    def samples(self) -> List[Tuple[float, ...]]:
+        """
+        Get the frames in the window, oldest first.
+        
+        Returns:
+            One tuple per frame, with one value per FRAME_FIELDS entry
+        """
+        count = len(self)
+        if self.frames <= self.capacity:
+            return self._frames[:count]
+        start = self.frames % self.capacity
+        return self._frames[start:] + self._frames[:start]
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Compute statistics over the window.
+        
+        Returns:
+            Dictionary mapping each of FRAME_FIELDS to a dictionary with
+            "p50", "p95", "p99", "mean" and "max" (empty if no frames were
+            recorded). The interval of the very first frame is unknown and
+            left out.
+        """
+        samples = self.samples()
+        stats = {}
+        for column, field in enumerate(FRAME_FIELDS):
+            values = [frame[column] for frame in samples]
+            if field == "interval" and self.frames <= self.capacity:
+                values = values[1:]
+            if len(values) == 0:
+                stats[field] = {}
+                continue
+            stats[field] = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+            stats[field]["mean"] = math.fsum(values) / len(values)
+            stats[field]["max"] = max(values)
+        return stats
+
+
+def format_summary(stats: Dict[str, Dict[str, float]], frames: int) -> str:
+    """
+    Render a summary() as a small text table, e.g. for an overlay.
+    
+    Args:
+        stats: Result of FrameProfiler.summary()
+        frames: Number of frames the statistics cover
+    
+    Returns:
+        Multi-line text
+    """
+    lines = [f"{frames} frames      p50      p95      p99"]
+    for field in FRAME_FIELDS:
+        values = stats.get(field)
+        if not values:
+            continue
+        unit = " ms" if field in ("interval", "physics", "draw") else ""
+        lines.append(f"{field + unit:<12}" + "".join(f"{values[f'p{q}']:>9.2f}" for q in PERCENTILES))
+    return "\n".join(lines)
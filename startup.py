@@ -0,0 +1,155 @@
+import asyncio
+import math
+from typing import Callable, Dict, Optional, Tuple
+
+from host import BrowserHost
+
+
+class StartupTimer:
+    """
+    Milestones of the page start, in milliseconds on the host clock.
+    
+    In the browser the clock is performance.now(), which counts from the
+    start of navigation, so each mark is the time since the page began
+    loading. A milestone is recorded the first time it is reached only.
+    """
+    
+    def __init__(self, clock: Callable[[], float]):
+        """
+        Args:
+            clock: Function returning milliseconds (e.g. host.clock)
+        """
+        self.clock = clock
+        self.marks: Dict[str, float] = {}
+    
+    def mark(self, name: str) -> float:
+        """Record a milestone (unless it was reached before) and return its time."""
+        if name not in self.marks:
+            self.marks[name] = self.clock()
+        return self.marks[name]
+    
+    def report(self) -> str:
+        """One line listing the milestones in the order they were reached."""
+        return "Startup: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.marks.items())
+
+
+def pose_positions(theta1: float, theta2: float,
+                   length1: float = 1.0, length2: float = 1.0) -> Tuple[float, float, float, float]:
+    """
+    Compute the bob positions for a pair of angles (as DoublePendulum.get_positions).
+    
+    Returns:
+        Tuple of (x1, y1, x2, y2) coordinates
+    """
+    x1 = length1 * math.sin(theta1)
+    y1 = -length1 * math.cos(theta1)
+    x2 = x1 + length2 * math.sin(theta2)
+    y2 = y1 - length2 * math.cos(theta2)
+    return x1, y1, x2, y2
+
+
+def draw_pendulum(ctx, center_x: float, center_y: float,
+                  px1: float, py1: float, px2: float, py2: float):
+    """
+    Draw the rods, bobs and pivot on a canvas context.
+    
+    Args:
+        ctx: Canvas 2D context
+        center_x, center_y: Pivot in canvas pixels
+        px1, py1, px2, py2: Bob positions in canvas pixels
+    """
+    # Draw pendulum rods
+    ctx.beginPath()
+    ctx.moveTo(center_x, center_y)
+    ctx.lineTo(px1, py1)
+    ctx.lineTo(px2, py2)
+    ctx.strokeStyle = "#2C3E50"  # Dark blue
+    ctx.lineWidth = 3
+    ctx.stroke()
+    
+    # Draw pendulum bobs
+    # First bob
+    ctx.beginPath()
+    ctx.arc(px1, py1, 10, 0, 2 * math.pi)
+    ctx.fillStyle = "#3498DB"  # Blue
+    ctx.fill()
+    
+    # Second bob
+    ctx.beginPath()
+    ctx.arc(px2, py2, 10, 0, 2 * math.pi)
+    ctx.fillStyle = "#E74C3C"  # Red
+    ctx.fill()
+    
+    # Draw pivot point
+    ctx.beginPath()
+    ctx.arc(center_x, center_y, 5, 0, 2 * math.pi)
+    ctx.fillStyle = "#2C3E50"  # Dark blue
+    ctx.fill()
+
+
+def draw_first_pose(host, scale: float = 90) -> bool:
+    """
+    Draw the initial pose from the angle inputs, with plain math only.
+    
+    Runs before the app is imported, so the page shows the pendulum while
+    the rest starts. Uses the same layout as
+    app.SimulationController.draw().
+    
+    Returns:
+        True if the pose was drawn
+    """
+    try:
+        canvas = host.get_element("pendulum-canvas")
+        theta1_input = host.get_element("theta1")
+        theta2_input = host.get_element("theta2")
+        if canvas is None or theta1_input is None or theta2_input is None:
+            return False
+        
+        ctx = canvas.getContext("2d")
+        width, height = canvas.width, canvas.height
+        center_x, center_y = width / 2, height / 2.5
+        x1, y1, x2, y2 = pose_positions(math.radians(float(theta1_input.value)),
+                                        math.radians(float(theta2_input.value)))
+        ctx.clearRect(0, 0, width, height)
+        draw_pendulum(ctx, center_x, center_y,
+                      center_x + x1 * scale, center_y + y1 * scale,
+                      center_x + x2 * scale, center_y + y2 * scale)
+        return True
+    except Exception as e:
+        host.log(f"ERROR drawing first pose: {str(e)}")
+        return False
+
+
+async def start(host, timer: Optional[StartupTimer] = None):
+    """
+    Start the page: draw the first pose, then import and start the app.
+    
+    NumPy is not loaded here; the app loads it when a feature needs it
+    (see app.SimulationController.require_numpy).
+    
+    Args:
+        host: BrowserHost or FakeHost
+        timer: Collects the startup milestones (created on the host clock if omitted)
+    """
+    timer = timer or StartupTimer(host.clock)
+    timer.mark("python")
+    if draw_first_pose(host):
+        timer.mark("first-pose")
+    
+    try:
+        import app
+        timer.mark("import")
+        app.start(host, timer)
+    except Exception as e:
+        host.log(f"ERROR starting the app: {str(e)}")
+
+
+def main():
+    """Entry point of the page (see the README on loading startup.py)."""
+    host = BrowserHost()
+    timer = StartupTimer(host.clock)
+    host.when_ready(lambda: asyncio.ensure_future(start(host, timer)))
+
+
+if __name__ == "__main__" and BrowserHost.available():
+    main()
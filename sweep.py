@@ -0,0 +1,225 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from double_pendulum import BATCH_INTEGRATORS, DoublePendulumBatch
+
+
+# Per-pendulum parameters a sweep can vary, in DoublePendulumBatch order
+SWEEP_PARAMETERS = ("theta1", "theta2", "omega1", "omega2",
+                    "length1", "length2", "mass1", "mass2", "gravity")
+
+# Steps a worker takes between checks of the cancel flag
+_CANCEL_CHECK_STEPS = 256
+
+
+class SweepCancelled(RuntimeError):
+    """Raised by ParameterSweep.run() when the sweep was cancelled."""
+
+
+def angle_grid(theta1_values, theta2_values) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a grid of initial angle pairs.
+    
+    Args:
+        theta1_values: 1-D array of first-arm angles (radians)
+        theta2_values: 1-D array of second-arm angles (radians)
+    
+    Returns:
+        (theta1, theta2) arrays of shape (len(theta2_values), len(theta1_values)),
+        so that row i, column j holds (theta1_values[j], theta2_values[i])
+    """
+    return np.meshgrid(np.asarray(theta1_values, dtype=float),
+                       np.asarray(theta2_values, dtype=float))
+
+
+def _cancel_flag(shm: shared_memory.SharedMemory) -> np.ndarray:
+    """
+    View of the cancel flag at the start of a sweep's shared block.
+    
+    Callers index the view at once and drop it: a block cannot be closed
+    while arrays still reference its buffer.
+    """
+    return np.ndarray((1,), dtype=np.float64, buffer=shm.buf)
+
+
+def _integrate_chunk(shm_name: str, total: int, start: int, inputs: np.ndarray,
+                     steps: int, dt: float, integrator: str, rtol: float, atol: float) -> int:
+    """
+    Worker entry point: integrate one chunk and store its final states.
+    
+    The shared block holds a cancel flag followed by the (total, 4) result
+    array; only the rows [start, start + len(inputs)) are written.
+    
+    Returns:
+        Number of pendulums integrated (0 if the sweep was cancelled)
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        batch = DoublePendulumBatch(*inputs.T, dt=dt, integrator=integrator, rtol=rtol, atol=atol)
+        done = 0
+        while done < steps:
+            if _cancel_flag(shm)[0]:
+                return 0
+            segment = min(_CANCEL_CHECK_STEPS, steps - done)
+            if integrator == "rk45":
+                # Dense output: stopping at segment ends does not change the result
+                batch.advance_to((done + segment) * dt)
+            else:
+                batch.run(segment)
+            done += segment
+        
+        results = np.ndarray((total, 4), dtype=np.float64, buffer=shm.buf, offset=8)
+        results[start:start + len(inputs)] = batch.state
+        del results
+        return len(inputs)
+    finally:
+        shm.close()
+
+
+class ParameterSweep:
+    """
+    Integrate a grid of double pendulums in parallel.
+    
+    The grid is flattened and split into chunks. Each chunk is integrated
+    by a DoublePendulumBatch in a ProcessPoolExecutor worker, which writes
+    the final states straight into a multiprocessing.shared_memory block,
+    so only the chunk inputs (and no results) are pickled between
+    processes. There are several chunks per worker to balance the load,
+    and the chunks are independent, so throughput grows almost linearly
+    with the number of cores.
+    
+    A sweep can be cancelled from another thread (or from a progress
+    callback) with cancel(): queued chunks are dropped and running workers
+    stop at their next check of a flag in the shared block.
+    """
+    
+    def __init__(self, theta1, theta2, duration: float,
+                 omega1=0.0, omega2=0.0,
+                 length1=1.0, length2=1.0,
+                 mass1=1.0, mass2=1.0,
+                 gravity=-9.8,
+                 dt: float = 0.01,
+                 integrator: str = "rk4",
+                 rtol: float = 1e-6,
+                 atol: float = 1e-9,
+                 workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None):
+        """
+        Describe a sweep.
+        
+        All per-pendulum arguments may be scalars or arrays of any shape;
+        they are broadcast against each other, and the result has the
+        broadcast shape (see angle_grid for building 2-D grids).
+        
+        Args:
+            theta1, theta2, omega1, omega2, length1, length2, mass1, mass2,
+            gravity: Initial conditions and parameters (see DoublePendulumBatch)
+            duration: Simulated time for every pendulum
+            dt: Time step
+            integrator: "rk4" or "rk45"
+            rtol, atol: Tolerances of the adaptive integrator
+            workers: Number of worker processes (default: os.cpu_count())
+            chunk_size: Pendulums per task (default: about 8 tasks per worker)
+        """
+        if integrator not in BATCH_INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator!r}, expected one of {BATCH_INTEGRATORS}")
+        
+        values = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in
+                                       (theta1, theta2, omega1, omega2,
+                                        length1, length2, mass1, mass2, gravity)))
+        self.shape = values[0].shape
+        self.inputs = np.stack([v.ravel() for v in values], axis=1)  # (N, len(SWEEP_PARAMETERS))
+        self.duration = duration
+        self.dt = dt
+        self.steps = round(duration / dt)
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self.workers = workers or os.cpu_count() or 1
+        
+        total = len(self.inputs)
+        if chunk_size is None:
+            chunk_size = max(64, -(-total // (8 * self.workers)))
+        self.chunk_size = chunk_size
+        
+        self._shm: Optional[shared_memory.SharedMemory] = None
+    
+    def __len__(self) -> int:
+        return len(self.inputs)
+    
+    def cancel(self):
+        """Ask a running sweep to stop as soon as possible."""
+        if self._shm is not None:
+            _cancel_flag(self._shm)[0] = 1.0
+    
+    def run(self, progress: Optional[Callable[[int, int], None]] = None) -> np.ndarray:
+        """
+        Run the sweep.
+        
+        Args:
+            progress: Optional callback progress(done, total) called after
+                each finished chunk with the number of pendulums integrated
+        
+        Returns:
+            Final states, shape self.shape + (4,) with [theta1, theta2,
+            omega1, omega2] along the last axis
+        
+        Raises:
+            SweepCancelled: If cancel() stopped the sweep before every result
+                was computed
+        """
+        total = len(self.inputs)
+        shm = shared_memory.SharedMemory(create=True, size=8 * (1 + 4 * total))
+        self._shm = shm
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            _cancel_flag(shm)[0] = 0.0
+            
+            pending = set()
+            for start in range(0, total, self.chunk_size):
+                pending.add(executor.submit(_integrate_chunk, shm.name, total, start,
+                                            self.inputs[start:start + self.chunk_size],
+                                            self.steps, self.dt, self.integrator,
+                                            self.rtol, self.atol))
+            
+            done = 0
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done += future.result()
+                if _cancel_flag(shm)[0]:
+                    break
+                if progress is not None:
+                    progress(done, total)
+            
+            # A cancel that came after the last chunk finished loses nothing
+            if done < total:
+                raise SweepCancelled(f"Sweep cancelled after {done} of {total} pendulums")
+            
+            results = np.ndarray((total, 4), dtype=np.float64, buffer=shm.buf, offset=8)
+            states = results.copy().reshape(self.shape + (4,))
+            del results
+            return states
+        except BaseException:
+            # Stop running workers (e.g. on KeyboardInterrupt) before freeing the block
+            self.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._shm = None
+            shm.close()
+            shm.unlink()
+
+
+def sweep(theta1, theta2, duration: float, progress: Optional[Callable[[int, int], None]] = None,
+          **options) -> np.ndarray:
+    """
+    Integrate a grid of pendulums in parallel and return their final states.
+    
+    Shorthand for ParameterSweep(theta1, theta2, duration, **options).run(progress).
+    """
+    return ParameterSweep(theta1, theta2, duration, **options).run(progress)
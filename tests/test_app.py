@@ -0,0 +1,202 @@
+import math
+
+import pytest
+
+from app import SESSION_KEY, SimulationController
+from double_pendulum import DoublePendulum
+from host import FakeHost
+
+
+def start(numpy=False, **options):
+    host = FakeHost(**options)
+    controller = SimulationController(host)
+    if numpy:
+        # Turn on the trajectory cache from the first run
+        host.spawn(controller.require_numpy())
+    controller.init()
+    return host, controller
+
+
+def click(host, element_id):
+    host.elements[element_id].dispatch("click")
+
+
+def test_init_starts_running():
+    host, controller = start()
+    
+    assert controller.running
+    assert controller.pendulum.get_time() == 0.0
+    assert controller.pendulum.get_tip_history_length() == 1
+    assert host.errors == []
+
+
+def test_frames_advance_in_fixed_steps():
+    host, controller = start()
+    
+    # The first frame only starts the clock; 60 more cover one second
+    assert host.run_frames(61) == 61
+    
+    pendulum = controller.pendulum
+    steps = round(pendulum.get_time() / pendulum.dt)
+    assert abs(pendulum.get_time() - 1.0) <= pendulum.dt
+    assert pendulum.get_tip_history_length() == steps + 1
+    assert controller.profiler.frames == 60
+    assert host.errors == []
+
+
+def test_trail_length_limit():
+    host, controller = start()
+    
+    host.run_frames(700)
+    assert controller.pendulum.get_tip_history_length() == 1000
+    
+    controller.toggle_full_trail()
+    host.run_frames(60)
+    assert controller.pendulum.get_tip_history_length() > 1000
+    assert host.errors == []
+
+
+def test_pause_and_resume():
+    host, controller = start()
+    host.run_frames(30)
+    
+    click(host, "play-button")
+    paused_at = controller.pendulum.get_time()
+    assert not controller.running
+    assert host.run_frames(30) == 0
+    assert controller.pendulum.get_time() == paused_at
+    
+    click(host, "play-button")
+    host.run_frames(30)
+    assert controller.running
+    assert controller.pendulum.get_time() > paused_at
+
+
+def test_restart_replays_the_cached_run():
+    host, controller = start(numpy=True)
+    host.run_frames(61)
+    
+    click(host, "restart-button")
+    assert not controller.running
+    assert controller.pendulum.get_time() == 0.0
+    assert controller.pendulum.get_tip_history_length() == 1
+    assert controller.cached_run is not None
+    
+    click(host, "play-button")
+    host.run_frames(31)
+    
+    # The replay shows the states the live run computed
+    reference = DoublePendulum(theta1=math.radians(120), theta2=math.radians(-10))
+    for _ in range(round(controller.pendulum.get_time() / reference.dt)):
+        reference.step()
+    assert controller.pendulum.get_positions() == pytest.approx(reference.get_positions())
+    assert host.errors == []
+
+
+def test_restart_uses_new_inputs():
+    host, controller = start()
+    host.run_frames(30)
+    
+    host.elements["theta1"].value = "45"
+    click(host, "restart-button")
+    
+    assert isinstance(controller.pendulum, DoublePendulum)
+    assert controller.pendulum.theta1 == pytest.approx(math.radians(45))
+    assert controller.pendulum.get_time() == 0.0
+
+
+def test_session_restore():
+    host, controller = start()
+    host.run_frames(61)
+    saved = controller.pendulum
+    
+    host.dispatch_window("pagehide")
+    assert SESSION_KEY in host.storage
+    
+    reloaded = FakeHost()
+    reloaded.storage.update(host.storage)
+    restored = SimulationController(reloaded)
+    restored.init()
+    
+    assert restored.running
+    assert restored.pendulum.get_time() == saved.get_time()
+    assert (restored.pendulum.theta1, restored.pendulum.theta2) == (saved.theta1, saved.theta2)
+    assert restored.pendulum.get_tip_history_length() == saved.get_tip_history_length()
+    
+    reloaded.run_frames(30)
+    assert restored.pendulum.get_time() > saved.get_time()
+    assert reloaded.errors == []
+
+
+def test_math_full_trail_draws_only_new_segments():
+    host, controller = start()
+    strokes = []
+    controller.stroke_polyline = lambda ctx, coords, style, width: strokes.append(list(coords))
+    controller.keep_full_trail = True
+    controller.pendulum.set_max_history_length(None)
+    controller.invalidate_trail_layer()
+    
+    host.run_frames(120)
+    
+    assert controller.backend.name == "math"
+    assert controller.trail_layer is not None
+    assert controller.pendulum.get_tip_history_length() > 150
+    # One stroke per frame, covering that frame's (at most 2) steps and
+    # starting where the previous one ended
+    assert len(strokes) > 100
+    for previous, stroke in zip(strokes, strokes[1:]):
+        assert len(stroke) <= 2 * 4  # Packed x, y values
+        assert stroke[:2] == previous[-2:]
+    assert host.errors == []
+
+
+def test_query_flags_match_whole_names():
+    host, controller = start(search="?title=worker-ahead-profile-per-point-trail")
+    
+    assert host.loaded_packages == []
+    assert not controller.use_worker
+    assert not controller.compute_ahead
+    assert controller.bulk_trail
+    assert controller.profiler_overlay is None
+    
+    flags = FakeHost(search="?profile&speed=2&ahead=")
+    assert flags.query_flag("profile")
+    assert flags.query_flag("ahead")
+    assert flags.query_flag("speed")
+    assert not flags.query_flag("worker")
+
+
+def test_worker_mode_runs_physics_in_fake_worker():
+    host, controller = start(search="?worker")
+    host.run_frames(121)
+    
+    assert controller.use_worker
+    assert controller.pendulum.frames_received > 0
+    assert controller.pendulum.get_time() == pytest.approx(2.0, abs=0.1)
+    assert host.posted[0]["type"] == "init"
+    assert {message["type"] for message in host.posted[1:]} == {"advance"}
+    assert "Physics worker ready" in host.messages
+    assert host.errors == []
+
+
+def test_replay_from_url(tmp_path):
+    from trajectory import TrajectoryWriter
+    path = str(tmp_path / "run.traj")
+    pendulum = DoublePendulum(theta1=1.0, theta2=0.5)
+    writer = TrajectoryWriter(path, capacity=200, dt=pendulum.dt, params={"theta1": 1.0, "theta2": 0.5})
+    for _ in range(200):
+        writer.append([pendulum.time], [pendulum.theta1], [pendulum.theta2], [pendulum.omega1],
+                      [pendulum.omega2], [pendulum.x2], [pendulum.y2])
+        pendulum.step()
+    writer.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    
+    host, controller = start(search="?replay=run.traj", files={"run.traj": data})
+    assert controller.replay_file is not None
+    assert len(controller.replay_file) == 200
+    host.run_frames(60)
+    assert host.errors == []
+    
+    missing, _ = start(search="?replay=missing.traj")
+    assert any("missing.traj" in message for message in missing.errors)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from cli import main
+
+
+def test_lyapunov_map_rejects_other_integrators(tmp_path, capsys):
+    output = tmp_path / "map.npy"
+    
+    status = main(["map", "--quantity", "lyapunov", "--integrator", "rk45",
+                   "--resolution", "4", "--max-time", "0.1", "-o", str(output)])
+    
+    assert status == 2
+    assert "--integrator" in capsys.readouterr().err
+    assert not output.exists()
+
+
+def test_lyapunov_map_accepts_rk4(tmp_path):
+    output = tmp_path / "map.npy"
+    
+    status = main(["map", "--quantity", "lyapunov", "--integrator", "rk4",
+                   "--resolution", "4", "--max-time", "0.1", "-o", str(output)])
+    
+    assert status == 0
+    assert np.load(output).shape == (4, 4)
+
+
+def test_flip_map_uses_integrator(tmp_path):
+    output = tmp_path / "flip.npy"
+    
+    status = main(["map", "--integrator", "rk45", "--resolution", "4",
+                   "--max-time", "0.1", "-o", str(output)])
+    
+    assert status == 0
+    assert np.load(output).shape == (4, 4)
+
+
+def test_flip_map_progress_is_throttled(tmp_path, capsys):
+    output = tmp_path / "flip.npy"
+    
+    # 1000 steps of dt, but at most one progress line per percent
+    status = main(["map", "--resolution", "2", "--max-time", "10", "--dt", "0.01", "-o", str(output)])
+    
+    assert status == 0
+    assert 1 <= capsys.readouterr().err.count("\r") <= 101
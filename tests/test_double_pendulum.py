@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_step import LegacyDoublePendulum
+from double_pendulum import INTEGRATORS, DoublePendulum, DoublePendulumBatch, read_snapshot
+from integrators import DormandPrince45
+
+
+def state(pendulum):
+    return pendulum.theta1, pendulum.theta2, pendulum.omega1, pendulum.omega2
+
+
+def test_rk4_step_matches_original_array_step_bit_for_bit():
+    legacy = LegacyDoublePendulum(theta1=2.0, theta2=2.5)
+    current = DoublePendulum(theta1=2.0, theta2=2.5)
+    for _ in range(5000):
+        legacy.step()
+        current.step()
+        assert state(current) == state(legacy)
+    assert (current.x2, current.y2) == (legacy.x2, legacy.y2)
+
+
+def test_batch_matches_scalar_runs():
+    theta1 = np.linspace(-2.5, 2.5, 7)
+    theta2 = np.linspace(3.0, -1.0, 7)
+    length2 = np.linspace(0.5, 1.5, 7)
+    batch = DoublePendulumBatch(theta1, theta2, omega1=0.3, length2=length2)
+    batch.run(500)
+    
+    for i in range(len(batch)):
+        pendulum = DoublePendulum(theta1=theta1[i], theta2=theta2[i], omega1=0.3, length2=length2[i])
+        for _ in range(500):
+            pendulum.step()
+        np.testing.assert_allclose(batch.state[i], state(pendulum), rtol=1e-9, atol=1e-12)
+    assert batch.get_time() == pytest.approx(pendulum.time)
+
+
+def test_rk45_dense_output_tracks_exact_solution():
+    # y'' = -y, y(0) = 1: dense output between steps must be as accurate as the steps
+    solver = DormandPrince45(lambda y: (y[1], -y[0]), (1.0, 0.0), rtol=1e-8, atol=1e-10)
+    for t in np.linspace(0.0, 10.0, 1001):
+        y, v = solver.advance_to(t)
+        assert y == pytest.approx(math.cos(t), abs=1e-6)
+        assert v == pytest.approx(-math.sin(t), abs=1e-6)
+    assert solver.nsteps < 200
+
+
+def test_rk45_error_shrinks_with_tolerance():
+    reference = DoublePendulum(theta1=2.0, theta2=2.5, dt=1e-4)
+    reference.set_max_history_length(10)
+    reference.advance_to(2.0)
+    
+    errors = []
+    for rtol in (1e-4, 1e-6, 1e-8):
+        pendulum = DoublePendulum(theta1=2.0, theta2=2.5, integrator="rk45", rtol=rtol, atol=rtol * 1e-3)
+        pendulum.advance_to(2.0)
+        errors.append(max(abs(a - b) for a, b in zip(state(pendulum), state(reference))))
+    assert errors[0] > errors[1] > errors[2]
+    assert errors[2] < 1e-5
+
+
+@pytest.mark.parametrize("integrator, bound", [("midpoint", 1e-3), ("gl4", 1e-7)])
+def test_symplectic_energy_drift_stays_bounded(integrator, bound):
+    pendulum = DoublePendulum(theta1=2.0, theta2=2.5, integrator=integrator)
+    pendulum.set_max_history_length(10)
+    e0 = pendulum.energy()
+    
+    # 200 simulated seconds, sampled every 10
+    errors = []
+    for _ in range(20):
+        for _ in range(1000):
+            pendulum.step()
+        errors.append(abs(pendulum.energy() - e0) / abs(e0))
+    assert max(errors) < bound
+
+
+@pytest.mark.parametrize("integrator", INTEGRATORS)
+@pytest.mark.parametrize("backend", ["math", "numpy"])
+def test_snapshot_round_trip_continues_identically(integrator, backend):
+    pendulum = DoublePendulum(theta1=2.0, theta2=2.5, dt=0.02, integrator=integrator, backend=backend)
+    for _ in range(150):
+        pendulum.step()
+    
+    restored, metadata = read_snapshot(pendulum.snapshot({"rows": 150}), backend)
+    assert metadata == {"rows": 150}
+    for copy in (pendulum, restored):
+        for _ in range(150):
+            copy.step()
+    assert restored.time == pendulum.time
+    if integrator == "rk45":
+        # The restored solver restarts its step size control, so only the tolerance holds
+        np.testing.assert_allclose(state(restored), state(pendulum), rtol=1e-4, atol=1e-4)
+        return
+    assert state(restored) == state(pendulum)
+    np.testing.assert_array_equal(restored.get_tip_history(), pendulum.get_tip_history())
+
+
+def test_read_snapshot_rejects_bad_input():
+    data = DoublePendulum().snapshot()
+    with pytest.raises(ValueError):
+        read_snapshot(data[:-1])
+    with pytest.raises(ValueError):
+        read_snapshot(data[:10])
+    with pytest.raises(ValueError):
+        read_snapshot(b"X" + data[1:])
+
+
+@pytest.mark.parametrize("renormalize_every", [0, -3])
+def test_lyapunov_rejects_non_positive_renormalize_every(renormalize_every):
+    with pytest.raises(ValueError):
+        DoublePendulum().lyapunov_exponent(1.0, renormalize_every)
+    with pytest.raises(ValueError):
+        DoublePendulumBatch([1.0, 2.0], 0.5).lyapunov_exponents(1.0, renormalize_every)
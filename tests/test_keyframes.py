@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from double_pendulum import DoublePendulum
+from keyframes import KeyframeIndex
+
+
+def state(pendulum):
+    return pendulum.theta1, pendulum.theta2, pendulum.omega1, pendulum.omega2
+
+
+def run(steps, **options):
+    pendulum = DoublePendulum(theta1=2.0, theta2=2.5, **options)
+    pendulum.set_max_history_length(1000)
+    for _ in range(steps):
+        pendulum.step()
+    return pendulum
+
+
+@pytest.mark.parametrize("integrator", ["rk4", "gl4"])
+def test_seek_matches_stepping_straight_to_t(integrator):
+    keyframes = KeyframeIndex(DoublePendulum(theta1=2.0, theta2=2.5, integrator=integrator), interval=50)
+    
+    # Forward past the last keyframe, then back, then to a keyframe time
+    for steps in (1234, 310, 1234, 500):
+        seeked = keyframes.seek(steps * 0.01, trail=200)
+        direct = run(steps, integrator=integrator)
+        assert state(seeked) == state(direct)
+        assert seeked.time == pytest.approx(direct.time)
+        np.testing.assert_array_equal(seeked.get_tip_history(), direct.get_tip_history()[-200:])
+    assert len(keyframes) == 1234 // 50 + 1
+
+
+def test_seek_full_trail_replays_from_start():
+    keyframes = KeyframeIndex(DoublePendulum(theta1=2.0, theta2=2.5), interval=50)
+    seeked = keyframes.seek(3.0, trail=None)
+    direct = run(300)
+    np.testing.assert_array_equal(seeked.get_tip_history(), direct.get_tip_history())
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from double_pendulum import DoublePendulum
+from physics_worker import FRAME_FIELDS, PhysicsWorker, QueueTransport, decode_frame, encode_frame
+
+
+def test_encode_decode_round_trip():
+    pendulum = DoublePendulum(theta1=1.0, theta2=-0.5)
+    for _ in range(10):
+        pendulum.step()
+    points = np.array([[0.1, -0.2], [0.3, -0.4], [0.5, -0.6]])
+    
+    decoded = decode_frame(encode_frame(pendulum, points))
+    
+    assert set(decoded) == set(FRAME_FIELDS) | {"points"}
+    assert decoded["time"] == pendulum.time
+    assert (decoded["theta1"], decoded["theta2"]) == (pendulum.theta1, pendulum.theta2)
+    assert (decoded["omega1"], decoded["omega2"]) == (pendulum.omega1, pendulum.omega2)
+    assert (decoded["x1"], decoded["y1"], decoded["x2"], decoded["y2"]) == pendulum.get_positions()
+    assert decoded["count"] == 3
+    np.testing.assert_array_equal(decoded["points"], points)
+
+
+def test_decode_empty_frame():
+    decoded = decode_frame(encode_frame(DoublePendulum(theta1=1.0, theta2=0.0), np.empty((0, 2))))
+    
+    assert decoded["points"].shape == (0, 2)
+
+
+def test_queue_transport_matches_local_pendulum():
+    transport = QueueTransport()
+    client = transport.connect(1.0, -0.5)
+    transport.pump()
+    
+    client.advance_to(0.5)
+    assert client.get_time() == 0.0  # Nothing arrives before the next pump
+    assert transport.pump() == 2  # The advance command and its frame
+    
+    local = DoublePendulum(theta1=1.0, theta2=-0.5)
+    for _ in range(50):
+        local.step()
+    assert client.get_time() == pytest.approx(local.time)
+    assert (client.theta1, client.theta2) == (local.theta1, local.theta2)
+    assert client.get_positions() == local.get_positions()
+    np.testing.assert_array_equal(client.get_tip_history(), local.get_tip_history())
+    assert client.frames_received == 2
+
+
+def test_frames_of_other_sessions_are_ignored():
+    transport = QueueTransport()
+    client = transport.connect(1.0, -0.5)
+    transport.pump()
+    
+    transport.worker.session = client.session + 1
+    client.advance_to(0.5)
+    transport.pump()
+    
+    assert client.get_time() == 0.0
+    assert client.frames_received == 1
+
+
+def test_worker_reports_errors():
+    messages = []
+    worker = PhysicsWorker(messages.append)
+    
+    worker.handle({"type": "advance", "time": 1.0})
+    worker.handle({"type": "spin"})
+    
+    assert [message["type"] for message in messages] == ["error", "error"]
+    assert "advance before init" in messages[0]["message"]
+
+
+def test_one_advance_in_flight_and_missed_targets_folded():
+    transport = QueueTransport()
+    client = transport.connect(1.0, -0.5)
+    client.advance_to(0.1)  # Init reply still pending
+    assert [message["type"] for message in transport.to_worker] == ["init"]
+    transport.pump()
+    assert client.get_time() == pytest.approx(0.1)
+    
+    for t in (0.2, 0.3, 0.4):
+        client.advance_to(t)
+    assert len(transport.to_worker) == 1  # Only the request for 0.2
+    assert transport.pump() == 4  # 0.2 and, on its reply, one request for 0.4
+    assert client.get_time() == pytest.approx(0.4)
+    assert client.frames_received == 4
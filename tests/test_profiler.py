@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from profiler import FRAME_FIELDS, FrameProfiler, format_summary, percentile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def record(profiler, clock, timestamp, physics_ms, steps):
+    profiler.begin_frame(timestamp)
+    clock.now += physics_ms / 1000.0
+    profiler.lap("physics")
+    profiler.end_frame(steps=steps)
+
+
+def test_summary_before_wraparound():
+    clock = FakeClock()
+    profiler = FrameProfiler(capacity=4, clock=clock)
+    for i, timestamp in enumerate((0, 10, 30)):
+        record(profiler, clock, timestamp, physics_ms=i + 1, steps=i)
+    
+    stats = profiler.summary()
+    
+    assert len(profiler) == 3
+    # The first frame has no interval
+    assert stats["interval"]["mean"] == pytest.approx(15.0)
+    assert stats["interval"]["max"] == pytest.approx(20.0)
+    assert stats["physics"]["mean"] == pytest.approx(2.0)
+    assert stats["steps"]["max"] == 2.0
+
+
+def test_summary_across_wraparound():
+    clock = FakeClock()
+    profiler = FrameProfiler(capacity=4, clock=clock)
+    timestamps = (0, 10, 30, 60, 100, 150)
+    for i, timestamp in enumerate(timestamps):
+        record(profiler, clock, timestamp, physics_ms=i + 1, steps=i)
+    
+    samples = profiler.samples()
+    stats = profiler.summary()
+    
+    assert profiler.frames == 6
+    assert len(profiler) == 4
+    # Oldest first: frames 2 to 5 are left in the window
+    assert [frame[FRAME_FIELDS.index("steps")] for frame in samples] == [2.0, 3.0, 4.0, 5.0]
+    intervals = [20.0, 30.0, 40.0, 50.0]
+    assert stats["interval"]["mean"] == pytest.approx(35.0)
+    assert stats["interval"]["max"] == pytest.approx(50.0)
+    for q in (50, 95, 99):
+        assert stats["interval"][f"p{q}"] == pytest.approx(np.percentile(intervals, q))
+    assert stats["physics"]["p50"] == pytest.approx(4.5)
+
+
+def test_reset_and_empty_summary():
+    profiler = FrameProfiler(capacity=4, clock=FakeClock())
+    profiler.begin_frame(0.0)
+    profiler.end_frame()
+    profiler.reset()
+    
+    assert len(profiler) == 0
+    assert profiler.summary() == {field: {} for field in FRAME_FIELDS}
+    assert format_summary(profiler.summary(), 0) == "0 frames      p50      p95      p99"
+
+
+def test_percentile_matches_numpy():
+    values = [3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0]
+    for q in (0, 50, 95, 99, 100):
+        assert percentile(values, q) == pytest.approx(np.percentile(values, q))
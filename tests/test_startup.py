@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+
+from app import SimulationController
+from host import FakeHost
+
+
+# The page start in a fresh interpreter; "block" makes NumPy unimportable,
+# like a Pyodide page that never loaded the package
+START_PAGE = """
+import asyncio, json, sys
+if sys.argv[1] == "block":
+    sys.modules["numpy"] = None
+from host import FakeHost
+import startup
+host = FakeHost()
+asyncio.run(startup.start(host))
+host.run_frames(60)
+import app
+print(json.dumps({"errors": host.errors, "packages": host.loaded_packages,
+                  "numpy_loaded": sys.modules.get("numpy") is not None,
+                  "time": app.controller.pendulum.get_time(),
+                  "backend": app.controller.backend.name}))
+"""
+
+
+def start_page(numpy):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", START_PAGE, "allow" if numpy else "block"],
+                            cwd=root, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def test_plain_page_does_not_load_numpy():
+    result = start_page(numpy=True)
+    
+    assert result["errors"] == []
+    assert result["packages"] == []
+    assert not result["numpy_loaded"]
+    assert result["backend"] == "math"
+    assert result["time"] > 0.9
+
+
+def test_plain_page_runs_without_numpy():
+    result = start_page(numpy=False)
+    
+    assert result["errors"] == []
+    assert result["time"] > 0.9
+
+
+def test_full_trail_loads_numpy():
+    host = FakeHost()
+    controller = SimulationController(host)
+    controller.init()
+    host.run_frames(30)
+    
+    controller.toggle_full_trail()
+    host.run_frames(30)
+    
+    assert host.loaded_packages == ["numpy"]
+    assert controller.backend.name == "numpy"
+    assert controller.trail_decimator is not None
+    assert host.errors == []
+
+
+def test_ahead_loads_numpy_before_the_first_run():
+    host = FakeHost(search="?ahead")
+    controller = SimulationController(host)
+    controller.init()
+    host.run_frames(30)
+    
+    assert host.loaded_packages == ["numpy"]
+    assert controller.compute_ahead
+    assert controller.precompute is not None
+    assert controller.pendulum.get_time() > 0.0
+    assert host.errors == []
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from double_pendulum import DoublePendulumBatch
+from sweep import ParameterSweep, SweepCancelled
+
+
+def make_sweep():
+    theta1 = np.linspace(-2.0, 2.0, 8)
+    return ParameterSweep(theta1, 1.0, duration=0.2, workers=1, chunk_size=2)
+
+
+def test_results_match_batch():
+    sweep = make_sweep()
+    states = sweep.run()
+    
+    batch = DoublePendulumBatch(sweep.inputs[:, 0], sweep.inputs[:, 1])
+    batch.run(sweep.steps)
+    np.testing.assert_allclose(states, batch.state)
+
+
+def test_cancel_after_last_chunk_returns_results():
+    sweep = make_sweep()
+    
+    def progress(done, total):
+        if done == total:
+            sweep.cancel()
+    
+    states = sweep.run(progress)
+    
+    assert states.shape == (8, 4)
+    np.testing.assert_allclose(states, make_sweep().run())
+
+
+def test_cancel_with_work_pending_raises():
+    sweep = make_sweep()
+    
+    def progress(done, total):
+        sweep.cancel()
+    
+    with pytest.raises(SweepCancelled):
+        sweep.run(progress)
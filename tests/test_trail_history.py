@@ -0,0 +1,55 @@
+import numpy as np
+
+from trail_history import ChunkedHistory, RingHistory
+
+
+def test_chunked_view_at_end_on_chunk_boundary():
+    history = ChunkedHistory(chunk_size=4)
+    history.extend(np.zeros((8, 2)))
+    
+    view = history.view(8)
+    
+    assert view.shape == (0, 2)
+    assert not view.flags.writeable
+
+
+def test_chunked_view_from_start_spans_chunks():
+    points = np.arange(20, dtype=np.float64).reshape(10, 2)
+    history = ChunkedHistory(chunk_size=4)
+    history.extend(points)
+    
+    for start in range(11):
+        np.testing.assert_array_equal(history.view(start), points[start:])
+
+
+def test_chunked_view_after_cached_full_view():
+    history = ChunkedHistory(chunk_size=4)
+    history.extend(np.ones((8, 2)))
+    history.view()
+    
+    assert history.view(8).shape == (0, 2)
+
+
+def test_ring_keeps_newest_points():
+    history = RingHistory(3)
+    for i in range(5):
+        history.append(i, -i)
+    
+    np.testing.assert_array_equal(history.view(), [[2, -2], [3, -3], [4, -4]])
+    np.testing.assert_array_equal(history.view(3), np.empty((0, 2)))
+
+
+def test_ring_extend_matches_appends_across_wraps():
+    rng = np.random.default_rng(0)
+    extended = RingHistory(7)
+    appended = RingHistory(7)
+    for size in (0, 3, 5, 7, 1, 12, 6, 2, 9):
+        block = rng.standard_normal((size, 2))
+        extended.extend(block)
+        for x, y in block:
+            appended.append(x, y)
+        np.testing.assert_array_equal(extended.view(), appended.view())
+    
+    extended.append(1.0, 2.0)
+    appended.append(1.0, 2.0)
+    np.testing.assert_array_equal(extended.view(), appended.view())
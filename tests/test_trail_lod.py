@@ -0,0 +1,57 @@
+import numpy as np
+
+from trail_lod import TrailDecimator, bucket_polyline
+
+
+def line(n, step=0.1):
+    x = np.arange(n) * step + 0.05
+    return np.column_stack((x, np.full(n, 0.5)))
+
+
+def test_bucket_polyline_keeps_one_point_per_cell_plus_ends():
+    points = line(100)  # 10 points in each of 10 cells
+    simplified = bucket_polyline(points, tolerance=1.0)
+    
+    assert len(simplified) == 11
+    np.testing.assert_array_equal(simplified[0], points[0])
+    np.testing.assert_array_equal(simplified[-1], points[-1])
+    np.testing.assert_array_equal(simplified[:10], points[::10])
+
+
+def test_decimator_keeps_first_point_and_the_last_cell():
+    points = line(100)
+    rows = TrailDecimator(tolerance=1.0).extend(points)
+    
+    assert np.isnan(rows[0]).all()  # Pen up before the run
+    assert len(rows) == 11
+    np.testing.assert_array_equal(rows[1], points[0])
+    np.testing.assert_array_equal(rows[-1], points[90])  # First point in the last cell
+
+
+def test_decimator_output_bounded_by_cells_not_run_length():
+    decimator = TrailDecimator(tolerance=1.0)
+    forward = line(100)
+    for _ in range(50):
+        decimator.extend(forward)
+        decimator.extend(forward[::-1])
+    
+    assert decimator.source_count == 10000
+    assert len(decimator) == 11
+
+
+def segments(rows):
+    """Set of drawn segments, ignoring breaks and repeated joints."""
+    pairs = zip(map(tuple, rows[:-1]), map(tuple, rows[1:]))
+    return {frozenset(pair) for pair in pairs if not np.isnan(pair[0] + pair[1]).any()}
+
+
+def test_decimator_incremental_matches_single_call():
+    rng = np.random.default_rng(0)
+    points = np.cumsum(rng.standard_normal((2000, 2)), axis=0)
+    whole = TrailDecimator(tolerance=2.0)
+    whole.extend(points)
+    chunked = TrailDecimator(tolerance=2.0)
+    for block in np.array_split(points, 37):
+        chunked.extend(block)
+    
+    assert segments(chunked.coords()) == segments(whole.coords())
@@ -0,0 +1,21 @@
+import numpy as np
+
+from trajectory import HEADER_SIZE, TrajectoryFile, TrajectoryWriter
+
+
+def test_bytes_written_counts_rows_not_capacity(tmp_path):
+    path = str(tmp_path / "run.traj")
+    writer = TrajectoryWriter(path, capacity=1000, dt=0.01)
+    assert writer.bytes_written == HEADER_SIZE
+    
+    block = np.zeros((10, 7))
+    block[:, 0] = np.arange(10) * 0.01
+    writer.write(block)
+    writer.close()
+    assert writer.bytes_written == HEADER_SIZE + 10 * 7 * 8
+    
+    trajectory = TrajectoryFile(path)
+    assert len(trajectory) == 10
+    np.testing.assert_array_equal(trajectory.times, block[:, 0])
+    trajectory.close()
+    assert trajectory._data is None
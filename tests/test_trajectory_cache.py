@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from trajectory_cache import TrajectoryCache, TrajectoryKey
+
+
+def test_lru_evicts_least_recently_used():
+    keys = [TrajectoryKey(theta1=1.0 + i, theta2=0.5) for i in range(3)]
+    row_bytes = 7 * 8
+    cache = TrajectoryCache(max_bytes=2 * 101 * row_bytes)
+    cache.trajectory(keys[0], 1.0)
+    cache.trajectory(keys[1], 1.0)
+    assert cache.get(keys[0]) is not None  # Now keys[1] is the oldest
+    
+    cache.trajectory(keys[2], 1.0)
+    assert keys[0] in cache and keys[2] in cache
+    assert keys[1] not in cache
+    assert cache.stats["evictions"] == 1
+    assert cache.nbytes <= cache.max_bytes
+
+
+@pytest.mark.parametrize("field, value", [
+    ("theta1", 1.0 + 1e-12), ("theta2", -0.5), ("omega1", 0.1), ("omega2", -0.1),
+    ("length1", 1.1), ("length2", 0.9), ("mass1", 2.0), ("mass2", 0.5),
+    ("gravity", -9.81), ("dt", 0.005), ("integrator", "gl4"), ("rtol", 1e-7), ("atol", 1e-10),
+])
+def test_key_changes_with_every_physics_input(field, value):
+    key = TrajectoryKey(theta1=1.0, theta2=0.5)
+    changed = key._replace(**{field: value})
+    assert changed != key
+    assert changed.digest() != key.digest()
+    
+    cache = TrajectoryCache()
+    cache.trajectory(key, 0.1)
+    assert cache.get(changed) is None
+
+
+def test_extending_cached_run_matches_fresh_run():
+    key = TrajectoryKey(theta1=2.0, theta2=2.5)
+    cache = TrajectoryCache()
+    cache.trajectory(key, 1.0)
+    extended = cache.trajectory(key, 3.0)
+    assert cache.stats["resumed"] == 1
+    
+    fresh = TrajectoryCache().trajectory(key, 3.0)
+    np.testing.assert_array_equal(extended.rows, fresh.rows)
+
+
+def test_disk_tier_reloads_evicted_entries(tmp_path):
+    key = TrajectoryKey(theta1=2.0, theta2=2.5)
+    stored = TrajectoryCache(directory=str(tmp_path)).trajectory(key, 1.0)
+    
+    cache = TrajectoryCache(directory=str(tmp_path))
+    loaded = cache.get(key)
+    assert cache.stats["disk_hits"] == 1
+    np.testing.assert_array_equal(loaded.rows, stored.rows)
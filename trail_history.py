@@ -0,0 +1,284 @@
+import numpy as np
+
+
+class RingHistory:
+    """
+    Fixed-capacity history of (x, y) points backed by a NumPy ring buffer.
+    
+    Every point is written twice, at slot i and at slot i + capacity of a
+    (2 * capacity, 2) array. Because of this mirroring, the live contents
+    are always available as one contiguous, ordered slice of the buffer, so
+    appends are O(1) and reading the history never copies.
+    """
+    
+    def __init__(self, capacity: int):
+        """
+        Create an empty history.
+        
+        Args:
+            capacity: Maximum number of points to keep
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._capacity = capacity
+        self._buffer = np.empty((2 * capacity, 2), dtype=np.float64)
+        self._start = 0  # Slot of the oldest point
+        self._size = 0   # Number of points currently stored
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def capacity(self) -> int:
+        """Maximum number of points kept before the oldest are dropped."""
+        return self._capacity
+    
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes allocated for the buffer."""
+        return self._buffer.nbytes
+    
+    def append(self, x: float, y: float):
+        """
+        Add a point, dropping the oldest one if the buffer is full.
+        
+        Args:
+            x: X coordinate
+            y: Y coordinate
+        """
+        capacity = self._capacity
+        slot = self._start + self._size
+        if slot >= capacity:
+            slot -= capacity
+        
+        buffer = self._buffer
+        buffer[slot, 0] = buffer[slot + capacity, 0] = x
+        buffer[slot, 1] = buffer[slot + capacity, 1] = y
+        
+        if self._size < capacity:
+            self._size += 1
+        else:
+            self._start = slot + 1 if slot + 1 < capacity else 0
+    
+    def view(self, start: int = 0) -> np.ndarray:
+        """
+        Get the stored points, oldest first, without copying.
+        
+        The returned array is a read-only view into the ring buffer. It is
+        only valid until the next append, which may overwrite its oldest row.
+        
+        Args:
+            start: Index of the first point to include
+            
+        Returns:
+            Array of shape (len(self) - start, 2)
+        """
+        start = min(max(start, 0), self._size)
+        view = self._buffer[self._start + start:self._start + self._size]
+        view.flags.writeable = False
+        return view
+    
+    def clear(self):
+        """Remove all points while keeping the allocated buffer."""
+        self._start = 0
+        self._size = 0
+    
+    def resize(self, capacity: int):
+        """
+        Change the capacity, keeping the newest points that still fit.
+        
+        Args:
+            capacity: New maximum number of points
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if capacity == self._capacity:
+            return
+        
+        newest = self.view()[-capacity:]
+        buffer = np.empty((2 * capacity, 2), dtype=np.float64)
+        buffer[:len(newest)] = newest
+        buffer[capacity:capacity + len(newest)] = newest
+        
+        self._buffer = buffer
+        self._capacity = capacity
+        self._start = 0
+        self._size = len(newest)
+    
+    def extend(self, points: np.ndarray):
+        """
+        Append many points at once.
+        
+        The block is written straight into both halves of the buffer, wrapping
+        at the end, so the cost depends on the number of new points only.
+        
+        Args:
+            points: Array of shape (n, 2), oldest first
+        """
+        capacity = self._capacity
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)[-capacity:]
+        count = len(points)
+        if count == 0:
+            return
+        
+        buffer = self._buffer
+        slot = self._start + self._size
+        if slot >= capacity:
+            slot -= capacity
+        first = min(count, capacity - slot)
+        buffer[slot:slot + first] = buffer[slot + capacity:slot + capacity + first] = points[:first]
+        rest = count - first
+        if rest:
+            buffer[:rest] = buffer[capacity:capacity + rest] = points[first:]
+        
+        dropped = self._size + count - capacity
+        if dropped > 0:
+            self._start = (self._start + dropped) % capacity
+            self._size = capacity
+        else:
+            self._size += count
+
+
+class ChunkedHistory:
+    """
+    Unbounded history of (x, y) points stored in fixed-size NumPy blocks.
+    
+    Points are written into float64 chunks of chunk_size rows; a new chunk is
+    allocated only when the current one is full. Nothing is ever dropped or
+    moved, so the cost is 16 bytes per point plus at most one partly filled
+    chunk, and appends never trigger a large reallocation.
+    """
+    
+    def __init__(self, chunk_size: int = 65536):
+        """
+        Create an empty history.
+        
+        Args:
+            chunk_size: Number of points per storage block
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self._chunk_size = chunk_size
+        self._chunks = []
+        self._fill = chunk_size  # Rows used in the last chunk (full = none open)
+        self._size = 0
+        self._cache = None       # Concatenated view, valid while _size is unchanged
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def capacity(self) -> None:
+        """Chunked histories are unbounded."""
+        return None
+    
+    @property
+    def chunk_size(self) -> int:
+        """Number of points per storage block."""
+        return self._chunk_size
+    
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes allocated for point storage."""
+        return sum(chunk.nbytes for chunk in self._chunks)
+    
+    def append(self, x: float, y: float):
+        """
+        Add a point, allocating a new chunk if the current one is full.
+        
+        Args:
+            x: X coordinate
+            y: Y coordinate
+        """
+        if self._fill == self._chunk_size:
+            self._chunks.append(np.empty((self._chunk_size, 2), dtype=np.float64))
+            self._fill = 0
+        
+        chunk = self._chunks[-1]
+        chunk[self._fill, 0] = x
+        chunk[self._fill, 1] = y
+        self._fill += 1
+        self._size += 1
+        self._cache = None
+    
+    def extend(self, points: np.ndarray):
+        """
+        Append many points at once.
+        
+        Args:
+            points: Array of shape (n, 2), oldest first
+        """
+        points = np.asarray(points, dtype=np.float64)
+        while len(points):
+            if self._fill == self._chunk_size:
+                self._chunks.append(np.empty((self._chunk_size, 2), dtype=np.float64))
+                self._fill = 0
+            count = min(len(points), self._chunk_size - self._fill)
+            self._chunks[-1][self._fill:self._fill + count] = points[:count]
+            self._fill += count
+            self._size += count
+            points = points[count:]
+        self._cache = None
+    
+    def chunks(self):
+        """
+        Iterate over the stored points chunk by chunk, without copying.
+        
+        Yields:
+            Read-only arrays of shape (k, 2), oldest first
+        """
+        for index, chunk in enumerate(self._chunks):
+            view = chunk if index < len(self._chunks) - 1 else chunk[:self._fill]
+            view = view.view()
+            view.flags.writeable = False
+            yield view
+    
+    def view(self, start: int = 0) -> np.ndarray:
+        """
+        Get the stored points as a single array, oldest first.
+        
+        The chunks are concatenated lazily: the full history is cached until
+        the next append, and a range that lies within one chunk is returned
+        as a view without copying. With start > 0 only the chunks holding
+        the requested points are touched, which keeps reading the newest
+        points cheap however long the history is.
+        
+        Args:
+            start: Index of the first point to include
+            
+        Returns:
+            Read-only array of shape (len(self) - start, 2)
+        """
+        start = min(max(start, 0), self._size)
+        if start == self._size and self._cache is None:
+            # Nothing new since start (e.g. a paused frame); may be a chunk boundary
+            view = np.empty((0, 2), dtype=np.float64)
+            view.flags.writeable = False
+            return view
+        if start > 0 and self._cache is None:
+            first = start // self._chunk_size
+            parts = list(self.chunks())[first:]
+            if len(parts) == 1:
+                return parts[0][start - first * self._chunk_size:]
+            parts[0] = parts[0][start - first * self._chunk_size:]
+            view = np.concatenate(parts)
+            view.flags.writeable = False
+            return view
+        
+        if self._cache is None:
+            parts = list(self.chunks())
+            if not parts:
+                self._cache = np.empty((0, 2), dtype=np.float64)
+            elif len(parts) == 1:
+                self._cache = parts[0]
+            else:
+                self._cache = np.concatenate(parts)
+            self._cache.flags.writeable = False
+        return self._cache[start:]
+    
+    def clear(self):
+        """Remove all points and release their storage."""
+        self._chunks = []
+        self._fill = self._chunk_size
+        self._size = 0
+        self._cache = None
@@ -0,0 +1,156 @@
+from typing import Optional
+
+import numpy as np
+
+
+# Cell coordinates are clipped to 16 bits so a cell fits in 32 bits and a
+# segment between two cells in one int64 key. Cells that far away are off
+# any canvas anyway.
+_CELL_OFFSET = 1 << 15
+
+
+def _cell_codes(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Map screen points to the codes of the tolerance-sized grid cells they fall in."""
+    cells = np.floor(points / tolerance)
+    cells = np.clip(cells, -_CELL_OFFSET, _CELL_OFFSET - 1).astype(np.int64) + _CELL_OFFSET
+    return (cells[:, 0] << 16) | cells[:, 1]
+
+
+def bucket_polyline(points: np.ndarray, tolerance: float = 1.0) -> np.ndarray:
+    """
+    Drop consecutive points that fall in the same screen cell.
+    
+    Each run of points inside one tolerance-sized cell is replaced by its
+    first point, so no dropped point is more than one cell diagonal away
+    from the simplified polyline.
+    
+    Args:
+        points: Screen coordinates, shape (n, 2)
+        tolerance: Cell size in pixels
+    
+    Returns:
+        Simplified points, shape (m, 2) with m <= n
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3:
+        return points
+    codes = _cell_codes(points, tolerance)
+    keep = np.empty(len(points), dtype=bool)
+    keep[0] = True
+    keep[1:] = codes[1:] != codes[:-1]
+    keep[-1] = True  # Always end at the newest point
+    return points[keep]
+
+
+class TrailDecimator:
+    """
+    Incremental, screen-space level-of-detail filter for long trails.
+    
+    New tip points (already in canvas pixels) are snapped to a grid of
+    tolerance-sized cells. Consecutive points in the same cell are merged,
+    and a segment between two cells that was already emitted is not
+    emitted again, because redrawing it would not change any pixel. As a
+    result, the output size is bounded by the number of distinct cell
+    transitions, which depends on the canvas resolution rather than on how
+    long the simulation runs.
+    
+    The settled part of the trail is never reprocessed: extend() only looks
+    at the points added since the previous call, and the decimated result
+    is cached for full repaints.
+    
+    Output arrays use rows of NaN to mark breaks ("pen up") in the polyline.
+    """
+    
+    def __init__(self, tolerance: float = 1.0):
+        """
+        Args:
+            tolerance: Cell size in pixels (the maximum positional error)
+        """
+        self.tolerance = tolerance
+        self.reset()
+    
+    def reset(self):
+        """Forget all processed points, e.g. after a restart or resize."""
+        self.source_count = 0  # Raw points consumed so far
+        self._last_point: Optional[np.ndarray] = None
+        self._segments = set()
+        self._parts = []
+        self._cache: Optional[np.ndarray] = None
+    
+    def __len__(self) -> int:
+        """Number of rows (points and breaks) in the decimated trail."""
+        return sum(len(part) for part in self._parts)
+    
+    def extend(self, points: np.ndarray) -> np.ndarray:
+        """
+        Process newly added points.
+        
+        Args:
+            points: Screen coordinates of the new points, oldest first
+        
+        Returns:
+            The decimated rows to draw for these points (with NaN breaks).
+            They continue from the last point of the previous call.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.source_count += len(points)
+        if self._last_point is not None:
+            points = np.vstack((self._last_point, points))
+        if len(points) == 0:
+            return np.empty((0, 2))
+        
+        # Merge consecutive points in the same cell (keeping the first one)
+        codes = _cell_codes(points, self.tolerance)
+        keep = np.empty(len(points), dtype=bool)
+        keep[0] = True
+        keep[1:] = codes[1:] != codes[:-1]
+        points, codes = points[keep], codes[keep]
+        self._last_point = points[-1]
+        if len(points) < 2:
+            return np.empty((0, 2))
+        
+        # Undirected segment keys between consecutive cells
+        lo = np.minimum(codes[:-1], codes[1:])
+        hi = np.maximum(codes[:-1], codes[1:])
+        keys = (lo << 32) | hi
+        
+        # Segments not drawn before
+        if not self._segments:
+            _, first = np.unique(keys, return_index=True)
+            new = np.zeros(len(keys), dtype=bool)
+            new[first] = True
+            self._segments.update(keys[first].tolist())
+        else:
+            seen = self._segments
+            new = np.empty(len(keys), dtype=bool)
+            for i, key in enumerate(keys.tolist()):
+                new[i] = key not in seen
+                seen.add(key)
+        
+        # Emit the end points of new segments, breaking the line between runs
+        emit = np.zeros(len(points), dtype=bool)
+        emit[:-1] |= new
+        emit[1:] |= new
+        run_start = np.zeros(len(points), dtype=bool)
+        run_start[:-1] = new & ~np.concatenate(([False], new[:-1]))
+        
+        index = np.flatnonzero(emit)
+        breaks = np.flatnonzero(run_start[index])
+        rows = np.insert(points[index], breaks, np.nan, axis=0)
+        
+        if len(rows):
+            self._parts.append(rows)
+            self._cache = None
+        return rows
+    
+    def coords(self) -> np.ndarray:
+        """
+        Get the whole decimated trail processed so far.
+        
+        Returns:
+            Array of shape (m, 2) with NaN rows marking breaks
+        """
+        if self._cache is None:
+            self._cache = np.concatenate(self._parts) if self._parts else np.empty((0, 2))
+            self._parts = [self._cache] if self._parts else []
+        return self._cache
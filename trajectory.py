@@ -0,0 +1,478 @@
+import json
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from backends import get_backend, resize_history
+
+
+# On-disk layout of a trajectory file:
+#
+#   [0, HEADER_SIZE)   MAGIC followed by a UTF-8 JSON header, padded with spaces
+#   HEADER_SIZE ...    float64 columns, each stored contiguously:
+#                        t                              shape (capacity,)
+#                        theta1, ..., y2 (one by one)   shape (capacity, lanes)
+#
+# Columns are preallocated to the capacity given when the file is created,
+# so blocks can be written in place and readers can memory-map each column
+# without knowing how far the run got. The header records how many rows are
+# valid. Data is little-endian, and every column starts on an 8-byte boundary.
+MAGIC = b"DPTRAJ1\n"
+HEADER_SIZE = 4096
+COLUMNS = ("t", "theta1", "theta2", "omega1", "omega2", "x2", "y2")
+_DTYPE = np.dtype("<f8")
+
+
+def _column_offsets(capacity: int, lanes: int) -> Dict[str, int]:
+    """Offset (in float64 items after the header) of every column."""
+    offsets = {"t": 0}
+    offset = capacity
+    for name in COLUMNS[1:]:
+        offsets[name] = offset
+        offset += capacity * lanes
+    return offsets
+
+
+def _read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if not raw.startswith(MAGIC):
+        raise ValueError(f"{path} is not a trajectory file")
+    return json.loads(raw[len(MAGIC):].decode("utf-8"))
+
+
+class TrajectoryWriter:
+    """
+    Writes a trajectory file block by block.
+    
+    The file is created at its full size up front and filled through a
+    writable memory map, so appending a block is a plain array copy per
+    column. The row count in the header is updated by flush() and close();
+    a file that was flushed mid-run can already be opened for reading.
+    """
+    
+    def __init__(self, path: str, capacity: int, dt: float,
+                 params: Optional[dict] = None, lanes: int = 1):
+        """
+        Create the file.
+        
+        Args:
+            path: Output file
+            capacity: Maximum number of rows (time samples)
+            dt: Time between rows
+            params: Physical parameters and initial conditions to record
+            lanes: Number of pendulums per row (1 for a single pendulum)
+        """
+        if capacity < 1 or lanes < 1:
+            raise ValueError("capacity and lanes must be positive")
+        self.path = path
+        self.capacity = capacity
+        self.lanes = lanes
+        self.dt = dt
+        self.params = dict(params or {})
+        self.rows = 0
+        
+        items = capacity * (1 + lanes * (len(COLUMNS) - 1))
+        with open(path, "wb") as f:
+            f.truncate(HEADER_SIZE + items * _DTYPE.itemsize)
+        self._write_header()
+        self._map()
+    
+    @classmethod
+    def reopen(cls, path: str, rows: Optional[int] = None) -> "TrajectoryWriter":
+        """
+        Continue writing an existing trajectory file, e.g. after an interruption.
+        
+        Args:
+            path: File created by TrajectoryWriter
+            rows: Number of rows to keep (default: the row count in the
+                  header); later rows are overwritten by the next append
+        
+        Returns:
+            Writer positioned after the kept rows
+        """
+        header = _read_header(path)
+        writer = cls.__new__(cls)
+        writer.path = path
+        writer.capacity = header["capacity"]
+        writer.lanes = header["lanes"]
+        writer.dt = header["dt"]
+        writer.params = header["params"]
+        writer.rows = header["rows"] if rows is None else rows
+        writer._map()
+        return writer
+    
+    def _map(self):
+        """Map the data section of the file for writing."""
+        capacity, lanes = self.capacity, self.lanes
+        items = capacity * (1 + lanes * (len(COLUMNS) - 1))
+        data = np.memmap(self.path, dtype=_DTYPE, mode="r+", offset=HEADER_SIZE, shape=(items,))
+        offsets = _column_offsets(capacity, lanes)
+        self._data = data
+        self._columns = {"t": data[:capacity]}
+        for name in COLUMNS[1:]:
+            start = offsets[name]
+            self._columns[name] = data[start:start + capacity * lanes].reshape(capacity, lanes)
+    
+    def _write_header(self):
+        header = json.dumps({"version": 1,
+                             "columns": list(COLUMNS),
+                             "capacity": self.capacity,
+                             "lanes": self.lanes,
+                             "rows": self.rows,
+                             "dt": self.dt,
+                             "params": self.params}).encode("utf-8")
+        if len(MAGIC) + len(header) > HEADER_SIZE:
+            raise ValueError("Trajectory header too large")
+        with open(self.path, "r+b") as f:
+            f.write(MAGIC + header.ljust(HEADER_SIZE - len(MAGIC)))
+    
+    def append(self, t, theta1, theta2, omega1, omega2, x2, y2):
+        """
+        Append a block of rows.
+        
+        Args:
+            t: Times, shape (n,)
+            theta1, theta2, omega1, omega2, x2, y2: Values, shape (n,) for a
+                single pendulum or (n, lanes) for a batch
+        """
+        t = np.asarray(t, dtype=np.float64)
+        n = len(t)
+        if self.rows + n > self.capacity:
+            raise ValueError(f"Trajectory capacity of {self.capacity} rows exceeded")
+        
+        rows = slice(self.rows, self.rows + n)
+        self._columns["t"][rows] = t
+        for name, values in zip(COLUMNS[1:], (theta1, theta2, omega1, omega2, x2, y2)):
+            self._columns[name][rows] = np.asarray(values, dtype=np.float64).reshape(n, -1)
+        self.rows += n
+    
+    def write(self, block: np.ndarray):
+        """
+        Append rows given as one (n, len(COLUMNS)) array (single pendulum only).
+        
+        This is the sink interface used by record_trajectory.
+        """
+        if self.lanes != 1:
+            raise ValueError("write() needs a single-lane trajectory, use append()")
+        self.append(*np.asarray(block).T)
+    
+    @property
+    def bytes_written(self) -> int:
+        """Bytes of header and rows written so far (not the preallocated size)."""
+        row_size = (1 + self.lanes * (len(COLUMNS) - 1)) * _DTYPE.itemsize
+        return HEADER_SIZE + self.rows * row_size
+    
+    def flush(self):
+        """Write buffered data and the current row count to disk."""
+        self._data.flush()
+        self._write_header()
+    
+    def close(self):
+        if self._data is None:
+            return
+        self.flush()
+        self._data = None
+        self._columns = {}
+
+
+class TrajectoryFile:
+    """
+    Read-only, memory-mapped view of a trajectory file.
+    
+    Opening a file reads only its header. Columns are NumPy views into a
+    memory map, so slicing a time window or a strided (decimated) subset
+    reads just the pages it touches, however long the run is.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Trajectory file written by TrajectoryWriter
+        """
+        header = _read_header(path)
+        if header.get("version") != 1 or header.get("columns") != list(COLUMNS):
+            raise ValueError(f"Unsupported trajectory file {path}")
+        self.path = path
+        self.header = header
+        self.dt: float = header["dt"]
+        self.params: dict = header["params"]
+        self.lanes: int = header["lanes"]
+        self.rows: int = header["rows"]
+        
+        capacity = header["capacity"]
+        items = capacity * (1 + self.lanes * (len(COLUMNS) - 1))
+        data = np.memmap(path, dtype=_DTYPE, mode="r", offset=HEADER_SIZE, shape=(items,))
+        offsets = _column_offsets(capacity, self.lanes)
+        self._data = data
+        self._columns = {"t": data[:self.rows]}
+        for name in COLUMNS[1:]:
+            start = offsets[name]
+            column = data[start:start + capacity * self.lanes].reshape(capacity, self.lanes)
+            self._columns[name] = column[:self.rows, 0] if self.lanes == 1 else column[:self.rows]
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get one column as a memory-mapped view.
+        
+        Args:
+            name: One of COLUMNS
+        
+        Returns:
+            Array of shape (rows,), or (rows, lanes) for a batch trajectory
+        """
+        return self._columns[name]
+    
+    @property
+    def times(self) -> np.ndarray:
+        return self._columns["t"]
+    
+    @property
+    def duration(self) -> float:
+        """Time of the last row."""
+        return float(self.times[-1]) if self.rows else 0.0
+    
+    def index_at(self, t: float) -> int:
+        """
+        Find the last row at or before time t.
+        
+        Args:
+            t: Simulation time
+        
+        Returns:
+            Row index, clipped to the valid range
+        """
+        index = int(np.searchsorted(self.times, t, side="right")) - 1
+        return min(max(index, 0), max(self.rows - 1, 0))
+    
+    def window(self, t_start: float, t_end: float, step: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Get the rows with t_start <= t <= t_end.
+        
+        Args:
+            t_start: Start of the window
+            t_end: End of the window
+            step: Keep every step-th row
+        
+        Returns:
+            Dictionary mapping each column name to a memory-mapped view
+        """
+        times = self.times
+        start = int(np.searchsorted(times, t_start, side="left"))
+        stop = int(np.searchsorted(times, t_end, side="right"))
+        rows = slice(start, stop, step)
+        return {name: column[rows] for name, column in self._columns.items()}
+    
+    def decimated(self, max_rows: int) -> Dict[str, np.ndarray]:
+        """
+        Get an evenly strided subset of at most max_rows rows.
+        
+        Args:
+            max_rows: Upper bound on the number of rows returned
+        
+        Returns:
+            Dictionary mapping each column name to a memory-mapped view
+        """
+        step = max(1, -(-self.rows // max(1, max_rows)))
+        return {name: column[::step] for name, column in self._columns.items()}
+    
+    def close(self):
+        self._data = None
+        self._columns = {}
+
+
+def record_trajectory(pendulum, steps: int, sink, chunk_size: int = 10000,
+                      include_start: bool = True,
+                      on_block: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Integrate a pendulum and stream its trajectory to a sink in chunks.
+    
+    Only one chunk of rows is held in memory at a time, so arbitrarily long
+    runs use constant memory.
+    
+    Args:
+        pendulum: Pendulum to integrate
+        steps: Number of steps to take
+        sink: Object with a write(block) method receiving (n, len(COLUMNS)) arrays
+        chunk_size: Rows per block
+        include_start: Record the current state before the first step
+                       (disable when continuing a run whose last row was written)
+        on_block: Optional callback on_block(rows) called after each block is
+                  written, with the rows written so far; the pendulum is then
+                  exactly at the last written row (used for checkpoints)
+    
+    Returns:
+        Number of rows written
+    """
+    block = np.empty((chunk_size, len(COLUMNS)), dtype=np.float64)
+    filled = 0
+    rows = 0
+    
+    for i in range(0 if include_start else 1, steps + 1):
+        if i > 0:
+            pendulum.step()
+        row = block[filled]
+        row[0] = pendulum.time
+        row[1] = pendulum.theta1
+        row[2] = pendulum.theta2
+        row[3] = pendulum.omega1
+        row[4] = pendulum.omega2
+        row[5] = pendulum.x2
+        row[6] = pendulum.y2
+        filled += 1
+        if filled == chunk_size:
+            sink.write(block)
+            rows += filled
+            filled = 0
+            if on_block is not None:
+                on_block(rows)
+    
+    if filled:
+        sink.write(block[:filled])
+        rows += filled
+        if on_block is not None:
+            on_block(rows)
+    return rows
+
+
+def record_batch(batch, steps: int, writer: TrajectoryWriter, chunk_size: int = 1000) -> int:
+    """
+    Integrate a DoublePendulumBatch and append its trajectory to a writer.
+    
+    Args:
+        batch: DoublePendulumBatch to integrate (its current state is recorded first)
+        steps: Number of steps to take
+        writer: TrajectoryWriter created with lanes == len(batch)
+        chunk_size: Rows buffered before each append
+    
+    Returns:
+        Number of rows written
+    """
+    lanes = len(batch)
+    if writer.lanes != lanes:
+        raise ValueError(f"Writer has {writer.lanes} lanes, batch has {lanes} pendulums")
+    
+    times = np.empty(chunk_size)
+    block = np.empty((len(COLUMNS) - 1, chunk_size, lanes))
+    filled = 0
+    rows = 0
+    
+    for i in range(steps + 1):
+        if i > 0:
+            batch.step()
+        _, _, x2, y2 = batch.get_positions()
+        times[filled] = batch.time
+        block[:4, filled] = batch.state.T
+        block[4, filled] = x2
+        block[5, filled] = y2
+        filled += 1
+        if filled == chunk_size or i == steps:
+            writer.append(times[:filled], *block[:, :filled])
+            rows += filled
+            filled = 0
+    return rows
+
+
+class TrajectoryPlayer:
+    """
+    Replays a single-pendulum trajectory file in place of a live simulation.
+    
+    Exposes the same drawing interface as DoublePendulum and WorkerClient
+    (advance_to, get_positions, get_tip_history, get_time, theta1, ...), so
+    the viewer can show a recorded run without integrating anything. Only
+    the rows between the previous and the new playback time are read from
+    the file on each advance.
+    """
+    
+    def __init__(self, trajectory: TrajectoryFile, backend: Optional[str] = None):
+        """
+        Args:
+            trajectory: Opened single-lane TrajectoryFile, or anything with
+                        the same read interface (e.g. a CachedTrajectory)
+            backend: Storage backend of the trail (see backends.BACKENDS);
+                     None picks "numpy" when it is installed
+        """
+        if trajectory.lanes != 1:
+            raise ValueError("Only single-pendulum trajectories can be replayed")
+        if len(trajectory) == 0:
+            raise ValueError("Trajectory file is empty")
+        self.trajectory = trajectory
+        self.dt = trajectory.dt
+        self.length1 = float(trajectory.params.get("length1", 1.0))
+        self.length2 = float(trajectory.params.get("length2", 1.0))
+        self.backend = get_backend(backend)
+        self._tip_history = self.backend.ring_history(1000)
+        self._index = -1
+        self._seek(0)
+    
+    def _seek(self, index: int):
+        """Move to a row, adding the tip points passed on the way to the trail."""
+        trajectory = self.trajectory
+        if index > self._index:
+            rows = slice(self._index + 1, index + 1)
+            points = np.column_stack((trajectory.column("x2")[rows],
+                                      trajectory.column("y2")[rows]))
+            self._tip_history.extend(self.backend.points(points))
+        self._index = index
+        self.time = float(trajectory.times[index])
+        self.theta1 = float(trajectory.column("theta1")[index])
+        self.theta2 = float(trajectory.column("theta2")[index])
+        self.omega1 = float(trajectory.column("omega1")[index])
+        self.omega2 = float(trajectory.column("omega2")[index])
+        self.x2 = float(trajectory.column("x2")[index])
+        self.y2 = float(trajectory.column("y2")[index])
+    
+    def advance_to(self, t: float):
+        """
+        Move playback forward to simulation time t.
+        
+        Args:
+            t: Target simulation time (clipped to the end of the recording)
+        """
+        index = self.trajectory.index_at(t)
+        if index > self._index:
+            self._seek(index)
+    
+    def seek(self, t: float):
+        """
+        Jump to simulation time t, backwards or forwards.
+        
+        The trail is rebuilt from the recording so that it ends at t.
+        
+        Args:
+            t: Target simulation time (clipped to the recording)
+        """
+        index = self.trajectory.index_at(t)
+        capacity = self._tip_history.capacity
+        self._tip_history.clear()
+        self._index = (0 if capacity is None else max(index + 1 - capacity, 0)) - 1
+        self._seek(index)
+    
+    def step(self):
+        """Move playback forward by one recorded row."""
+        self._seek(min(self._index + 1, len(self.trajectory) - 1))
+    
+    @property
+    def duration(self) -> float:
+        return self.trajectory.duration
+    
+    def get_positions(self):
+        x1 = self.length1 * np.sin(self.theta1)
+        y1 = -self.length1 * np.cos(self.theta1)
+        return x1, y1, self.x2, self.y2
+    
+    def get_tip_history(self, start: int = 0) -> np.ndarray:
+        return self._tip_history.view(start)
+    
+    def get_tip_history_length(self) -> int:
+        return len(self._tip_history)
+    
+    def get_time(self) -> float:
+        return self.time
+    
+    def set_max_history_length(self, length: Optional[int] = None):
+        """Same semantics as DoublePendulum.set_max_history_length."""
+        self._tip_history = resize_history(self._tip_history, length, self.backend)
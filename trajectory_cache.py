@@ -0,0 +1,388 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from double_pendulum import DoublePendulum
+from trajectory import COLUMNS, TrajectoryFile, TrajectoryWriter, record_trajectory
+
+
+class TrajectoryKey(NamedTuple):
+    """
+    Everything that determines a trajectory: initial conditions, physical
+    parameters and integrator settings (defaults match DoublePendulum).
+    """
+    theta1: float
+    theta2: float
+    omega1: float = 0.0
+    omega2: float = 0.0
+    length1: float = 1.0
+    length2: float = 1.0
+    mass1: float = 1.0
+    mass2: float = 1.0
+    gravity: float = -9.8
+    dt: float = 0.01
+    integrator: str = "rk4"
+    rtol: float = 1e-6
+    atol: float = 1e-9
+    
+    def digest(self) -> str:
+        """Stable file name for the key (repr of a float round-trips exactly)."""
+        return hashlib.sha1(repr(tuple(self)).encode("utf-8")).hexdigest()
+    
+    def create_pendulum(self) -> DoublePendulum:
+        """Create a pendulum at the initial state of the key."""
+        return DoublePendulum(**self._asdict())
+
+
+class _ArraySink:
+    """Collects the blocks of record_trajectory in memory."""
+    
+    def __init__(self):
+        self.blocks: List[np.ndarray] = []
+    
+    def write(self, block: np.ndarray):
+        self.blocks.append(block.copy())
+
+
+class CachedTrajectory:
+    """
+    A recorded trajectory held in memory, one row per time step.
+    
+    Offers the read interface of trajectory.TrajectoryFile (column, times,
+    index_at, duration, ...), so it can be replayed with TrajectoryPlayer,
+    and resume() continues the run from its last row (the checkpoint).
+    """
+    
+    def __init__(self, key: TrajectoryKey, rows: np.ndarray):
+        """
+        Args:
+            key: Parameters of the run
+            rows: Array of shape (n, len(COLUMNS)), one row per step
+        """
+        self.key = key
+        self.rows = rows
+        self.dt = key.dt
+        self.params = key._asdict()
+        self.lanes = 1
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes
+    
+    def column(self, name: str) -> np.ndarray:
+        return self.rows[:, COLUMNS.index(name)]
+    
+    @property
+    def times(self) -> np.ndarray:
+        return self.rows[:, 0]
+    
+    @property
+    def duration(self) -> float:
+        return float(self.rows[-1, 0])
+    
+    def index_at(self, t: float) -> int:
+        index = int(np.searchsorted(self.times, t, side="right")) - 1
+        return min(max(index, 0), len(self.rows) - 1)
+    
+    def resume(self) -> DoublePendulum:
+        """
+        Create a pendulum at the last recorded row.
+        
+        Stepping it continues the run exactly for the fixed-step integrators;
+        the adaptive "rk45" solver restarts its step size control, so there
+        the continuation agrees with an uninterrupted run only to within the
+        tolerances.
+        
+        Returns:
+            Pendulum positioned at the checkpoint, trail holding its tip only
+        """
+        _, theta1, theta2, omega1, omega2, _, _ = self.rows[-1].tolist()
+        options = self.key._asdict()
+        options.update(theta1=theta1, theta2=theta2, omega1=omega1, omega2=omega2)
+        pendulum = DoublePendulum(**options)
+        pendulum.time = float(self.rows[-1, 0])
+        return pendulum
+
+
+class TrajectoryRecorder:
+    """
+    Records a live run step by step and stores it in a cache when done.
+    
+    Recording costs one tuple append per step, so it can run inside the
+    animation loop.
+    """
+    
+    def __init__(self, cache: "TrajectoryCache", key: TrajectoryKey,
+                 prefix: Optional[CachedTrajectory] = None):
+        """
+        Args:
+            cache: Cache that receives the trajectory on commit()
+            key: Parameters of the run
+            prefix: Cached rows the run continues from (None for a fresh run)
+        """
+        self.cache = cache
+        self.key = key
+        self.prefix = prefix
+        self._rows: List[tuple] = []
+    
+    def record(self, pendulum: DoublePendulum):
+        """Append the current state of the pendulum."""
+        self._rows.append((pendulum.time, pendulum.theta1, pendulum.theta2,
+                           pendulum.omega1, pendulum.omega2, pendulum.x2, pendulum.y2))
+    
+    def commit(self) -> Optional[CachedTrajectory]:
+        """
+        Store everything recorded so far in the cache.
+        
+        Returns:
+            The cached trajectory, or None if nothing new was recorded
+        """
+        if not self._rows:
+            return None
+        rows = np.array(self._rows, dtype=np.float64)
+        if self.prefix is not None:
+            rows = np.concatenate((self.prefix.rows, rows))
+        self._rows = []
+        entry = self.cache.put(self.key, rows)
+        self.prefix = entry
+        return entry
+
+
+class TrajectoryCache:
+    """
+    Memoizes trajectories by their full parameter tuple.
+    
+    The memory tier is an LRU map limited to max_bytes of trajectory data;
+    the least recently used entries are evicted first. With a directory,
+    every stored trajectory is also written there as a trajectory file,
+    so evicted entries (and entries from earlier processes) can be loaded
+    again instead of being recomputed.
+    
+    A request for a longer run than the cached one resumes integration from
+    the last cached row, so only the missing part is computed.
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None):
+        """
+        Args:
+            max_bytes: Budget of the in-memory tier
+            directory: Optional directory for the on-disk tier
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._entries: "OrderedDict[TrajectoryKey, CachedTrajectory]" = OrderedDict()
+        self.nbytes = 0
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0,
+                                      "resumed": 0, "evictions": 0}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: TrajectoryKey) -> bool:
+        return key in self._entries or (self._path(key) is not None
+                                        and os.path.exists(self._path(key)))
+    
+    def _path(self, key: TrajectoryKey) -> Optional[str]:
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, key.digest() + ".traj")
+    
+    def _insert(self, entry: CachedTrajectory):
+        old = self._entries.pop(entry.key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._entries[entry.key] = entry
+        self.nbytes += entry.nbytes
+        
+        # Evict least recently used entries, but always keep the newest one
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.stats["evictions"] += 1
+    
+    def get(self, key: TrajectoryKey) -> Optional[CachedTrajectory]:
+        """
+        Look up a trajectory.
+        
+        Args:
+            key: Parameters of the run
+        
+        Returns:
+            The longest cached trajectory for the key, or None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+        
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            stored = TrajectoryFile(path)
+            rows = np.stack([np.asarray(stored.column(name)) for name in COLUMNS], axis=1)
+            stored.close()
+            entry = CachedTrajectory(key, rows)
+            self._insert(entry)
+            self.stats["disk_hits"] += 1
+            return entry
+        return None
+    
+    def put(self, key: TrajectoryKey, rows: np.ndarray) -> CachedTrajectory:
+        """
+        Store a trajectory, unless a longer one is already cached.
+        
+        Args:
+            key: Parameters of the run
+            rows: Array of shape (n, len(COLUMNS)) starting at the initial state
+        
+        Returns:
+            The cached trajectory for the key
+        """
+        current = self._entries.get(key)
+        if current is not None and len(current) >= len(rows):
+            self._entries.move_to_end(key)
+            return current
+        
+        entry = CachedTrajectory(key, np.ascontiguousarray(rows, dtype=np.float64))
+        self._insert(entry)
+        
+        path = self._path(key)
+        if path is not None:
+            writer = TrajectoryWriter(path, capacity=len(rows), dt=key.dt, params=key._asdict())
+            writer.write(entry.rows)
+            writer.close()
+        return entry
+    
+    def trajectory(self, key: TrajectoryKey, duration: float) -> CachedTrajectory:
+        """
+        Get a trajectory covering at least the given duration.
+        
+        A cached trajectory that is long enough is returned as is; a
+        shorter one is extended from its last row; otherwise the run is
+        integrated from the initial state.
+        
+        Args:
+            key: Parameters of the run
+            duration: Simulated time needed
+        
+        Returns:
+            Cached trajectory with duration >= the requested one (its rows
+            may extend beyond it)
+        """
+        steps = round(duration / key.dt)
+        entry = self.get(key)
+        if entry is not None and len(entry) > steps:
+            return entry
+        
+        if entry is None:
+            self.stats["misses"] += 1
+            pendulum = key.create_pendulum()
+            sink = _ArraySink()
+            record_trajectory(pendulum, steps, sink)
+            rows = np.concatenate(sink.blocks)
+        else:
+            self.stats["resumed"] += 1
+            pendulum = entry.resume()
+            sink = _ArraySink()
+            record_trajectory(pendulum, steps - (len(entry) - 1), sink)
+            # The first recorded row repeats the checkpoint
+            rows = np.concatenate((entry.rows, np.concatenate(sink.blocks)[1:]))
+        
+        return self.put(key, rows)
+    
+    def clear(self):
+        """Drop the memory tier (files in the directory are kept)."""
+        self._entries.clear()
+        self.nbytes = 0
+
+
+class ComputeAhead(CachedTrajectory):
+    """
+    Integrates a whole run ahead of playback, a time-limited chunk at a time.
+    
+    Rows go into a preallocated buffer, and the CachedTrajectory read
+    interface covers the part computed so far, so a TrajectoryPlayer can
+    play the run back while the rest is still being integrated. Playback
+    speed is then independent of the cost of the physics. The finished run
+    is stored in the cache.
+    """
+    
+    def __init__(self, cache: "TrajectoryCache", key: TrajectoryKey, duration: float,
+                 prefix: Optional[CachedTrajectory] = None):
+        """
+        Args:
+            cache: Cache that receives the run once it is complete
+            key: Parameters of the run
+            duration: Simulated time to compute
+            prefix: Cached rows to continue from (None to start at the initial state)
+        """
+        self.cache = cache
+        self.key = key
+        self.dt = key.dt
+        self.params = key._asdict()
+        self.lanes = 1
+        
+        steps = round(duration / key.dt)
+        if prefix is None:
+            self.pendulum = key.create_pendulum()
+            known = np.array([[0.0, self.pendulum.theta1, self.pendulum.theta2,
+                               self.pendulum.omega1, self.pendulum.omega2,
+                               self.pendulum.x2, self.pendulum.y2]])
+        else:
+            self.pendulum = prefix.resume()
+            known = prefix.rows
+        # Playback builds its own trail from the rows
+        self.pendulum.set_max_history_length(10)
+        
+        self._buffer = np.empty((max(steps + 1, len(known)), len(COLUMNS)), dtype=np.float64)
+        self._buffer[:len(known)] = known
+        self.filled = len(known)
+    
+    @property
+    def rows(self) -> np.ndarray:
+        return self._buffer[:self.filled]
+    
+    @property
+    def done(self) -> bool:
+        return self.filled == len(self._buffer)
+    
+    def advance(self, budget: Optional[float] = None) -> bool:
+        """
+        Integrate the next part of the run.
+        
+        Args:
+            budget: Wall time to spend in seconds (None to finish the run)
+        
+        Returns:
+            True if the run is complete
+        """
+        pendulum = self.pendulum
+        buffer = self._buffer
+        deadline = None if budget is None else time.perf_counter() + budget
+        
+        while self.filled < len(buffer):
+            # Check the clock only every few steps
+            for _ in range(min(64, len(buffer) - self.filled)):
+                pendulum.step()
+                buffer[self.filled] = (pendulum.time, pendulum.theta1, pendulum.theta2,
+                                       pendulum.omega1, pendulum.omega2, pendulum.x2, pendulum.y2)
+                self.filled += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        
+        if self.done:
+            self.commit()
+        return self.done
+    
+    def commit(self) -> CachedTrajectory:
+        """Store the rows computed so far in the cache."""
+        return self.cache.put(self.key, self.rows if self.done else self.rows.copy())